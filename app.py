@@ -1,9 +1,25 @@
 import streamlit as st
+import hashlib
+import io
 import os
+import sys
 import time
+import uuid
 from dotenv import load_dotenv
-from src.agent import StudyAgent
-from src.scraper import extract_text_from_url, extract_text_from_pdf
+from src.cache import ResponseCache
+from src.client_pool import ClientPool
+from src.context_cache import ContextCacheManager
+from src.dedup import CourseIndex, fingerprint
+from src.http_cache import HttpCache
+from src.jobs import DONE, CANCELLED, JobQueue, QueueFullError
+from src.lazy import LazyObject
+from src.llm_client import GeminiGateway, RateLimiter
+from src.metrics import REGISTRY, profile, span
+from src.mindmap import MINDMAP_STATS, build_dot, render_svg
+from src.router import EXERCISES, FOLLOWUP, IMAGE, LESSON, MINDMAP, IntentRouter
+from src.session_store import SessionStore
+# SDK do Gemini, fpdf, PIL e scraper (requests/bs4/pypdf) são importados no primeiro uso,
+# dentro das funções: a tela inicial abre sem eles (ver benchmarks/bench_startup.py)
 
 # --- CONFIGURAÇÃO ---
 st.set_page_config(
@@ -52,12 +68,354 @@ def setup_interface():
     </style>
     """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_response_cache():
+    # Cache único por processo: alunos com a mesma ementa reaproveitam a resposta
+    db_path = os.getenv("AGENTSTUDY_CACHE_DB")
+    ttl = float(os.getenv("AGENTSTUDY_CACHE_TTL", 7 * 24 * 3600))
+    return ResponseCache(max_entries=256, ttl=ttl, db_path=db_path)
+
+@st.cache_resource
+def get_gateway():
+    # Um limitador/coalescedor por processo: a cota do Gemini é da chave, não do usuário
+    rpm = os.getenv("AGENTSTUDY_RPM")
+    tpm = os.getenv("AGENTSTUDY_TPM")
+    limiter = RateLimiter(float(rpm) if rpm else None, float(tpm) if tpm else None)
+    return GeminiGateway(limiter, max_retries=int(os.getenv("AGENTSTUDY_MAX_RETRIES", 3)))
+
+@st.cache_resource
+def get_http_cache():
+    # Páginas de disciplina mudam pouco: GET condicional + texto extraído em disco
+    return HttpCache(os.getenv("AGENTSTUDY_HTTP_CACHE", ".cache/http"),
+                     ttl=float(os.getenv("AGENTSTUDY_HTTP_CACHE_TTL", 30 * 24 * 3600)),
+                     max_bytes=int(float(os.getenv("AGENTSTUDY_HTTP_CACHE_MB", 500)) * 1024 * 1024))
+
+@st.cache_resource
+def get_store():
+    # Disciplinas persistem entre reinícios; só o working set fica em memória
+    return SessionStore(os.getenv("AGENTSTUDY_DATA_DIR", ".data"),
+                        working_set=int(os.getenv("AGENTSTUDY_WORKING_SET", 64)))
+
+@st.cache_resource
+def get_images():
+    # Imagens geradas: cache por prompt, WebP + miniatura nos blobs do store
+    from src.images import ImageStore
+    return ImageStore(get_store(), max_side=int(os.getenv("AGENTSTUDY_IMAGE_MAX_SIDE", 1600)),
+                      thumb_side=int(os.getenv("AGENTSTUDY_IMAGE_THUMB_SIDE", 480)))
+
+@st.cache_resource
+def get_course_index():
+    # Ementas já processadas, compartilhadas entre alunos; "0" desliga a deduplicação
+    if os.getenv("AGENTSTUDY_DEDUP", "1") == "0":
+        return None
+    index = CourseIndex(os.path.join(os.getenv("AGENTSTUDY_DATA_DIR", ".data"), "courses.db"),
+                        min_jaccard=float(os.getenv("AGENTSTUDY_DEDUP_JACCARD", 0.8)),
+                        max_hamming=int(os.getenv("AGENTSTUDY_DEDUP_HAMMING", 6)),
+                        max_age=float(os.getenv("AGENTSTUDY_DEDUP_MAX_AGE", 120 * 24 * 3600)),
+                        url_ttl=float(os.getenv("AGENTSTUDY_DEDUP_URL_TTL", 24 * 3600)))
+    index.prune()
+    return index
+
+def make_crawler(http_cache):
+    # Varredura a partir da URL colada (ementa, plano, PDFs a um ou dois cliques); importada no primeiro uso
+    from src.crawler import Crawler
+    return Crawler(max_pages=int(os.getenv("AGENTSTUDY_CRAWL_PAGES", 8)),
+                   max_depth=int(os.getenv("AGENTSTUDY_CRAWL_DEPTH", 2)),
+                   max_bytes=int(float(os.getenv("AGENTSTUDY_CRAWL_MB", 8)) * 1024 * 1024),
+                   max_workers=int(os.getenv("AGENTSTUDY_CRAWL_WORKERS", 4)),
+                   max_seconds=float(os.getenv("AGENTSTUDY_CRAWL_SECONDS", 45)),
+                   http_cache=http_cache)
+
+@st.cache_resource
+def get_client_pool():
+    # Um cliente Gemini (e um pool de conexões HTTP) por chave, para todos os usuários
+    return ClientPool(max_connections=int(os.getenv("AGENTSTUDY_MAX_CONNECTIONS", 32)),
+                      max_keepalive=int(os.getenv("AGENTSTUDY_KEEPALIVE_CONNECTIONS", 16)))
+
+@st.cache_resource
+def get_context_cache():
+    # Material longo vira CachedContent no Gemini; "0" desliga (contexto sempre inline)
+    if os.getenv("AGENTSTUDY_CONTEXT_CACHE", "1") == "0":
+        return None
+    return ContextCacheManager(min_tokens=int(os.getenv("AGENTSTUDY_CONTEXT_CACHE_MIN_TOKENS", 4096)),
+                               ttl=float(os.getenv("AGENTSTUDY_CONTEXT_CACHE_TTL", 3600)))
+
+@st.cache_resource
+def get_agent(api_key):
+    # Um agente por processo: as sessões guardam só o id, não o cliente.
+    # Montado (e o SDK importado) só na primeira geração ou PDF
+    def build():
+        from src.agent import StudyAgent
+        return StudyAgent(api_key, cache=get_response_cache(), gateway=get_gateway(), pool=get_client_pool(),
+                          context_cache=get_context_cache(),
+                          exact_tokens=os.getenv("AGENTSTUDY_TOKEN_COUNT", "local") == "sdk")
+    return LazyObject(build)
+
+@st.cache_resource
+def register_metrics(_agent):
+    # Estatísticas dos componentes compartilhados, lidas pela página de admin
+    REGISTRY.register("response_cache", get_response_cache().stats)
+    REGISTRY.register("gateway", lambda: dict(get_gateway().stats))
+    REGISTRY.register("client_pool", get_client_pool().utilisation)
+    REGISTRY.register("http_cache", get_http_cache().stats)
+    REGISTRY.register("images", lambda: get_images().summary())
+    if get_course_index() is not None:
+        REGISTRY.register("course_dedup", get_course_index().summary)
+    REGISTRY.register("jobs", get_jobs().summary)
+    REGISTRY.register("pdf", pdf_stats)
+    REGISTRY.register("crawler", crawl_stats)
+    REGISTRY.register("mindmap", lambda: dict(MINDMAP_STATS))
+    REGISTRY.register("router", get_router(_agent).summary)
+    # Coletores do agente só leem se ele já foi montado (ler métricas não importa o SDK)
+    REGISTRY.register("tokens", lambda: _agent.usage.stats() if _agent.is_loaded() else {})
+    REGISTRY.register("tokens_by_kind", lambda: _agent.usage.by_kind() if _agent.is_loaded() else {})
+    REGISTRY.register("compression", lambda: dict(_agent.compressor.stats) if _agent.is_loaded() else {})
+    if get_context_cache() is not None:
+        REGISTRY.register("context_cache", get_context_cache().summary)
+    return True
+
+def pdf_stats():
+    # PDF_STATS mora em src.agent: sem agente carregado, não há o que mostrar
+    agent_module = sys.modules.get("src.agent")
+    return dict(agent_module.PDF_STATS) if agent_module is not None else {}
+
+def crawl_stats():
+    crawler_module = sys.modules.get("src.crawler")
+    return dict(crawler_module.CRAWL_STATS) if crawler_module is not None else {}
+
+# Perfil de um único rerun com ?profile=1 (só se AGENTSTUDY_PROFILING=1)
+PROFILING = os.getenv("AGENTSTUDY_PROFILING") == "1"
+
+def get_owner():
+    # Identificador do navegador na URL (?u=...), para reencontrar as disciplinas
+    owner = st.query_params.get("u")
+    if not owner:
+        owner = uuid.uuid4().hex
+        st.query_params["u"] = owner
+    return owner
+
+# Orçamento de tokens do contexto enviado em cada turno do chat
+CONTEXT_TOKENS = int(os.getenv("AGENTSTUDY_CONTEXT_TOKENS", 6000))
+# Mensagens do chat carregadas por vez ("Carregar anteriores" busca mais)
+MESSAGES_PAGE = int(os.getenv("AGENTSTUDY_MESSAGES_PAGE", 20))
+
+def pdf_download(agent, content, label, file_name, key):
+    # PDF sob demanda: só renderiza quando pedido; depois fica no cache do processo
+    if agent.has_pdf(content) or st.button(f"📄 Preparar {file_name}", key=f"gen_{key}"):
+        st.download_button(label, agent.generate_pdf(content), file_name, "application/pdf", key=key)
+
 def extract_name_smart(roadmap_text):
     for line in roadmap_text.split('\n'):
         if line.strip().startswith('#'):
             return line.replace('#', '').strip()[:30]
     return "Nova Disciplina"
 
+# Artefatos gerados em paralelo logo depois do plano de ensino
+# (mindmap, pdf, exercises, lessons — os dois últimos são por módulo; o mapa mental
+# local já sai junto com a disciplina, "mindmap" aqui pede a versão enriquecida pelo LLM)
+PREPARE_ARTIFACTS = tuple(a.strip() for a in os.getenv("AGENTSTUDY_PREPARE", "pdf").split(",") if a.strip())
+
+@st.cache_resource
+def get_jobs():
+    # Gerações longas rodam fora do script do Streamlit, com concorrência limitada
+    return JobQueue(max_workers=int(os.getenv("AGENTSTUDY_JOB_WORKERS", 4)),
+                    max_queued=int(os.getenv("AGENTSTUDY_JOB_QUEUE", 64)))
+
+def create_course(agent, store, jobs, owner, roadmap, source=None):
+    """source: disciplina (de outro aluno) com a mesma ementa; mapa e materiais dela são copiados."""
+    # Roda na thread do job: nada de st.* aqui
+    s_id = store.create_session(owner, extract_name_smart(roadmap), roadmap)
+    origin = store.get_session(source) if source is not None else None
+    ready = set()
+    if origin is not None:
+        ready = store.copy_artifacts(source, s_id)
+        if origin.get("mindmap"):
+            ready.add("mindmap")
+    store.set_mindmap(s_id, origin["mindmap"] if "mindmap" in ready else build_dot(roadmap))
+    todo = tuple(a for a in PREPARE_ARTIFACTS if a not in ready)
+    if todo:
+        def prepare(job):
+            def save(kind, module, value):
+                # Cada artefato é gravado assim que fica pronto
+                if kind == "mindmap":
+                    store.set_mindmap(s_id, value)
+                elif kind in ("exercises", "lessons"):
+                    store.set_artifact(s_id, kind, module, value)
+                job.update(message=f"{kind} pronto")
+            from src.async_agent import prepare_artifacts
+            prepare_artifacts(agent, roadmap, todo, index=store.get_index(s_id), on_result=save)
+        jobs.submit("artifacts", prepare, session_id=s_id, key=f"artifacts:{s_id}")
+    return s_id
+
+def submit_ingestion(agent, owner, url=None, pdf_bytes=None, crawl=False):
+    store, jobs, http_cache, courses = get_store(), get_jobs(), get_http_cache(), get_course_index()
+    source = url.encode('utf-8') if url else pdf_bytes
+    key = f"ingest:{owner}:{'crawl:' if crawl and url else ''}{hashlib.sha256(source).hexdigest()}"
+
+    def run(job):
+        # Mesma URL processada há pouco (por qualquer aluno): nem baixa a página.
+        # Na varredura o atalho não vale: o plano guardado pode ter vindo só da página colada
+        match = courses.lookup_url(url) if courses is not None and url and not crawl else None
+        raw = fp = None
+        if match is None and crawl and url:
+            job.update(0.1, "Lendo a página da disciplina...")
+            crawler = make_crawler(http_cache)
+
+            def progress(page, result):
+                job.update(0.1 + 0.3 * len(result.pages) / crawler.max_pages,
+                           f"Lendo a disciplina: {len(result.pages)} página(s)...")
+
+            raw = crawler.crawl(url, on_page=progress).context()
+        elif match is None:
+            job.update(0.1, "Lendo a página..." if url else "Lendo o PDF...")
+            from src.scraper import extract_text_from_url, extract_text_from_pdf
+            raw = extract_text_from_url(url, http_cache=http_cache) if url else extract_text_from_pdf(io.BytesIO(pdf_bytes))
+            # Os extratores de PDF devolvem o erro como texto: não pode virar ementa indexada
+            if raw.startswith("Erro PDF"):
+                raise ValueError(raw)
+        if raw is not None and courses is not None:
+            fp = fingerprint(raw)
+            match = courses.lookup_text(raw, fp)
+        if match is not None:
+            job.update(0.8, "Ementa já processada: reaproveitando o plano de ensino...")
+            if raw is not None and url:
+                # Guarda a URL nova apontando para o mesmo plano (próxima vez cai no atalho)
+                courses.add(raw, match.roadmap, match.session_id, url=url, fp=fp)
+            return create_course(agent, store, jobs, owner, match.roadmap, source=match.session_id)
+        job.update(0.4, "Montando o plano de ensino...")
+        roadmap = agent.create_study_roadmap(raw)
+        job.update(0.9, "Salvando a disciplina...")
+        s_id = create_course(agent, store, jobs, owner, roadmap)
+        if courses is not None:
+            courses.add(raw, roadmap, s_id, url=url, fp=fp)
+        return s_id
+
+    st.session_state.pending_job = jobs.submit("ingest", run, key=key).id
+
+@st.cache_resource
+def get_router(_agent):
+    # Classificações ficam em cache no processo; o LLM só entra com AGENTSTUDY_ROUTER_LLM=1 e baixa confiança
+    llm = (lambda text, has_previous: _agent.classify_intent(text, has_previous)) \
+        if os.getenv("AGENTSTUDY_ROUTER_LLM") == "1" else None
+    return IntentRouter(llm=llm, threshold=float(os.getenv("AGENTSTUDY_ROUTER_THRESHOLD", 0.55)))
+
+def submit_answer(agent, s_id, msg):
+    """Gera a resposta da última pergunta em segundo plano; o resultado vai direto para o store."""
+    store = get_store()
+    last = msg["content"]
+
+    def run(job):
+        # Última resposta do tutor antes desta pergunta (base dos seguimentos curtos)
+        history = store.get_messages(s_id, 2)
+        previous = history[0]["content"] if len(history) == 2 and history[0]["role"] == "assistant" else None
+        route = get_router(agent).route(last, has_previous=bool(previous))
+
+        if route.intent == MINDMAP:
+            # Montado localmente a partir do plano de ensino (o LLM só no botão "Enriquecer")
+            store.set_mindmap(s_id, build_dot(store.get_roadmap(s_id)))
+            return {"content": "🗺️ Mapa mental atualizado — veja o painel **Mapa Mental**.", "pdf": None}
+        if route.intent == IMAGE:
+            job.update(message="Desenhando...")
+            ref = get_images().get_or_create(last, agent.generate_didactic_image)
+            if ref:
+                return {"blob": ref.full, "thumb": ref.thumb}
+
+        if route.intent == FOLLOWUP:
+            # Base é a resposta anterior: do material vai só um trecho curto
+            context = store.get_index(s_id).build_context(last, CONTEXT_TOKENS // 4)
+        elif agent.context_cache is not None and agent.context_cache.eligible(store.get_material(s_id)):
+            # Material inteiro cacheado no servidor: o turno só manda a pergunta
+            context = store.get_material(s_id)
+        else:
+            # Só os trechos relevantes do material, dentro do orçamento
+            context = store.get_index(s_id).build_context(last, CONTEXT_TOKENS)
+
+        # O texto parcial fica em job.partial enquanto chega
+        pdf = None
+        if route.intent == FOLLOWUP:
+            stream = agent.stream_followup(last, previous, context)
+        elif route.intent == IMAGE:
+            # Imagem não saiu: explica em texto
+            stream = agent.stream_lesson(last, context, cache_key=s_id)
+        elif route.intent == LESSON:
+            stream, pdf = agent.stream_lesson(last, context, cache_key=s_id), ["📥 Baixar Aula", "Aula.pdf"]
+        elif route.intent == EXERCISES:
+            stream, pdf = agent.stream_exercises(last, context, cache_key=s_id), ["📥 Baixar Exercícios", "Exercicios.pdf"]
+        else:
+            stream, pdf = agent.stream_answer(last, context, cache_key=s_id), ["📥 Baixar Resposta", "Resposta.pdf"]
+        if pdf:
+            # O PDF é montado junto com o texto: fica pronto quando a resposta termina
+            stream = agent.stream_with_pdf(stream)
+        text = ""
+        for piece in stream:
+            text += piece
+            job.update(partial=text)
+        return {"content": text, "pdf": pdf}
+
+    def save(job):
+        if job.status == DONE:
+            result = job.result
+            meta = {k: result[k] for k in ("pdf", "thumb") if result.get(k)}
+            store.add_message(s_id, "assistant", result.get("content"), blob=result.get("blob"), meta=meta or None)
+        elif job.status == CANCELLED:
+            store.add_message(s_id, "assistant", (job.partial + "\n\n" if job.partial else "") + "⏹️ Geração cancelada.")
+        else:
+            # Erro não vira "aula" nem PDF: fica registrado como aviso no chat
+            store.add_message(s_id, "assistant", f"⚠️ {job.error}")
+
+    return get_jobs().submit("chat", run, session_id=s_id, key=f"chat:{s_id}:{msg['id']}", on_done=save)
+
+def submit_mindmap(agent, s_id):
+    store = get_store()
+
+    def run(job):
+        job.update(message="Desenhando estruturas...")
+        return agent.generate_mindmap_code(store.get_material(s_id))
+
+    def save(job):
+        if job.status == DONE:
+            store.set_mindmap(s_id, job.result)
+
+    get_jobs().submit("mindmap", run, session_id=s_id, key=f"mindmap:{s_id}", on_done=save)
+
+PACK_CONCURRENCY = int(os.getenv("AGENTSTUDY_PACK_CONCURRENCY", 4))
+
+def submit_pack(agent, s_id, fmt):
+    """Aula + exercícios de todos os tópicos num arquivo só; seções prontas ficam salvas para retomar."""
+    store = get_store()
+
+    def run(job):
+        artifacts = store.get_artifacts(s_id)
+        # Checkpoints de tentativas anteriores: artifacts "pack.<tipo>" por seção
+        done = {(kind[5:], name): text for kind, items in artifacts.items() if kind.startswith("pack.")
+                for name, text in items.items()}
+        from src.course_pack import CoursePackBuilder
+        result = CoursePackBuilder(agent, max_concurrency=PACK_CONCURRENCY).build(
+            store.get_roadmap(s_id), fmt=fmt, material=store.get_material(s_id), index=store.get_index(s_id),
+            cache_key=s_id, done=done,
+            on_section=lambda section, text: store.set_artifact(s_id, f"pack.{section.kind}", section.key, text),
+            progress=lambda n, total, title: job.update(n / total, f"{n}/{total} · {title}"),
+            check=job.check)
+        store.set_artifact(s_id, "pack_file", fmt, store.put_blob(result.data, fmt))
+        return result
+
+    get_jobs().submit("pack", run, session_id=s_id, key=f"pack:{s_id}:{fmt}")
+
+@st.fragment(run_every=1.0)
+def job_status(job_id, partial=False):
+    # Consulta o job a cada segundo sem rerodar a página inteira
+    job = get_jobs().get(job_id)
+    if job is None:
+        return
+    if not job.active:
+        st.rerun(scope="app")
+    if partial and job.partial:
+        st.markdown(job.partial + " ▌")
+    else:
+        st.progress(job.progress, text=job.message or ("Na fila..." if job.status == "queued" else "Gerando..."))
+    if st.button("⏹️ Cancelar", key=f"cancel_{job.id}"):
+        get_jobs().cancel(job.id)
+
 def main():
     setup_interface()
     load_dotenv()
@@ -75,10 +433,27 @@ def main():
         st.error("⚠️ API Key ausente.")
         st.stop()
 
-    if "sessions" not in st.session_state: st.session_state.sessions = {}
+    store = get_store()
+    owner = get_owner()
+    agent = get_agent(api_key)
+    register_metrics(agent)
+
+    jobs = get_jobs()
 
-    if "sessions" not in st.session_state: st.session_state.sessions = {}
     if "current_session" not in st.session_state: st.session_state.current_session = None
+    if "message_limit" not in st.session_state: st.session_state.message_limit = MESSAGES_PAGE
+    if "pending_job" not in st.session_state: st.session_state.pending_job = None
+
+    # Disciplina nova que terminou de ser montada em segundo plano
+    pending = jobs.get(st.session_state.pending_job) if st.session_state.pending_job else None
+    ingest_error = None
+    if pending is not None and not pending.active:
+        st.session_state.pending_job = None
+        if pending.status == DONE:
+            st.session_state.current_session = pending.result
+            st.session_state.message_limit = MESSAGES_PAGE
+        elif pending.status != CANCELLED:
+            ingest_error = pending.error
 
     # --- SIDEBAR ---
     with st.sidebar:
@@ -88,33 +463,41 @@ def main():
             st.rerun()
         st.markdown("---")
         
-        if not st.session_state.sessions:
+        sessions = store.list_sessions(owner)
+        if not sessions:
             st.info("Nenhuma disciplina.")
         else:
-            sorted_sessions = sorted(st.session_state.sessions.items(), key=lambda x: x[1].get('pinned', False), reverse=True)
-            for s_id, data in sorted_sessions:
+            for item in sessions:
+                s_id, name = item['id'], item['name']
                 c1, c2 = st.columns([0.85, 0.15])
                 with c1:
-                    icon = "📌" if data.get('pinned') else "📚"
+                    icon = "⏳" if jobs.jobs_for(s_id) else ("📌" if item['pinned'] else "📚")
                     b_type = "primary" if st.session_state.current_session == s_id else "secondary"
-                    if st.button(f"{icon} {s_id}", key=f"nav_{s_id}", use_container_width=True, type=b_type):
+                    if st.button(f"{icon} {name}", key=f"nav_{s_id}", use_container_width=True, type=b_type):
                         st.session_state.current_session = s_id
+                        st.session_state.message_limit = MESSAGES_PAGE
                         st.rerun()
                 with c2:
                     with st.popover("⋮"):
-                        new_n = st.text_input("Renomear", value=s_id, key=f"ren_{s_id}")
-                        if new_n != s_id:
-                            st.session_state.sessions[new_n] = st.session_state.sessions.pop(s_id)
-                            st.session_state.sessions[new_n]['name'] = new_n
-                            if st.session_state.current_session == s_id: st.session_state.current_session = new_n
+                        new_n = st.text_input("Renomear", value=name, key=f"ren_{s_id}")
+                        if new_n != name:
+                            store.rename(s_id, new_n)
                             st.rerun()
                         if st.button("Fixar", key=f"pin_{s_id}"):
-                            data['pinned'] = not data.get('pinned', False); st.rerun()
+                            store.set_pinned(s_id, not item['pinned']); st.rerun()
                         if st.button("Excluir", key=f"del_{s_id}"):
-                            del st.session_state.sessions[s_id]
+                            jobs.cancel_session(s_id)
+                            store.delete(s_id)
+                            # Sem agente montado neste processo não há cache de contexto para liberar
+                            if get_context_cache() is not None and agent.is_loaded():
+                                get_context_cache().expire(agent.client, s_id)
                             if st.session_state.current_session == s_id: st.session_state.current_session = None
                             st.rerun()
 
+    # Sessão apagada em outra aba
+    if st.session_state.current_session is not None and store.get_session(st.session_state.current_session) is None:
+        st.session_state.current_session = None
+
     # --- TELA 1: LANDING ---
     if st.session_state.current_session is None:
         st.markdown("<br><br>", unsafe_allow_html=True)
@@ -126,61 +509,109 @@ def main():
             tab_link, tab_pdf = st.tabs(["🔗 Link", "📂 PDF"])
             with tab_link:
                 c_in, c_bt = st.columns([3.5, 1.5])
-                with c_in: url = st.text_input("URL", placeholder="https://...", label_visibility="collapsed")
+                with c_in:
+                    url = st.text_input("URL", placeholder="https://...", label_visibility="collapsed")
+                    crawl = st.checkbox("🕸️ Seguir os links da disciplina (ementa, plano, PDFs)",
+                                        value=os.getenv("AGENTSTUDY_CRAWL", "0") == "1")
                 with c_bt:
-                    if st.button("🔍 Buscar"):
+                    if st.button("🔍 Buscar", disabled=pending is not None):
                         if url:
-                            with st.spinner("Analisando..."):
-                                try:
-                                    raw = extract_text_from_url(url)
-                                    agent = StudyAgent(api_key)
-                                    roadmap = agent.create_study_roadmap(raw)
-                                    name = extract_name_smart(roadmap)
-                                    st.session_state.sessions[name] = {"name": name, "roadmap": roadmap, "agent": agent, "messages": [], "pinned": False}
-                                    st.session_state.current_session = name
-                                    st.rerun()
-                                except Exception as e: st.error(f"Erro: {e}")
+                            try:
+                                submit_ingestion(agent, owner, url=url, crawl=crawl)
+                                st.rerun()
+                            except QueueFullError as e: st.error(f"Erro: {e}")
             with tab_pdf:
                 up = st.file_uploader("PDF", type="pdf", label_visibility="collapsed")
-                if st.button("📂 Processar"):
+                if st.button("📂 Processar", disabled=pending is not None):
                     if up:
-                        with st.spinner("Lendo..."):
-                            try:
-                                raw = extract_text_from_pdf(up)
-                                agent = StudyAgent(api_key)
-                                roadmap = agent.create_study_roadmap(raw)
-                                name = extract_name_smart(roadmap)
-                                st.session_state.sessions[name] = {"name": name, "roadmap": roadmap, "agent": agent, "messages": [], "pinned": False}
-                                st.session_state.current_session = name
-                                st.rerun()
-                            except Exception as e: st.error(f"Erro: {e}")
+                        try:
+                            submit_ingestion(agent, owner, pdf_bytes=up.getvalue())
+                            st.rerun()
+                        except QueueFullError as e: st.error(f"Erro: {e}")
+
+            # Ingestão em andamento (roda em segundo plano; a página continua respondendo)
+            if st.session_state.pending_job:
+                job_status(st.session_state.pending_job)
+            if ingest_error:
+                st.error(f"Erro: {ingest_error}")
             st.markdown("<br><p style='text-align:center; color:#9CA3AF;'>Suporta: Júpiter Web, SIGAA, Moodle e outros.</p>", unsafe_allow_html=True)
 
     # --- TELA 2: WORKSPACE (SPLIT VIEW) ---
     else:
         s_id = st.session_state.current_session
-        data = st.session_state.sessions[s_id]
+        data = store.get_session(s_id)
+        material = store.get_material(s_id)
         
         # Header da Matéria
         c_title, c_dl = st.columns([5, 1.5])
         with c_title: st.markdown(f"## 🎓 {data['name']}")
         with c_dl:
-            pdf = data['agent'].generate_pdf(data['roadmap'])
-            st.download_button("📥 Baixar Resumo (PDF)", pdf, "Resumo.pdf", "application/pdf")
+            pdf_download(agent, material, "📥 Baixar Resumo (PDF)", "Resumo.pdf", "dl_roadmap")
 
             # --- FEATURE: MAPA MENTAL ---
         with st.expander("🧠 Mapa Mental (Visualização)"):
-            if data.get('mindmap'):
-                st.graphviz_chart(data['mindmap'])
+            dot = data.get('mindmap')
+            if not dot:
+                # Disciplinas antigas: monta do plano de ensino na hora (sem LLM)
+                dot = build_dot(store.get_roadmap(s_id))
+                store.set_mindmap(s_id, dot)
+            # Layout feito uma vez por grafo no servidor; sem Graphviz, o navegador desenha
+            svg = render_svg(dot)
+            if svg: st.image(svg, width="stretch")
+            else: st.graphviz_chart(dot)
+
+            mind_job = jobs.find(f"mindmap:{s_id}")
+            if mind_job is not None and mind_job.active:
+                job_status(mind_job.id)
             else:
-                if st.button("Gerar Mapa Mental Agora"):
-                    with st.spinner("Desenhando estruturas..."):
-                        try:
-                            dot_code = data['agent'].generate_mindmap_code(data['roadmap'])
-                            data['mindmap'] = dot_code
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Erro ao gerar mapa: {e}")
+                if mind_job is not None and mind_job.error:
+                    st.error(f"Erro ao gerar mapa: {mind_job.error}")
+                if st.button("✨ Enriquecer com IA", help="Pede ao Gemini um mapa a partir do material completo"):
+                    try:
+                        submit_mindmap(agent, s_id)
+                        st.rerun()
+                    except QueueFullError as e:
+                        st.error(f"Erro ao gerar mapa: {e}")
+
+        # --- MATERIAIS PREPARADOS POR MÓDULO ---
+        artifacts = store.get_artifacts(s_id)
+        if artifacts.get("lessons") or artifacts.get("exercises"):
+            with st.expander("📚 Materiais por Módulo"):
+                for kind, lbl in (("lessons", "Aula"), ("exercises", "Exercícios")):
+                    for i, (module, text) in enumerate(artifacts.get(kind, {}).items()):
+                        st.markdown(f"**{lbl} — {module}**")
+                        pdf_download(agent, text, f"📥 Baixar {lbl}", f"{lbl}_{i + 1}.pdf", f"art_{kind}_{i}")
+                # Apostila: plano de ensino + aulas + listas num PDF só (partes lidas sob demanda)
+                if st.button("📄 Preparar Apostila.pdf", key="gen_booklet"):
+                    parts = [("Plano de Ensino", material)]
+                    for kind, lbl in (("lessons", "Aula"), ("exercises", "Exercícios")):
+                        parts += [(f"{lbl} — {module}", text) for module, text in artifacts.get(kind, {}).items()]
+                    st.download_button("📥 Baixar Apostila", agent.generate_booklet(iter(parts)), "Apostila.pdf",
+                                       "application/pdf", key="dl_booklet")
+
+        # --- PACOTE DA DISCIPLINA (todas as aulas e listas) ---
+        with st.expander("📦 Pacote da Disciplina"):
+            fmt = st.radio("Formato", ["pdf", "zip"], horizontal=True, key="pack_fmt",
+                           format_func=lambda f: "PDF único" if f == "pdf" else "ZIP (um PDF por seção)")
+            pack_job = jobs.find(f"pack:{s_id}:{fmt}")
+            if pack_job is not None and pack_job.active:
+                job_status(pack_job.id)
+            else:
+                if pack_job is not None and pack_job.status == DONE and pack_job.result.errors:
+                    st.warning(f"⚠️ {len(pack_job.result.errors)} seções falharam. Gere de novo: só elas serão refeitas.")
+                elif pack_job is not None and pack_job.error:
+                    st.error(f"Erro: {pack_job.error}")
+                blob = artifacts.get("pack_file", {}).get(fmt)
+                if blob and os.path.exists(store.blob_path(blob)):
+                    with open(store.blob_path(blob), "rb") as f:
+                        st.download_button("📥 Baixar Pacote", f.read(), f"Pacote.{fmt}",
+                                           "application/pdf" if fmt == "pdf" else "application/zip", key="dl_pack")
+                if st.button("⚙️ Gerar Pacote" if not blob else "🔄 Gerar de novo", key="gen_pack"):
+                    try:
+                        submit_pack(agent, s_id, fmt)
+                        st.rerun()
+                    except QueueFullError as e:
+                        st.error(f"Erro: {e}")
 
         # --- O NOVO LAYOUT DE ESTUDO (SPLIT) ---
         # Coluna Esquerda (1.3): Conteúdo de Estudo
@@ -191,7 +622,7 @@ def main():
             st.markdown("### 📖 Material de Estudo")
             # Área de conteúdo rolável
             with st.container(height=600):
-                st.markdown(data['roadmap'])
+                st.markdown(material)
         
         with col_chat:
             st.markdown("### 💬 Tutor Virtual")
@@ -200,10 +631,28 @@ def main():
             # Container com altura fixa para rolar as mensagens
             chat_container = st.container(height=480)
             with chat_container:
-                for msg in data['messages']:
+                # Só a página mais recente do histórico vai para a tela
+                if store.count_messages(s_id) > st.session_state.message_limit:
+                    if st.button("⬆️ Carregar anteriores", key="more_msgs"):
+                        st.session_state.message_limit += MESSAGES_PAGE
+                        st.rerun()
+                messages = store.get_messages(s_id, st.session_state.message_limit)
+                for msg in messages:
                     with st.chat_message(msg["role"]):
-                        if isinstance(msg["content"], bytes): st.image(msg["content"])
+                        if msg["image"]:
+                            # Histórico leva só a miniatura; o original vai ao navegador quando pedido
+                            full_key = f"full_{msg['id']}"
+                            show_full = st.session_state.get(full_key) or not msg.get("thumb")
+                            st.image(store.blob_path(msg["image"] if show_full else msg["thumb"]))
+                            if msg.get("thumb") and st.button("🔍 Tamanho original" if not show_full else "↩️ Miniatura",
+                                                              key=f"btn_{full_key}"):
+                                st.session_state[full_key] = not show_full
+                                st.rerun()
                         else: st.markdown(msg["content"])
+                        # Botão de download aparece no chat
+                        if msg.get("pdf"):
+                            lbl, fn = msg["pdf"]
+                            pdf_download(agent, msg["content"], lbl, fn, f"d_{msg['id']}")
 
             # Input e Clips (Abaixo do chat)
             c_clip, c_in = st.columns([0.15, 0.85])
@@ -211,8 +660,9 @@ def main():
                 with st.popover("📎"):
                     extra = st.file_uploader("PDF", type="pdf", key="chat_up")
                     if extra and st.button("Enviar"):
+                        from src.scraper import extract_text_from_pdf
                         txt = extract_text_from_pdf(extra)
-                        data['roadmap'] += f"\n\n[ANEXO]: {txt}"
+                        store.add_attachment(s_id, txt)
                         st.success("Adicionado!"); st.rerun()
             
             with c_in:
@@ -220,46 +670,25 @@ def main():
 
             # Lógica de Resposta
             if prompt:
-                data['messages'].append({"role": "user", "content": prompt})
+                store.add_message(s_id, "user", prompt)
                 st.rerun()
 
-            if data['messages'] and data['messages'][-1]["role"] == "user":
-                # Mostra o spinner DENTRO da coluna do chat
+            last_msg = messages[-1] if messages else None
+            if last_msg and last_msg["role"] == "user":
+                # Resposta gerada em segundo plano; o texto parcial aparece DENTRO da coluna do chat
                 with chat_container:
                     with st.chat_message("assistant"):
-                        with st.spinner("Processando..."):
-                            agent = data['agent']
-                            context = data['roadmap']
-                            last = data['messages'][-1]["content"]
-                            p_low = last.lower()
-                            
-                            # Roteamento
-                            if any(x in p_low for x in ["imagem", "desenho"]):
-                                img = agent.generate_didactic_image(last)
-                                if img:
-                                    st.image(img); data['messages'].append({"role": "assistant", "content": img})
-                                else:
-                                    resp = agent.generate_lesson(last, context)
-                                    st.markdown(resp); data['messages'].append({"role": "assistant", "content": resp})
-                            elif any(x in p_low for x in ["exercício", "questão"]):
-                                resp = agent.generate_exercises(last, context)
-                                lbl, fn = "📥 Baixar Exercícios", "Exercicios.pdf"
-                                st.markdown(resp); data['messages'].append({"role": "assistant", "content": resp})
-                                pdf = agent.generate_pdf(resp)
-                                # Botão de download aparece no chat
-                                st.download_button(lbl, pdf, fn, "application/pdf", key=f"d_{len(data['messages'])}")
-                            elif any(x in p_low for x in ["aula", "expli"]):
-                                resp = agent.generate_lesson(last, context)
-                                lbl, fn = "📥 Baixar Aula", "Aula.pdf"
-                                st.markdown(resp); data['messages'].append({"role": "assistant", "content": resp})
-                                pdf = agent.generate_pdf(resp)
-                                st.download_button(lbl, pdf, fn, "application/pdf", key=f"d_{len(data['messages'])}")
-                            else:
-                                resp = agent.answer_doubt(last, context)
-                                lbl, fn = "📥 Baixar Resposta", "Resposta.pdf"
-                                st.markdown(resp); data['messages'].append({"role": "assistant", "content": resp})
-                                pdf = agent.generate_pdf(resp)
-                                st.download_button(lbl, pdf, fn, "application/pdf", key=f"d_{len(data['messages'])}")
+                        previous = jobs.find(f"chat:{s_id}:{last_msg['id']}")
+                        if previous is not None and not previous.active and previous.error:
+                            # Nem a resposta nem o aviso foram gravados: não tenta de novo em loop
+                            st.warning(f"⚠️ {previous.error}")
+                        else:
+                            try:
+                                job = submit_answer(agent, s_id, last_msg)
+                                job_status(job.id, partial=True)
+                            except QueueFullError as e:
+                                st.warning(f"⚠️ {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profile("rerun", PROFILING and st.query_params.get("profile") == "1"), span("streamlit.rerun"):
+        main()
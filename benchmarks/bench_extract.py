@@ -0,0 +1,78 @@
+"""
+Extração de texto de PDF: leitura serial x pool de processos (spawn).
+
+Uso:
+    python benchmarks/bench_extract.py [--repeat 3] [--workers 4] [--pages 5,40,150]
+
+Para cada PDF do corpus e cada backend (pdfium, pypdf), mede o texto inteiro e
+o orçamento usado no app (60 mil caracteres), em série e forçando o pool
+(parallel_after=0). Mostra também quanto custa só subir o pool: parallel_after
+só compensa quando o restante estimado passa bem desse valor.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from suite import make_pdf
+
+from src import pdf_extract
+
+BUDGET = 60000
+
+
+def _noop():
+    return None
+
+
+def pool_startup(workers: int, repeat: int) -> float:
+    """Mediana de subir o pool (spawn) e rodar uma tarefa vazia em cada processo."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for future in [pool.submit(_noop) for _ in range(workers)]:
+                future.result()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def median_seconds(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração de texto de PDF")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições por medida")
+    parser.add_argument("--workers", type=int, default=4, help="processos do pool")
+    parser.add_argument("--pages", default="5,40,150", help="tamanhos de PDF do corpus (páginas)")
+    args = parser.parse_args()
+
+    backends = ["pypdf"] + (["pdfium"] if pdf_extract.pypdfium2 is not None else [])
+    print(f"subir o pool ({args.workers} processos): {pool_startup(args.workers, args.repeat) * 1000:.0f} ms\n")
+    print(f"{'pdf':<8}{'backend':<9}{'orçamento':>11}{'páginas':>9}{'serial':>10}{'pool':>10}")
+    for pages in (int(p) for p in args.pages.split(",")):
+        with open(make_pdf(pages), "rb") as f:
+            data = f.read()
+        for backend in backends:
+            for label, budget in (("inteiro", 10 ** 9), ("60k", BUDGET)):
+                read = pdf_extract.extract_pdf(data, budget, backend).pages_read
+                serial = median_seconds(lambda: pdf_extract.extract_pdf(data, budget, backend), args.repeat)
+                pool = median_seconds(lambda: pdf_extract.extract_pdf(data, budget, backend, workers=args.workers,
+                                                                      parallel_after=0), args.repeat)
+                print(f"{pages:>4}p   {backend:<9}{label:>11}{read:>9}{serial * 1000:>8.0f}ms{pool * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
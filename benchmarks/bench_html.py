@@ -0,0 +1,105 @@
+"""
+Compara o _extract_from_html atual com a versão antiga (várias passadas, html.parser)
+sobre o corpus de páginas salvas em benchmarks/corpus/html.
+
+Uso:
+    python benchmarks/bench_html.py [--repeat 20]
+
+Verifica também se o texto extraído é idêntico ao da versão antiga
+(com o mesmo parser; com lxml podem surgir diferenças de parsing de HTML quebrado).
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from src import scraper
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "html")
+BASE_URL = "https://sigaa.exemplo.edu.br/sigaa/public/"
+
+
+def legacy_extract_from_html(html_content, base_url) -> str:
+    """Cópia fiel da implementação anterior, usada como referência."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    text_lower = soup.get_text().lower()
+    login_keywords = ['digite sua senha', 'esqueci minha senha', 'acesso ao sistema', 'login', 'usuário e senha', 'sigaa - sistema integrado']
+    if len(text_lower) < 1000 and any(k in text_lower for k in login_keywords):
+        raise ValueError("🔒 Este link leva para uma tela de Login. \n\n💡 SOLUÇÃO: Entre no site, aperte Ctrl+P > 'Salvar como PDF' e suba na aba 'Via Arquivo'.")
+    junk_tags = ["script", "style", "nav", "footer", "iframe", "noscript", "svg", "button", "input", "select", "meta", "link", "aside"]
+    for tag in soup(junk_tags):
+        tag.decompose()
+    for div in soup.find_all("div", class_=lambda x: x and any(y in x.lower() for y in ['cookie', 'popup', 'advert', 'banner', 'sidebar'])):
+        div.decompose()
+    for a in soup.find_all('a', href=True):
+        link = a['href']
+        text = a.get_text(strip=True)
+        if link and text and len(text) > 3:
+            a.string = f"{text} [LINK: {urljoin(base_url, link)}]"
+    content = soup.find('main') or soup.find('article') or soup.find('div', id=lambda x: x and 'content' in x.lower()) or soup.body
+    if not content: content = soup
+    raw_text = content.get_text(separator='\n')
+    clean_lines = [line.strip() for line in raw_text.splitlines() if line.strip()]
+    final_text = '\n'.join(clean_lines)
+    if len(final_text) < 200:
+        raise ValueError("O site é protegido. Salve a página como PDF (Ctrl+P) e use a opção 'Via Arquivo'.")
+    return final_text[:50000]
+
+
+def _run(fn, html):
+    try:
+        return fn(html, BASE_URL)
+    except ValueError as e:
+        return f"<ValueError: {e}>"
+
+
+def _time(fn, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        _run(fn, html)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(os.path.join(CORPUS, "*.html")))
+    parsers = ["html.parser"] + (["lxml"] if scraper.HTML_PARSER == "lxml" else [])
+    default_parser = scraper.HTML_PARSER
+
+    header = f"{'página':<28} {'KB':>6} {'antigo (ms)':>12}" + ''.join(f" {p + ' (ms)':>16}" for p in parsers) + f" {'idêntico':>9}"
+    print(header)
+    total_old = 0.0
+    total_new = {p: 0.0 for p in parsers}
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        old_ms = _time(legacy_extract_from_html, html, args.repeat)
+        total_old += old_ms
+        row = f"{os.path.basename(path)[:28]:<28} {len(html) / 1024:>6.0f} {old_ms:>12.2f}"
+        same = None
+        for p in parsers:
+            scraper.HTML_PARSER = p
+            new_ms = _time(scraper._extract_from_html, html, args.repeat)
+            total_new[p] += new_ms
+            row += f" {new_ms:>16.2f}"
+            if p == "html.parser":
+                same = _run(legacy_extract_from_html, html) == _run(scraper._extract_from_html, html)
+        scraper.HTML_PARSER = default_parser
+        print(row + f" {'sim' if same else 'NÃO':>9}")
+
+    print()
+    for p in parsers:
+        print(f"Speedup total ({p}): {total_old / total_new[p]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
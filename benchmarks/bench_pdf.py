@@ -0,0 +1,157 @@
+"""
+Compara o renderizador de PDF atual (src/pdf_render.py) com o antigo
+(replace em cadeia + latin-1 + multi_cell por parágrafo) numa aula longa,
+montada repetindo benchmarks/corpus/responses/lesson.md até ~100 páginas.
+
+Uso:
+    python benchmarks/bench_pdf.py [--pages 100] [--repeat 3]
+
+Mede também o render incremental (texto chegando em pedaços, como no
+streaming), a apostila com várias partes e quantos caracteres fora do
+latin-1 (letras gregas, símbolos) cada versão preservou.
+"""
+import argparse
+import io
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fpdf import FPDF
+from pypdf import PdfReader
+
+from fake_genai import _load
+from src import pdf_render
+
+HEADER = pdf_render.PDF_HEADER
+UNICODE_SAMPLE = "\n\nNotação: α, β, γ, Δx → 0, ∑ aᵢ ≤ ∫ f(x) dx, x ≠ y, π ≈ 3,14.\n\n"
+
+
+def legacy_render_pdf(content: str) -> bytes:
+    """Cópia fiel da implementação anterior, usada como referência."""
+    class PDF(FPDF):
+        def header(self):
+            self.set_font('Arial', 'B', 10)
+            self.set_text_color(100, 100, 100)
+            self.cell(0, 10, HEADER, 0, 1, 'R')
+            self.set_draw_color(220, 220, 220)
+            self.line(10, 20, 200, 20)
+            self.ln(10)
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.set_text_color(128, 128, 128)
+            self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+
+    pdf = PDF()
+    pdf.set_margins(20, 20, 20)
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=20)
+    clean_content = re.sub(r'(Página \d+|Page \d+)', '', content, flags=re.IGNORECASE)
+    clean_content = clean_content \
+        .replace('**', '') \
+        .replace('__', '') \
+        .replace('`', '') \
+        .replace('##', '')
+    replacements = {
+        '–': '-', '—': '-', '“': '"', '”': '"', '’': "'", '‘': "'", '…': '...', '•': '-'
+    }
+    for char, repl in replacements.items():
+        clean_content = clean_content.replace(char, repl)
+    safe_content = clean_content.encode('latin-1', 'ignore').decode('latin-1')
+    w_eff = pdf.epw
+    for p in safe_content.split('\n\n'):
+        p = p.strip()
+        if not p: continue
+        fluent_p = p.replace('\n', ' ')
+        if p.startswith('#'):
+            clean_title = p.replace('#', '').strip()
+            pdf.set_font("Arial", 'B', 14)
+            pdf.set_text_color(0, 0, 0)
+            pdf.ln(4)
+            pdf.multi_cell(w_eff, 7, clean_title.upper())
+            pdf.ln(2)
+        elif p.startswith('- ') or p.startswith('* '):
+            pdf.set_font("Arial", '', 11)
+            pdf.set_text_color(30, 30, 30)
+            for item in p.split('\n'):
+                clean_item = item.replace('- ', '').replace('* ', '').strip()
+                if clean_item:
+                    pdf.set_x(25)
+                    pdf.multi_cell(w_eff - 5, 6, f"- {clean_item}")
+            pdf.ln(2)
+        else:
+            pdf.set_font("Arial", '', 11)
+            pdf.set_text_color(40, 40, 40)
+            pdf.multi_cell(w_eff, 6, fluent_p)
+            pdf.ln(3)
+    return bytes(pdf.output(dest='S'))
+
+
+def long_lesson(pages: int) -> str:
+    """Repete a aula gravada até dar ~`pages` páginas no renderizador antigo."""
+    base = _load("lesson.md") + UNICODE_SAMPLE
+    per_copy = len(PdfReader(io.BytesIO(legacy_render_pdf(base))).pages)
+    return base * max(1, round(pages / per_copy))
+
+
+def streamed(text: str, size: int = 40) -> bytes:
+    renderer = pdf_render.PdfRenderer()
+    for i in range(0, len(text), size):
+        renderer.feed(text[i:i + size])
+    return renderer.finish()
+
+
+def booklet(text: str, parts: int = 4) -> bytes:
+    step = len(text) // parts
+    return pdf_render.render_booklet(
+        (f"Parte {n + 1}", (text[i:i + 4096] for i in range(n * step, (n + 1) * step, 4096))) for n in range(parts))
+
+
+def measure(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, statistics.median(times), peak
+
+
+def kept_unicode(pdf_bytes: bytes) -> int:
+    text = "".join(page.extract_text() for page in PdfReader(io.BytesIO(pdf_bytes)).pages)
+    return sum(text.count(c) for c in "αβγΔ∑∫≤≠π≈→")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do renderizador de PDF")
+    parser.add_argument("--pages", type=int, default=100, help="tamanho aproximado da aula (páginas)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições por medida")
+    args = parser.parse_args()
+
+    text = long_lesson(args.pages)
+    fonts = pdf_render.find_fonts()
+    print(f"Aula: {len(text) / 1024:.0f} KB | fontes: {fonts.get('', 'core (latin-1)')}")
+    print(f"{'versão':<14}{'páginas':>9}{'mediana':>11}{'pico mem':>11}{'unicode':>9}")
+    rows = (
+        ("antigo", lambda: legacy_render_pdf(text)),
+        ("novo", lambda: pdf_render.render_markdown(text)),
+        ("incremental", lambda: streamed(text)),
+        ("apostila x4", lambda: booklet(text)),
+    )
+    for name, fn in rows:
+        out, med, peak = measure(fn, args.repeat)
+        pages = len(PdfReader(io.BytesIO(out)).pages)
+        print(f"{name:<14}{pages:>9}{med * 1000:>9.0f}ms{peak / 1024 / 1024:>9.1f}MB{kept_unicode(out):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compara o contexto completo (comportamento antigo: roteiro + todos os anexos)
+com o contexto recuperado pelo ContextIndex.
+
+Uso:
+    python benchmarks/bench_retrieval.py [--anexos 3] [--budget 6000] [--live]
+
+Com --live (e GOOGLE_API_KEY definida) mede também a latência real do answer_doubt.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.retrieval import ContextIndex, estimate_tokens
+
+TERMOS = [
+    "derivada", "integral", "limite", "continuidade", "matriz", "autovalor", "grafo", "árvore",
+    "complexidade", "recursão", "entropia", "termodinâmica", "enzima", "mitose", "proteína",
+    "transformada", "série", "probabilidade", "variância", "regressão", "compilador", "memória",
+]
+
+PERGUNTAS = [
+    "Explique a relação entre derivada e continuidade",
+    "Como calcular autovalor de uma matriz?",
+    "Qual a complexidade de percorrer uma árvore?",
+    "O que a bibliografia recomenda sobre entropia?",
+    "Me dê exercícios sobre regressão e variância",
+]
+
+
+def _paragrafo(rng, n_palavras=80):
+    return ' '.join(rng.choice(TERMOS + ["o", "de", "conceito", "teoria", "aplicação", "exemplo"])
+                    for _ in range(n_palavras)) + '.'
+
+
+def make_roadmap(rng, modulos=8):
+    parts = ["# Disciplina Sintética - Plano de Ensino", "## 🎯 Ementa e Objetivos Acadêmicos", _paragrafo(rng)]
+    parts.append("## 🗓️ Cronograma Semestral (Deep Dive)")
+    for i in range(1, modulos + 1):
+        parts.append(f"### Módulo {i}: {rng.choice(TERMOS).title()}")
+        parts.append('\n'.join(f"- {_paragrafo(rng, 12)}" for _ in range(4)))
+        parts.append(_paragrafo(rng, 120))
+    return '\n\n'.join(parts)
+
+
+def make_attachment(rng, chars=60000):
+    text = []
+    size = 0
+    while size < chars:
+        p = _paragrafo(rng, 120)
+        text.append(p)
+        size += len(p) + 2
+    return '\n\n'.join(text)[:chars]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--anexos", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=6000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    roadmap = make_roadmap(rng)
+    anexos = [make_attachment(rng) for _ in range(args.anexos)]
+
+    # Comportamento antigo: tudo concatenado
+    full = roadmap + ''.join(f"\n\n[ANEXO]: {a}" for a in anexos)
+
+    t0 = time.perf_counter()
+    index = ContextIndex()
+    index.add(roadmap)
+    build_roadmap = time.perf_counter() - t0
+    insert_times = []
+    for a in anexos:
+        t0 = time.perf_counter()
+        index.add(a, source='anexo')
+        insert_times.append(time.perf_counter() - t0)
+
+    print(f"Blocos indexados: {len(index)}")
+    print(f"Indexação do roteiro: {build_roadmap * 1000:.1f} ms")
+    if insert_times:
+        print(f"Inserção incremental por anexo: {sum(insert_times) / len(insert_times) * 1000:.1f} ms")
+    print()
+    print(f"{'pergunta':<50} {'completo (tok)':>14} {'recuperado (tok)':>16} {'redução':>8} {'busca (ms)':>10}")
+
+    agent = None
+    if args.live and os.getenv("GOOGLE_API_KEY"):
+        from src.agent import StudyAgent
+        agent = StudyAgent(os.getenv("GOOGLE_API_KEY"))
+
+    for q in PERGUNTAS:
+        t0 = time.perf_counter()
+        ctx = index.build_context(q, token_budget=args.budget)
+        search_ms = (time.perf_counter() - t0) * 1000
+        full_tok = estimate_tokens(full)
+        ctx_tok = estimate_tokens(ctx)
+        print(f"{q[:50]:<50} {full_tok:>14} {ctx_tok:>16} {1 - ctx_tok / full_tok:>7.0%} {search_ms:>10.2f}")
+
+        if agent is not None:
+            for label, c in (("completo", full), ("recuperado", ctx)):
+                t0 = time.perf_counter()
+                agent.answer_doubt(q, c)
+                print(f"    latência LLM ({label}): {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
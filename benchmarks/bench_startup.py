@@ -0,0 +1,137 @@
+"""
+Partida a frio: quanto custa importar o app.py e renderizar a tela inicial
+num processo novo (como um contêiner recém-escalado).
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 5] [--budget-ms 800] [--render-budget-ms 3000]
+
+- import: `python -X importtime -c "import app"`, mediana do tempo acumulado
+  do módulo app e os pacotes de topo mais caros;
+- landing: a tela inicial renderizada com o AppTest do Streamlit em um processo
+  novo, e quais pacotes pesados ela acabou importando.
+
+Sai com código 1 se a mediana passar do orçamento ou se a tela inicial importar
+algum pacote de FORBIDDEN (SDK do Gemini, fpdf, pypdf, bs4, requests, PIL).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pilhas que só devem carregar no primeiro uso (geração, PDF, scraping, imagem)
+FORBIDDEN = ("google.genai", "fpdf", "fontTools", "pypdf", "pdfplumber", "fitz", "bs4", "requests", "PIL", "httpx",
+             "src.agent", "src.scraper")
+
+LANDING = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+at = AppTest.from_file("app.py", default_timeout=60)
+at.query_params["u"] = "bench-startup"
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+loaded = sorted(m for m in set(sys.modules) - before if any(m == f or m.startswith(f + ".") for f in FORBIDDEN))
+print(json.dumps({"seconds": elapsed, "loaded": loaded, "errors": [str(e.value) for e in at.exception]}))
+"""
+
+
+def _env(data_dir: str) -> dict:
+    env = dict(os.environ)
+    # Chave fictícia: a tela inicial não chama o Gemini
+    env.setdefault("GOOGLE_API_KEY", "bench-startup")
+    env["AGENTSTUDY_DATA_DIR"] = data_dir
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def parse_importtime(stderr: str) -> dict:
+    """{módulo: (próprio_us, acumulado_us, profundidade)} a partir da saída do -X importtime."""
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            own, total = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # cabeçalho
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        out[name.strip()] = (own, total, depth)
+    return out
+
+
+def import_app(env: dict) -> dict:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import app falhou:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def landing(env: dict) -> dict:
+    code = f"FORBIDDEN = {FORBIDDEN!r}\n" + LANDING
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"render da tela inicial falhou:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de partida a frio (imports + tela inicial)")
+    parser.add_argument("--repeat", type=int, default=5, help="processos novos por medida")
+    parser.add_argument("--budget-ms", type=float, default=800, help="orçamento da mediana de 'import app' (ms)")
+    parser.add_argument("--render-budget-ms", type=float, default=3000,
+                        help="orçamento da mediana do primeiro render da tela inicial (ms)")
+    parser.add_argument("--top", type=int, default=10, help="quantos pacotes de topo listar")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = _env(data_dir)
+        runs = [import_app(env) for _ in range(args.repeat)]
+        totals = [run["app"][1] / 1000 for run in runs if "app" in run]
+        median = statistics.median(totals)
+        print(f"import app: mediana {median:.0f} ms (min {min(totals):.0f}, max {max(totals):.0f}) "
+              f"| orçamento {args.budget_ms:.0f} ms")
+
+        # Pacotes importados diretamente pelo app (profundidade 1), pelo acumulado
+        last = runs[-1]
+        top = sorted(((total, name) for name, (_, total, depth) in last.items() if depth == 1), reverse=True)
+        for total, name in top[:args.top]:
+            print(f"  {total / 1000:>8.1f} ms  {name}")
+
+        imported = sorted(name for name in last if any(name == f or name.startswith(f + ".") for f in FORBIDDEN))
+        roots = sorted({name.split(".")[0] if not name.startswith("src.") else name for name in imported})
+        if median > args.budget_ms:
+            failures.append(f"import app {median:.0f} ms > {args.budget_ms:.0f} ms")
+        if roots:
+            failures.append(f"import app carregou {', '.join(roots)}")
+
+        renders = [landing(env) for _ in range(max(1, args.repeat // 2))]
+        render_ms = statistics.median(r["seconds"] for r in renders) * 1000
+        loaded = sorted({name for r in renders for name in r["loaded"]})
+        print(f"tela inicial: mediana {render_ms:.0f} ms | orçamento {args.render_budget_ms:.0f} ms"
+              f" | pesados carregados: {', '.join(loaded) or 'nenhum'}")
+        errors = [e for r in renders for e in r["errors"]]
+        if errors:
+            failures.append(f"tela inicial com erro: {errors[0]}")
+        if render_ms > args.render_budget_ms:
+            failures.append(f"tela inicial {render_ms:.0f} ms > {args.render_budget_ms:.0f} ms")
+        if loaded:
+            failures.append(f"tela inicial carregou {', '.join(loaded[:8])}")
+
+    if failures:
+        print("\nREGRESSÃO:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Cliente falso do google-genai para benchmarks offline.
+
+Imita client.models (generate_content, generate_content_stream, count_tokens),
+client.aio.models e client.caches, devolvendo respostas gravadas em
+benchmarks/corpus/responses/ com latência configurável e determinística
+(mesmo prompt -> mesma resposta, mesmo atraso).
+
+    pool = ClientPool(factory=lambda key: FakeClient(latency=0.2))
+    agent = StudyAgent("fake", pool=pool)
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+RESPONSES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "responses")
+
+# Marcador no prompt -> arquivo de resposta gravada (a primeira que bater vence)
+ROUTES = (
+    ("PLANO DE ENSINO SUPERIOR", "roadmap.md"),
+    ("GRAPHVIZ", "mindmap.dot"),
+    ("LISTA DE EXERCÍCIOS", "exercises.md"),
+    ("AULA MAGNA", "lesson.md"),
+    ("Resuma o texto", "summary.md"),
+)
+DEFAULT_RESPONSE = "answer.md"
+
+
+def _load(name: str) -> str:
+    with open(os.path.join(RESPONSES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _text_of(contents) -> str:
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "".join(_text_of(c) for c in contents)
+    return getattr(contents, "text", None) or ""
+
+
+class _Usage(SimpleNamespace):
+    pass
+
+
+class FakeModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        text, usage, delay = self._owner._respond(contents, config)
+        time.sleep(delay)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content_stream(self, model, contents, config=None):
+        text, usage, delay = self._owner._respond(contents, config)
+        pieces = self._owner.stream_chunks
+        size = max(1, len(text) // pieces)
+        # Primeiro pedaço paga a latência inicial; o resto chega espaçado
+        time.sleep(delay * 0.5)
+        for i in range(0, len(text), size):
+            time.sleep(delay * 0.5 / pieces)
+            last = i + size >= len(text)
+            yield SimpleNamespace(text=text[i:i + size], usage_metadata=usage if last else None)
+
+    def count_tokens(self, model, contents, config=None):
+        return SimpleNamespace(total_tokens=len(_text_of(contents)) // 4 + 1)
+
+
+class FakeAsyncModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def generate_content(self, model, contents, config=None):
+        text, usage, delay = self._owner._respond(contents, config)
+        await asyncio.sleep(delay)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class FakeCaches:
+    def __init__(self, owner):
+        self._owner = owner
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def create(self, model, config=None):
+        text = _text_of(getattr(config, "contents", None))
+        with self._lock:
+            name = f"cachedContents/{len(self._items) + 1}"
+            self._items[name] = len(text) // 4 + 1
+        return SimpleNamespace(name=name)
+
+    def update(self, name, config=None):
+        if name not in self._items:
+            raise KeyError(name)
+        return SimpleNamespace(name=name)
+
+    def delete(self, name):
+        with self._lock:
+            self._items.pop(name, None)
+
+    def tokens(self, name) -> int:
+        return self._items.get(name, 0)
+
+
+class FakeClient:
+    """
+    latency: segundos por chamada (antes da resposta inteira / do streaming).
+    per_1k_tokens: segundos extras a cada 1000 tokens de entrada.
+    jitter: fração (0..1) de variação determinística da latência, pelo hash do prompt.
+    """
+
+    def __init__(self, latency: float = 0.2, per_1k_tokens: float = 0.0, jitter: float = 0.0,
+                 stream_chunks: int = 8):
+        self.latency = latency
+        self.per_1k_tokens = per_1k_tokens
+        self.jitter = jitter
+        self.stream_chunks = stream_chunks
+        self.models = FakeModels(self)
+        self.aio = SimpleNamespace(models=FakeAsyncModels(self))
+        self.caches = FakeCaches(self)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._responses = {}
+
+    def _response(self, prompt: str) -> str:
+        name = next((f for marker, f in ROUTES if marker in prompt), DEFAULT_RESPONSE)
+        if name not in self._responses:
+            self._responses[name] = _load(name)
+        return self._responses[name]
+
+    def _respond(self, contents, config):
+        prompt = _text_of(contents)
+        with self._lock:
+            self.calls += 1
+        cached_name = getattr(config, "cached_content", None) if config is not None else None
+        cached = self.caches.tokens(cached_name) if cached_name else 0
+        prompt_tokens = len(prompt) // 4 + 1 + cached
+        text = self._response(prompt)
+        usage = _Usage(prompt_token_count=prompt_tokens, cached_content_token_count=cached or None,
+                       candidates_token_count=len(text) // 4 + 1)
+        delay = self.latency + self.per_1k_tokens * (prompt_tokens - cached) / 1000
+        if self.jitter:
+            h = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+            delay *= 1 + self.jitter * (2 * h - 1)
+        return text, usage, max(delay, 0.0)
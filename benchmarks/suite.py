@@ -0,0 +1,387 @@
+"""
+Suíte de benchmarks offline: corpus gravado + cliente Gemini falso.
+
+Mede:
+  - scraper.html    vazão do _extract_from_html por página do corpus
+  - scraper.pdf     _extract_from_bytes_pdf em PDFs de 5, 40 e 150 páginas
+  - pdf.render      generate_pdf (sem cache) para roteiro, aula e lista
+  - ingest          ponta a ponta: extract_text_from_url (servidor HTTP local)
+                    -> create_study_roadmap (Gemini falso com latência)
+  - crawl           varredura do site de exemplo (corpus/site), serial x concorrente,
+                    conferindo o que foi baixado (robots.txt, profundidade, fora do site)
+  - memory          pico de memória (tracemalloc) das etapas pesadas
+  - load            N usuários simultâneos conversando com o mesmo agente
+
+Uso:
+    python benchmarks/suite.py [--quick] [--only html,pdf] [--output atual.json]
+    python benchmarks/suite.py --compare base.json [--tolerance 0.15]
+
+Com --compare, sai com código 1 se alguma métrica piorar além da tolerância.
+Métricas terminadas em _per_s são "maior é melhor"; as demais, "menor é melhor".
+"""
+import argparse
+import functools
+import glob
+import http.server
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_genai import FakeClient, _load
+
+from src import agent as agent_module
+from src.agent import StudyAgent
+from src.cache import ResponseCache
+from src.client_pool import ClientPool
+from src.crawler import Crawler
+from src.llm_client import GeminiGateway
+from src.metrics import REGISTRY
+from src.scraper import _extract_from_bytes_pdf, _extract_from_html, extract_text_from_url
+
+CORPUS = os.path.join(ROOT, "benchmarks", "corpus")
+HTML_DIR = os.path.join(CORPUS, "html")
+PDF_DIR = os.path.join(CORPUS, "pdf")
+PDF_SIZES = (5, 40, 150)
+SCENARIOS = ("html", "pdf", "render", "ingest", "crawl", "memory", "load")
+# O que a varredura de corpus/site/calculo1 deve baixar (e nada além disso)
+CRAWL_EXPECTED = {"/site/calculo1/index.html", "/site/calculo1/ementa.html", "/site/calculo1/cronograma.html",
+                  "/site/bibliografia.html", "/pdf/apostila_5p.pdf", "/pdf/apostila_40p.pdf"}
+
+
+# --- CORPUS ---
+def html_pages() -> dict:
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(HTML_DIR, "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if "login" in name:
+            continue  # a tela de login é rejeitada de propósito
+        with open(path, "rb") as f:
+            pages[name] = f.read()
+    return pages
+
+
+def make_pdf(pages: int) -> str:
+    """PDF determinístico de `pages` páginas (gerado uma vez em corpus/pdf)."""
+    path = os.path.join(PDF_DIR, f"apostila_{pages}p.pdf")
+    if os.path.exists(path):
+        return path
+    from fpdf import FPDF
+    os.makedirs(PDF_DIR, exist_ok=True)
+    rng = random.Random(pages)
+    words = ("derivada integral limite função continuidade teorema demonstração exercício "
+             "sequência série convergência vetor matriz espaço transformação").split()
+    pdf = FPDF()
+    pdf.set_creation_date(datetime(2024, 1, 1))
+    pdf.set_font("Helvetica", size=10)
+    for p in range(pages):
+        pdf.add_page()
+        pdf.cell(0, 8, f"Capitulo {p // 10 + 1} - Secao {p + 1}", new_x="LMARGIN", new_y="NEXT")
+        for _ in range(8):
+            pdf.multi_cell(0, 5, " ".join(rng.choice(words) for _ in range(40)), new_x="LMARGIN", new_y="NEXT")
+    pdf.output(path)
+    return path
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def __init__(self, *args, delay=0.0, **kwargs):
+        self.delay = delay
+        super().__init__(*args, **kwargs)
+
+    def send_head(self):
+        # Servidor distante: cada pedido espera `delay` antes de responder
+        if self.delay:
+            time.sleep(self.delay)
+        return super().send_head()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_corpus(delay: float = 0.0):
+    """Servidor HTTP local com o corpus (suporta ETag/If-Modified-Since do SimpleHTTPRequestHandler)."""
+    handler = functools.partial(_QuietHandler, directory=CORPUS, delay=delay)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- MEDIÇÃO ---
+def timings(fn, repeat: int) -> list:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def peak_kb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def fake_agent(latency: float, cache: bool = False, **client_kwargs) -> StudyAgent:
+    client = FakeClient(latency=latency, **client_kwargs)
+    pool = ClientPool(factory=lambda key: client)
+    return StudyAgent("fake-key", pool=pool, gateway=GeminiGateway(max_retries=0),
+                      cache=ResponseCache(max_entries=1024) if cache else None)
+
+
+# --- CENÁRIOS ---
+def bench_html(repeat):
+    results = {}
+    for name, body in html_pages().items():
+        times = timings(lambda: _extract_from_html(body, "https://exemplo.edu.br/"), repeat)
+        med = statistics.median(times)
+        results[f"scraper.html/{name}"] = {"median_ms": med * 1000, "p95_ms": percentile(times, 0.95) * 1000,
+                                           "mb_per_s": len(body) / med / 1e6}
+    return results
+
+
+def bench_pdf(repeat):
+    results = {}
+    for pages in PDF_SIZES:
+        with open(make_pdf(pages), "rb") as f:
+            data = f.read()
+        times = timings(lambda: _extract_from_bytes_pdf(data), max(1, repeat // 4))
+        med = statistics.median(times)
+        results[f"scraper.pdf/{pages}p"] = {"median_ms": med * 1000, "pages_per_s": pages / med}
+    return results
+
+
+def _render_inputs():
+    return {"roadmap": _load("roadmap.md"), "lesson": _load("lesson.md"), "exercises": _load("exercises.md")}
+
+
+def bench_render(repeat):
+    agent = fake_agent(0)
+    results = {}
+    for name, content in _render_inputs().items():
+        def run():
+            agent_module._PDF_CACHE.clear()
+            agent.generate_pdf(content)
+        times = timings(run, max(1, repeat // 4))
+        med = statistics.median(times)
+        results[f"pdf.render/{name}"] = {"median_ms": med * 1000, "renders_per_s": 1 / med}
+    return results
+
+
+def bench_ingest(repeat, latency):
+    server, base = serve_corpus()
+    agent = fake_agent(latency)
+    urls = {name: f"{base}/html/{name}.html" for name in html_pages()}
+    urls["apostila_40p"] = f"{base}/pdf/{os.path.basename(make_pdf(40))}"
+    results = {}
+    try:
+        for name, url in urls.items():
+            REGISTRY.reset()
+            times = timings(lambda: agent.create_study_roadmap(extract_text_from_url(url)), max(1, repeat // 4))
+            stages = REGISTRY.summary()
+            row = {"median_ms": statistics.median(times) * 1000}
+            for stage in ("scraper.http", "scraper.html", "scraper.pdf", "llm.generate"):
+                if stage in stages:
+                    row[f"{stage}_ms"] = stages[stage]["p50"] * 1000
+            results[f"ingest/{name}"] = row
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_crawl(repeat, latency):
+    """Cada pedido ao servidor local espera latency / 4, como um site de universidade distante."""
+    server, base = serve_corpus(delay=latency / 4)
+    start_url = f"{base}/site/calculo1/index.html"
+    results = {}
+    try:
+        for label, workers in (("serial", 1), ("concurrent", 4)):
+            last = {}
+
+            def run():
+                last["result"] = Crawler(max_pages=8, max_depth=2, max_workers=workers).crawl(start_url)
+
+            times = timings(run, max(1, repeat // 4))
+            result = last["result"]
+            fetched = {page.url[len(base):] for page in result.pages}
+            if fetched != CRAWL_EXPECTED:
+                raise RuntimeError(f"crawl/{label}: diferença no que foi baixado {sorted(fetched ^ CRAWL_EXPECTED)}")
+            med = statistics.median(times)
+            results[f"crawl/{label}"] = {"median_ms": med * 1000, "pages_per_s": len(result.pages) / med,
+                                         "kb": result.bytes / 1024, "context_kb": len(result.context()) / 1024}
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_memory(latency):
+    pages = html_pages()
+    biggest = max(pages.values(), key=len)
+    with open(make_pdf(PDF_SIZES[-1]), "rb") as f:
+        pdf_bytes = f.read()
+    agent = fake_agent(latency)
+    lesson = _load("lesson.md")
+
+    def render():
+        agent_module._PDF_CACHE.clear()
+        agent.generate_pdf(lesson)
+
+    return {
+        "memory/html_largest": {"peak_kb": peak_kb(lambda: _extract_from_html(biggest, "https://exemplo.edu.br/"))},
+        "memory/pdf_150p": {"peak_kb": peak_kb(lambda: _extract_from_bytes_pdf(pdf_bytes))},
+        "memory/render_lesson": {"peak_kb": peak_kb(render)},
+        "memory/roadmap_call": {"peak_kb": peak_kb(lambda: agent.create_study_roadmap(pages[sorted(pages)[0]].decode("utf-8", "ignore")))},
+    }
+
+
+def bench_load(users, turns, latency, repeated_ratio):
+    """
+    `users` threads, cada uma com `turns` perguntas em streaming. Uma fração
+    `repeated_ratio` das perguntas é igual entre usuários (mesma disciplina),
+    o que exercita coalescência e cache de respostas.
+    """
+    results = {}
+    material = _load("roadmap.md")
+    for label, cache in (("no_cache", False), ("cache", True)):
+        agent = fake_agent(latency, cache=cache, stream_chunks=8)
+        latencies, first_chunk = [], []
+        lock = threading.Lock()
+
+        def user(u):
+            rng = random.Random(u)
+            # Usuários reais não chegam sincronizados
+            time.sleep(rng.uniform(0, latency * 2))
+            for t in range(turns):
+                shared = rng.random() < repeated_ratio
+                question = f"Explique o tópico {t}" if shared else f"Dúvida {u}-{t} sobre limites"
+                t0 = time.perf_counter()
+                first = None
+                for _ in agent.stream_answer(question, material):
+                    if first is None:
+                        first = time.perf_counter() - t0
+                with lock:
+                    latencies.append(time.perf_counter() - t0)
+                    first_chunk.append(first or 0.0)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            list(pool.map(user, range(users)))
+        wall = time.perf_counter() - t0
+        results[f"load/{label}"] = {
+            "wall_s": wall, "turns_per_s": len(latencies) / wall,
+            "p50_ms": percentile(latencies, 0.50) * 1000, "p95_ms": percentile(latencies, 0.95) * 1000,
+            "first_chunk_p50_ms": percentile(first_chunk, 0.50) * 1000,
+            "llm_calls": agent.gateway.stats["calls"],
+        }
+    return results
+
+
+# --- SAÍDA E COMPARAÇÃO ---
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or "desconhecida"
+    except Exception:
+        return "desconhecida"
+
+
+def print_results(results):
+    for name, metrics in results.items():
+        values = "  ".join(f"{k}={v:,.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in metrics.items())
+        print(f"{name:<32} {values}")
+
+
+def compare(current, baseline, tolerance) -> int:
+    """Imprime a variação de cada métrica e conta as regressões."""
+    regressions = 0
+    print(f"\n{'métrica':<56} {'base':>12} {'atual':>12} {'var.':>8}")
+    for name, metrics in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        for key, value in metrics.items():
+            old = base.get(key)
+            if not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            higher_better = key.endswith("_per_s")
+            worse = change < -tolerance if higher_better else change > tolerance
+            regressions += worse
+            flag = "  ⚠️ REGRESSÃO" if worse else ""
+            print(f"{name + ' ' + key:<56} {old:>12,.2f} {value:>12,.2f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="menos repetições (para CI)")
+    parser.add_argument("--only", default=",".join(SCENARIOS), help=f"cenários: {','.join(SCENARIOS)}")
+    parser.add_argument("--latency", type=float, default=0.2, help="latência do Gemini falso (s)")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--repetidas", type=float, default=0.3, help="fração de perguntas iguais entre usuários")
+    parser.add_argument("--output", help="grava os resultados em JSON")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    repeat = 4 if args.quick else 20
+    only = {s.strip() for s in args.only.split(",")}
+    results = {}
+    if "html" in only:
+        results.update(bench_html(repeat))
+    if "pdf" in only:
+        results.update(bench_pdf(repeat))
+    if "render" in only:
+        results.update(bench_render(repeat))
+    if "ingest" in only:
+        results.update(bench_ingest(repeat, args.latency))
+    if "crawl" in only:
+        results.update(bench_crawl(repeat, args.latency))
+    if "memory" in only:
+        results.update(bench_memory(args.latency))
+    if "load" in only:
+        results.update(bench_load(args.users, args.turns, args.latency, args.repetidas))
+
+    report = {
+        "meta": {"revision": git_revision(), "python": platform.python_version(),
+                 "machine": platform.machine(), "cpus": os.cpu_count(),
+                 "timestamp": datetime.now().isoformat(timespec="seconds"),
+                 "args": vars(args)},
+        "results": results,
+    }
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{regressions} métrica(s) pioraram mais de {args.tolerance:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import sys
+
+from src.http_cache import HttpCache
+from src.ingest import BatchIngestor
+
+
+def ler_fontes(args):
+    """Junta URLs/PDFs passados na linha de comando e em arquivos de lista."""
+    fontes = list(args.fontes)
+    if args.lista:
+        with open(args.lista, encoding='utf-8') as f:
+            fontes += [l.strip() for l in f if l.strip() and not l.startswith('#')]
+    return fontes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão em lote de disciplinas (URLs ou PDFs).")
+    parser.add_argument("fontes", nargs="*", help="URLs ou caminhos de PDF")
+    parser.add_argument("-l", "--lista", help="Arquivo com uma URL/PDF por linha")
+    parser.add_argument("-o", "--saida", help="Pasta onde salvar o texto extraído de cada fonte")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--por-host", type=int, default=2)
+    parser.add_argument("--tentativas", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=15)
+    parser.add_argument("--cache", help="Pasta do cache HTTP (GET condicional entre execuções)")
+    parser.add_argument("--json", action="store_true", help="Imprime um JSON por linha")
+    args = parser.parse_args()
+
+    fontes = ler_fontes(args)
+    if not fontes:
+        parser.error("Informe ao menos uma URL ou PDF.")
+
+    ingestor = BatchIngestor(max_workers=args.workers, per_host=args.por_host,
+                             retries=args.tentativas, timeout=args.timeout,
+                             http_cache=HttpCache(args.cache) if args.cache else None)
+
+    def mostrar(res):
+        if args.json:
+            print(json.dumps({"source": res.source, "ok": res.ok, "chars": len(res.text),
+                              "error": res.error, "attempts": res.attempts,
+                              "elapsed": round(res.elapsed, 3)}, ensure_ascii=False), flush=True)
+        else:
+            status = "✅" if res.ok else "❌"
+            detalhe = f"{len(res.text)} caracteres" if res.ok else res.error
+            print(f"{status} [{res.elapsed:.1f}s] {res.source} - {detalhe}", flush=True)
+
+    resultados = ingestor.ingest(fontes, on_result=mostrar)
+
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+        for i, res in enumerate(resultados):
+            if res.ok:
+                with open(os.path.join(args.saida, f"{i:03d}.txt"), "w", encoding="utf-8") as f:
+                    f.write(res.text)
+
+    falhas = sum(1 for r in resultados if not r.ok)
+    if not args.json:
+        print(f"\n{len(resultados) - falhas}/{len(resultados)} fontes processadas com sucesso.")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import os
+from datetime import datetime
+
+import streamlit as st
+
+from src.metrics import REGISTRY
+
+# --- PAINEL DE DESEMPENHO (ADMIN) ---
+st.set_page_config(page_title="AgentStudy · Admin", page_icon="📊", layout="wide")
+
+# Fechada por padrão: só abre com AGENTSTUDY_ADMIN_TOKEN definido e ?token=... igual
+token = os.getenv("AGENTSTUDY_ADMIN_TOKEN")
+if not token:
+    st.error("🔒 Página de admin desativada. Defina AGENTSTUDY_ADMIN_TOKEN e abra com ?token=...")
+    st.stop()
+if st.query_params.get("token") != token:
+    st.error("🔒 Acesso restrito.")
+    st.stop()
+
+st.markdown("## 📊 Desempenho por Etapa")
+
+summary = REGISTRY.summary()
+if not summary:
+    st.info("Nenhuma métrica ainda. Use o app e volte aqui.")
+else:
+    rows = [
+        {"etapa": name, "chamadas": s["count"], "erros": s["errors"],
+         "p50 (ms)": round(s["p50"] * 1000, 1), "p95 (ms)": round(s["p95"] * 1000, 1),
+         "máx (ms)": round(s["max"] * 1000, 1), "total (s)": round(s["total"], 2)}
+        for name, s in summary.items()
+    ]
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+counters = REGISTRY.counters()
+if counters:
+    st.markdown("### Contadores")
+    st.json(counters)
+
+st.markdown("### Componentes")
+for name, stats in REGISTRY.collect().items():
+    with st.expander(name):
+        st.json(stats)
+
+c1, c2, c3 = st.columns(3)
+with c1:
+    st.download_button("⬇️ JSON Lines", REGISTRY.to_jsonl(), "metrics.jsonl", "application/x-ndjson")
+with c2:
+    st.download_button("⬇️ Prometheus", REGISTRY.to_prometheus(), "metrics.prom", "text/plain")
+with c3:
+    if st.button("🗑️ Zerar métricas"):
+        REGISTRY.reset(); st.rerun()
+
+if REGISTRY.profiles:
+    st.markdown("### Perfis (?profile=1)")
+    for p in reversed(REGISTRY.profiles):
+        when = datetime.fromtimestamp(p["time"]).strftime("%H:%M:%S")
+        with st.expander(f"{when} · {p['name']} · {p['tool']}"):
+            st.code(p["report"], language="text")
@@ -1,68 +1,246 @@
-from google import genai
 from google.genai import types
-from fpdf import FPDF
-import io
-import re
- 
+import hashlib
+import threading
+import time
+
+from src.budget import ContextCompressor, TokenCounter
+from src.cache import LRUCache, ResponseCache
+from src.client_pool import ClientPool, clean_api_key, get_client_pool
+from src.context_cache import ContextCacheManager, UsageLog
+from src.llm_client import EmptyResponseError, GeminiGateway, LLMError, RetryableLLMError, estimate_tokens
+from src.metrics import count, span, timed
+from src.mindmap import check_dot, extract_dot
+
+# Cache de PDFs prontos: por processo, compartilhado entre reruns e sessões
+_PDF_CACHE = LRUCache(max_entries=32)
+_PDF_LOCK = threading.Lock()
+PDF_STATS = {"renders": 0, "hits": 0, "failures": 0, "render_seconds": 0.0, "last_render_seconds": 0.0}
+
+
+# Instruções fixas do tutor: ficam antes do material, igual em toda chamada,
+# para que o prefixo (instruções + material) possa ser cacheado no servidor
+COURSE_SYSTEM = """
+Você é o tutor de uma disciplina universitária dentro do AgentStudy.
+Use o MATERIAL DA DISCIPLINA enviado como base principal das respostas.
+Escreva em português, com linguagem acadêmica e sem emojis.
+Você é uma inteligência artificial: não se apresente como professor, reitor ou autoridade acadêmica.
+""".strip()
+
+
+def pdf_cache_key(content: str, header: str = None) -> str:
+    # header=None é o cabeçalho padrão: a chave sai sem importar o fpdf
+    h = hashlib.sha256()
+    h.update((header or '').encode('utf-8'))
+    h.update(b'\x00')
+    h.update(content.encode('utf-8'))
+    return h.hexdigest()
 
 
 
 class StudyAgent:
-    def __init__(self, api_key: str, model: str = "gemini-2.0-flash"):
-        if not api_key:
-            raise ValueError("API Key é obrigatória.")
-        
-        clean_key = api_key.strip().replace('"', '').replace("'", "")
-        self.client = genai.Client(api_key=clean_key)
+    """
+    Camada de prompts/geração sem estado próprio: o cliente HTTP vem do pool
+    do processo, então criar um agente é barato e não abre conexões.
+    """
+
+    def __init__(self, api_key: str, model: str = "gemini-2.0-flash", cache: ResponseCache = None,
+                 gateway: GeminiGateway = None, pool: ClientPool = None,
+                 context_cache: ContextCacheManager = None, usage: UsageLog = None,
+                 budgets: dict = None, exact_tokens: bool = False):
+        self.api_key = clean_api_key(api_key)
+        self.pool = pool or get_client_pool()
         self.model_name = model
+        # Cache opcional de respostas (compartilhado entre agentes/sessões)
+        self.cache = cache
+        # Limite de taxa, retry e coalescência (compartilhe um gateway entre agentes)
+        self.gateway = gateway or GeminiGateway()
+        # Cache de contexto no servidor (opcional) e contagem de tokens por chamada
+        self.context_cache = context_cache
+        self.usage = usage or UsageLog()
+        # Orçamento de tokens por tipo de chamada; o excesso é resumido, não cortado
+        self.counter = TokenCounter(lambda: self.client, model, exact=exact_tokens)
+        self.compressor = ContextCompressor(self.summarize_text, self.counter, budgets)
+
+    @property
+    def client(self):
+        return self.pool.get(self.api_key)
+
+    def _generate(self, contents, config, kind: str = "") -> str:
+        """Chama o modelo passando pelo cache de respostas, se houver."""
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.model_name, config, contents)
+            cached = self.cache.get(key)
+            if cached is not None:
+                count("llm.response_cache_hits")
+                return cached
+
+        estimated = self._estimate(contents)
+        started = time.perf_counter()
+        with span("llm.generate"), self.pool.lease(self.api_key) as client:
+            res = self.gateway.generate(client, self.model_name, contents, config)
+        text = res.text
+        self.usage.record(res.usage_metadata, kind, config.cached_content,
+                          estimated, time.perf_counter() - started)
 
-    def _call(self, contents, temperature=0.2) -> str:
-        """Motor genérico que aceita Texto ou Multimodal (PDF/Imagem)"""
+        # Só guarda respostas válidas (erros não entram no cache)
+        if key is not None and text:
+            self.cache.set(key, text)
+        return text
+
+    def _estimate(self, contents) -> int:
+        return self.counter.count(contents) if isinstance(contents, str) else estimate_tokens(contents)
+
+    @staticmethod
+    def _strip_preamble(text: str) -> str:
+        # Filtro de limpeza (Remove saudações iniciais se houver)
+        if "# " in text:
+            return text[text.find("# "):]
+        return text
+
+    @timed("llm.call")
+    def _call(self, contents, temperature=0.2, kind: str = "") -> str:
+        """Motor genérico que aceita Texto ou Multimodal (PDF/Imagem). Falhas viram LLMError."""
+        text = self._generate(
+            contents, # Agora aceita lista de partes (texto + arquivo)
+            types.GenerateContentConfig(
+                temperature=temperature,
+                max_output_tokens=8192
+            ),
+            kind
+        )
+        return self._strip_preamble(text)
+
+    # --- PREFIXO ESTÁVEL (instruções + material) + TAREFA ---
+    @staticmethod
+    def _course_prefix(context_data: str) -> str:
+        return f"MATERIAL DA DISCIPLINA:\n{context_data}\n\n---\n"
+
+    def _course_request(self, task: str, context_data: str, temperature=0.2, cache_key=None, inline=False,
+                        kind: str = "answer"):
+        """
+        Monta (contents, config) de uma chamada sobre o material da disciplina.
+        Com cache de contexto disponível, o material vai por referência
+        (cached_content) e só a tarefa é enviada; senão, vai inline na frente,
+        comprimido até caber no orçamento de `kind`.
+        """
+        if self.context_cache is not None and not inline and self.context_cache.eligible(context_data):
+            # Um só texto cacheado por sessão: comprimido pelo orçamento "cached", sem depender
+            # do tipo de chamada nem da pergunta (senão aula e dúvida trocariam de cache a cada turno)
+            prefix = self._course_prefix(self.compressor.fit("cached", context_data, COURSE_SYSTEM))
+            name = self.context_cache.ensure(self.client, self.model_name, COURSE_SYSTEM, prefix, cache_key)
+            if name:
+                config = types.GenerateContentConfig(cached_content=name, temperature=temperature,
+                                                     max_output_tokens=8192)
+                return task, config
+        prefix = self._course_prefix(self.compressor.fit(kind, context_data, COURSE_SYSTEM + task))
+        config = types.GenerateContentConfig(system_instruction=COURSE_SYSTEM, temperature=temperature,
+                                             max_output_tokens=8192)
+        return prefix + task, config
+
+    def _course_call(self, task: str, context_data: str, kind: str, cache_key=None) -> str:
+        contents, config = self._course_request(task, context_data, cache_key=cache_key, kind=kind)
         try:
-            res = self.client.models.generate_content(
-                model=self.model_name,
-                contents=contents, # Agora aceita lista de partes (texto + arquivo)
-                config=types.GenerateContentConfig(
-                    temperature=temperature,
-                    max_output_tokens=8192
-                )
-            )
-            text = res.text
-            
-            # Filtro de limpeza (Remove saudações iniciais se houver)
-            if "# " in text:
-                return text[text.find("# "):] 
-            return text
-            
-        except Exception as e:
-            return f"Erro: {e}"
+            text = self._generate(contents, config, kind)
+        except LLMError as e:
+            # Cache sumiu no servidor (expirou/foi apagado): repete com o material inline
+            if not config.cached_content or isinstance(e, RetryableLLMError):
+                raise
+            self.context_cache.invalidate(config.cached_content)
+            contents, config = self._course_request(task, context_data, cache_key=cache_key, inline=True, kind=kind)
+            text = self._generate(contents, config, kind)
+        return self._strip_preamble(text)
+
+    def _course_stream(self, task: str, context_data: str, kind: str, cache_key=None):
+        contents, config = self._course_request(task, context_data, cache_key=cache_key, kind=kind)
+        started = False
+        try:
+            for piece in self._stream(contents, config=config, kind=kind):
+                started = True
+                yield piece
+        except LLMError as e:
+            if started or not config.cached_content or isinstance(e, RetryableLLMError):
+                raise
+            self.context_cache.invalidate(config.cached_content)
+            contents, config = self._course_request(task, context_data, cache_key=cache_key, inline=True, kind=kind)
+            yield from self._stream(contents, config=config, kind=kind)
+
+    def _stream(self, contents, temperature=0.2, config=None, kind: str = ""):
+        """
+        Versão em streaming do _call: gera os pedaços de texto conforme chegam.
+        O filtro de saudação é aplicado de forma incremental: segura o texto
+        só até aparecer o primeiro "# ", depois repassa tudo direto.
+        """
+        if config is None:
+            config = types.GenerateContentConfig(temperature=temperature, max_output_tokens=8192)
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.model_name, config, contents)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield self._strip_preamble(cached)
+                return
+
+        parts = []
+        pending = ""
+        started = False
+        usage = None
+        estimated = self._estimate(contents)
+        began = time.perf_counter()
+        with self.pool.lease(self.api_key) as client:
+            for chunk in self.gateway.stream(client, self.model_name, contents, config):
+                # O usage_metadata completo vem no último pedaço
+                usage = chunk.usage_metadata or usage
+                piece = chunk.text or ""
+                if not piece:
+                    continue
+                parts.append(piece)
+                if started:
+                    yield piece
+                    continue
+                pending += piece
+                pos = pending.find("# ")
+                if pos >= 0:
+                    started = True
+                    yield pending[pos:]
+                    pending = ""
+
+        self.usage.record(usage, kind, config.cached_content, estimated, time.perf_counter() - began)
+        if not parts:
+            raise EmptyResponseError("O modelo não retornou conteúdo (possível bloqueio de segurança).")
+
+        # Sem nenhum título: devolve o texto inteiro, igual ao _call
+        if pending:
+            yield pending
+
+        text = "".join(parts)
+        if key is not None and text:
+            self.cache.set(key, text)
 
     # --- MOTOR DE IMAGEM ---
+    @timed("agent.image")
     def generate_didactic_image(self, prompt_user: str) -> bytes:
         try:
             image_prompt = f"Detailed academic diagram or infographic about: {prompt_user}. Textbook style, white background, high resolution, scientific accuracy."
-            response = self.client.models.generate_image(
+            response = self.client.models.generate_images(
                 model='imagen-3.0-generate-001',
                 prompt=image_prompt,
-                config=types.GenerateImageConfig(number_of_images=1, aspect_ratio="16:9")
+                config=types.GenerateImagesConfig(number_of_images=1, aspect_ratio="16:9")
             )
-            img_pil = response.generated_images[0].image
-            buf = io.BytesIO()
-            img_pil.save(buf, format="PNG")
-            return buf.getvalue()
+            # PNG original; o reencode/miniatura fica com src/images.py
+            return response.generated_images[0].image.image_bytes
         except Exception:
             return None
 
 
 
 # --- NOVO: GERADOR DE MAPA MENTAL (NOTEBOOKLM STYLE) ---
-    def generate_mindmap_code(self, context_data: str) -> str:
-        """Gera código Graphviz DOT estilizad para parecer o NotebookLM."""
+    def _mindmap_prompt(self, context_data: str) -> str:
         prompt = f"""
         ATUE COMO UM ESPECIALISTA EM VISUALIZAÇÃO DE DADOS.
         
         CONTEXTO:
-        {context_data[:20000]}
+        {context_data}
         
         TAREFA:
         Crie um código GRAPHVIZ (DOT) que represente um MAPA MENTAL deste conteúdo.
@@ -81,24 +259,33 @@ class StudyAgent:
         - Ramifique dos Módulos para os Tópicos chave.
         - Mantenha os textos curtos nos nós.
         """
-        
+        return prompt
+
+    @staticmethod
+    def _clean_dot(text: str) -> str:
+        # Limpa o markdown do código e recusa DOT quebrado (não chega ao st.graphviz_chart)
+        dot = extract_dot(text)
+        error = check_dot(dot)
+        if error:
+            count("mindmap.invalid_dot")
+            raise EmptyResponseError(f"Mapa mental inválido: {error}")
+        return dot
+
+    @timed("agent.mindmap")
+    def generate_mindmap_code(self, context_data: str) -> str:
+        """
+        Gera código Graphviz DOT estilizad para parecer o NotebookLM.
+        Só para enriquecer: o mapa padrão sai local, de src/mindmap.build_dot.
+        """
         # Chamada direta para evitar os filtros de texto do _call
-        try:
-            res = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(temperature=0.2)
-            )
-            # Limpa o markdown do código
-            code = res.text.replace('```dot', '').replace('```', '').strip()
-            return code
-        except Exception as e:
-            return f"Error: {e}"
+        context_data = self.compressor.fit("mindmap", context_data, self._mindmap_prompt(""))
+        text = self._generate(self._mindmap_prompt(context_data), types.GenerateContentConfig(temperature=0.2), "mindmap")
+        return self._clean_dot(text)
 
             
     # --- PROMPTS "DEEP ACADEMIC" ---
     
-    def create_study_roadmap(self, url_text: str) -> str:
+    def _roadmap_prompt(self, url_text: str) -> str:
         prompt = f"""
        FUNÇÃO: Você é uma Inteligência Artificial avançada especializada em estruturação de conhecimento acadêmico.        
         DADOS DA MATÉRIA:
@@ -130,16 +317,35 @@ class StudyAgent:
         
         SEM EMOJIS. TEXTO DENSO E PROFISSIONAL.
         """
-        return self._call(prompt)
+        return prompt
 
-    def generate_lesson(self, topic: str, context_data: str) -> str:
+    @timed("agent.roadmap")
+    def create_study_roadmap(self, url_text: str) -> str:
+        url_text = self.compressor.fit("roadmap", url_text, self._roadmap_prompt(""))
+        return self._call(self._roadmap_prompt(url_text), kind="roadmap")
+
+    def _summary_prompt(self, text: str) -> str:
+        prompt = f"""
+        Resuma o texto abaixo para servir de contexto a um tutor da disciplina.
+        Preserve definições, fórmulas, nomes de tópicos, datas e referências bibliográficas.
+        Use tópicos curtos em Markdown, sem introdução nem conclusão.
+
+        TEXTO:
+        {text}
+        """
+        return prompt
+
+    @timed("agent.summary")
+    def summarize_text(self, text: str) -> str:
+        """Resumo usado pela compressão de contexto (cacheado como qualquer resposta)."""
+        return self._generate(self._summary_prompt(text),
+                              types.GenerateContentConfig(temperature=0.1, max_output_tokens=2048), "summary")
+
+    def _lesson_task(self, topic: str) -> str:
         prompt = f"""
         ATUE COMO UM PROFESSOR TITULAR SÊNIOR (PhD).
-        DADOS DA MATÉRIA:.
         O aluno pediu uma aula sobre: "{topic}".
         
-        CONTEXTO: {context_data}
-        
         DIRETRIZ DE EXTENSÃO E PROFUNDIDADE:
         - ESQUEÇA RESUMOS. O aluno quer um MATERIAL COMPLETO, nível capítulo de livro.
         - SEJA EXTENSO. Cubra todas as nuances, exceções, histórico e teoria.
@@ -168,15 +374,21 @@ class StudyAgent:
         
         SEM EMOJIS. LINGUAGEM ACADÊMICA FORMAL.
         """
-        return self._call(prompt)
+        return prompt
+
+    @timed("agent.lesson")
+    def generate_lesson(self, topic: str, context_data: str, cache_key=None) -> str:
+        return self._course_call(self._lesson_task(topic), context_data, "lesson", cache_key)
+
+    @timed("agent.stream_lesson")
+    def stream_lesson(self, topic: str, context_data: str, cache_key=None):
+        return self._course_stream(self._lesson_task(topic), context_data, "lesson", cache_key)
 
-    def generate_exercises(self, topic: str, context_data: str) -> str:
+    def _exercises_task(self, topic: str) -> str:
         prompt = f"""
-        ATUE COMO UMA BANCA DE PÓS-GRADUAÇÃO.        
-        DADOS DA MATÉRIA:.
+        ATUE COMO UMA BANCA DE PÓS-GRADUAÇÃO.
         
         TÓPICO: {topic}
-        CONTEXTO: {context_data}
         
         Gere uma LISTA DE EXERCÍCIOS INTENSIVA.
         Não faça perguntas de "O que é?". Faça perguntas de "Analise", "Calcule", "Projete", "Critique".
@@ -195,11 +407,18 @@ class StudyAgent:
         
         SEM EMOJIS.
         """
-        return self._call(prompt)
+        return prompt
 
-    def answer_doubt(self, question: str, context_data: str) -> str:
+    @timed("agent.exercises")
+    def generate_exercises(self, topic: str, context_data: str, cache_key=None) -> str:
+        return self._course_call(self._exercises_task(topic), context_data, "exercises", cache_key)
+
+    @timed("agent.stream_exercises")
+    def stream_exercises(self, topic: str, context_data: str, cache_key=None):
+        return self._course_stream(self._exercises_task(topic), context_data, "exercises", cache_key)
+
+    def _doubt_task(self, question: str) -> str:
         prompt = f"""
-        Contexto: {context_data}
         Pergunta: "{question}"
         
         DIRETRIZ:
@@ -212,87 +431,124 @@ class StudyAgent:
 
         - Sem emojis.
         """
-        return self._call(prompt)
+        return prompt
+
+    @timed("agent.answer")
+    def answer_doubt(self, question: str, context_data: str, cache_key=None) -> str:
+        return self._course_call(self._doubt_task(question), context_data, "answer", cache_key)
+
+    @timed("agent.stream_answer")
+    def stream_answer(self, question: str, context_data: str, cache_key=None):
+        return self._course_stream(self._doubt_task(question), context_data, "answer", cache_key)
+
+    # --- SEGUIMENTOS ("não entendi", "e o item 2?") ---
+    @staticmethod
+    def _followup_task(question: str, previous: str) -> str:
+        return f"""
+        Sua última resposta ao aluno foi:
+        ---
+        {previous}
+        ---
+        O aluno agora diz: "{question}"
+
+        Responda a partir da resposta acima, de forma curta e direta, sem repetir o que já foi dito
+        e sem gerar uma aula nova. Use o material só se a resposta acima não bastar.
+        """
+
+    @timed("agent.stream_followup")
+    def stream_followup(self, question: str, previous: str, context_data: str = "", cache_key=None):
+        """Seguimento curto: a base é a última resposta; o material vai só como apoio (pode ser vazio)."""
+        return self._course_stream(self._followup_task(question, previous), context_data, "followup", cache_key)
 
-    # --- GERADOR DE PDF FINAL (FIX: Sem Interrogações e Sem Quebra) ---
+    # --- CLASSIFICADOR DE INTENÇÃO (fallback do src/router.py) ---
+    def classify_intent(self, message: str, has_previous: bool = False):
+        """Uma palavra do modelo: answer, lesson, exercises, image, mindmap ou followup (None se vier outra coisa)."""
+        labels = "answer, lesson, exercises, image, mindmap" + (", followup" if has_previous else "")
+        instructions = (f"Classifique o pedido de um aluno a um tutor em exatamente uma destas categorias: {labels}.\n"
+                        "answer = dúvida pontual; lesson = aula/explicação completa; exercises = lista de exercícios; "
+                        "image = gerar uma imagem; mindmap = mapa mental; "
+                        "followup = comentário curto sobre a resposta anterior.\n")
+        message = self.compressor.clip("router", message, instructions)
+        prompt = instructions + f'Pedido: "{message}"\nResponda só com a categoria.'
+        text = self._generate(prompt, types.GenerateContentConfig(temperature=0, max_output_tokens=5), "router")
+        label = (text or "").strip().strip(".").lower()
+        return label if label in labels.split(", ") else None
+
+    # --- GERADOR DE PDF FINAL (Markdown + Unicode, ver src/pdf_render.py) ---
+    def has_pdf(self, content: str) -> bool:
+        """Diz se o PDF deste conteúdo já está pronto no cache."""
+        return pdf_cache_key(content) in _PDF_CACHE
+
+    @timed("pdf.generate")
     def generate_pdf(self, content: str) -> bytes:
-        class PDF(FPDF):
-            def header(self):
-                self.set_font('Arial', 'B', 10)
-                self.set_text_color(100, 100, 100)
-                self.cell(0, 10, 'AgentStudy - Material Oficial', 0, 1, 'R')
-                self.set_draw_color(220, 220, 220)
-                self.line(10, 20, 200, 20)
-                self.ln(10)
-            def footer(self):
-                self.set_y(-15)
-                self.set_font('Arial', 'I', 8)
-                self.set_text_color(128, 128, 128)
-                self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
-
-        pdf = PDF()
-        pdf.set_margins(20, 20, 20)
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=20)
-        
-        # 1. REMOVE "PÁGINA X" PERDIDA NO MEIO DO TEXTO
-        clean_content = re.sub(r'(Página \d+|Page \d+)', '', content, flags=re.IGNORECASE)
-        
-        # 2. LIMPEZA DE FORMATACAO MARKDOWN
-        clean_content = clean_content \
-            .replace('**', '') \
-            .replace('__', '') \
-            .replace('`', '') \
-            .replace('##', '') 
-            
-        # 3. SANITIZAÇÃO DE CARACTERES
-        replacements = {
-            '–': '-', '—': '-', '“': '"', '”': '"', '’': "'", '‘': "'", '…': '...', '•': '-'
-        }
-        for char, repl in replacements.items():
-            clean_content = clean_content.replace(char, repl)
-        
-        # MUDANÇA: 'ignore' remove o emoji (evita '?')
-        safe_content = clean_content.encode('latin-1', 'ignore').decode('latin-1')
+        """Devolve o PDF do conteúdo, renderizando só se não estiver em cache."""
+        key = pdf_cache_key(content)
+        cached = _PDF_CACHE.get(key)
+        if cached is not None:
+            with _PDF_LOCK:
+                PDF_STATS["hits"] += 1
+            return cached
 
-        w_eff = pdf.epw 
-        
-        # Divide em parágrafos duplos
-        paragraphs = safe_content.split('\n\n')
-        
-        for p in paragraphs:
-            p = p.strip()
-            if not p: continue
-            
-            # Remove quebras de linha DENTRO do parágrafo
-            fluent_p = p.replace('\n', ' ')
-            
-            # Títulos
-            if p.startswith('#'):
-                clean_title = p.replace('#', '').strip()
-                pdf.set_font("Arial", 'B', 14)
-                pdf.set_text_color(0, 0, 0)
-                pdf.ln(4)
-                pdf.multi_cell(w_eff, 7, clean_title.upper())
-                pdf.ln(2)
-            
-            # Listas
-            elif p.startswith('- ') or p.startswith('* '):
-                pdf.set_font("Arial", '', 11)
-                pdf.set_text_color(30, 30, 30)
-                items = p.split('\n') 
-                for item in items:
-                    clean_item = item.replace('- ', '').replace('* ', '').strip()
-                    if clean_item:
-                        pdf.set_x(25)
-                        pdf.multi_cell(w_eff - 5, 6, f"- {clean_item}")
-                pdf.ln(2)
-                
-            # Texto Normal
-            else:
-                pdf.set_font("Arial", '', 11)
-                pdf.set_text_color(40, 40, 40)
-                pdf.multi_cell(w_eff, 6, fluent_p)
-                pdf.ln(3)
-
-        return bytes(pdf.output(dest='S'))
\ No newline at end of file
+        start = time.perf_counter()
+        pdf_bytes = self._render_pdf(content)
+        elapsed = time.perf_counter() - start
+
+        _PDF_CACHE.set(key, pdf_bytes)
+        with _PDF_LOCK:
+            PDF_STATS["renders"] += 1
+            PDF_STATS["render_seconds"] += elapsed
+            PDF_STATS["last_render_seconds"] = elapsed
+        return pdf_bytes
+
+    @timed("pdf.render")
+    def _render_pdf(self, content: str) -> bytes:
+        # fpdf/fontTools só são importados no primeiro PDF
+        from src.pdf_render import PDF_HEADER, render_markdown
+        return render_markdown(content, PDF_HEADER)
+
+    def stream_with_pdf(self, stream):
+        """
+        Repassa o stream de texto e vai montando o PDF junto; no fim, o PDF já
+        fica no cache (o botão de download não precisa renderizar de novo).
+        Se o PDF falhar no meio, o texto continua chegando e o PDF fica para o botão.
+        """
+        from src.pdf_render import PDF_HEADER, PdfRenderer
+        renderer = PdfRenderer(PDF_HEADER)
+        parts = []
+        elapsed = 0.0
+        for piece in stream:
+            parts.append(piece)
+            if renderer is not None:
+                start = time.perf_counter()
+                try:
+                    renderer.feed(piece)
+                except Exception:
+                    renderer = self._pdf_failed()
+                elapsed += time.perf_counter() - start
+            yield piece
+        if renderer is None:
+            return
+        start = time.perf_counter()
+        try:
+            pdf_bytes = renderer.finish()
+        except Exception:
+            self._pdf_failed()
+            return
+        elapsed += time.perf_counter() - start
+        _PDF_CACHE.set(pdf_cache_key("".join(parts)), pdf_bytes)
+        with _PDF_LOCK:
+            PDF_STATS["renders"] += 1
+            PDF_STATS["render_seconds"] += elapsed
+            PDF_STATS["last_render_seconds"] = elapsed
+
+    @staticmethod
+    def _pdf_failed():
+        with _PDF_LOCK:
+            PDF_STATS["failures"] += 1
+        return None
+
+    @timed("pdf.booklet")
+    def generate_booklet(self, documents, stream=None):
+        """Apostila com várias partes (título, conteúdo); não passa pelo cache de PDFs."""
+        from src.pdf_render import PDF_HEADER, render_booklet
+        return render_booklet(documents, PDF_HEADER, stream)
\ No newline at end of file
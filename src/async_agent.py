@@ -0,0 +1,229 @@
+import asyncio
+import threading
+import time
+
+from google.genai import types
+
+from src.agent import StudyAgent
+from src.llm_client import LLMError, RetryableLLMError
+from src.outline import parse_outline
+from src.retrieval import ContextIndex
+
+
+class AsyncStudyAgent:
+    """
+    Versão asyncio do StudyAgent: mesmos prompts, mesmo cache de respostas,
+    mas usando o cliente assíncrono do SDK (client.aio).
+    """
+
+    def __init__(self, agent: StudyAgent):
+        self.agent = agent
+
+    async def _generate(self, contents, config, kind: str = "") -> str:
+        cache = self.agent.cache
+        key = None
+        # Cache de respostas (SQLite) e contagem exata de tokens (rede) são síncronos:
+        # rodam em threads para não travar as outras corrotinas do loop
+        if cache is not None:
+            key = cache.make_key(self.agent.model_name, config, contents)
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                return cached
+
+        estimated = await asyncio.to_thread(self.agent._estimate, contents)
+        started = time.perf_counter()
+        with self.agent.pool.lease(self.agent.api_key) as client:
+            res = await self.agent.gateway.agenerate(client, self.agent.model_name, contents, config)
+        text = res.text
+        self.agent.usage.record(res.usage_metadata, kind, config.cached_content,
+                                estimated, time.perf_counter() - started)
+        if key is not None and text:
+            await asyncio.to_thread(cache.set, key, text)
+        return text
+
+    async def _call(self, contents, temperature=0.2, kind: str = "") -> str:
+        text = await self._generate(
+            contents,
+            types.GenerateContentConfig(temperature=temperature, max_output_tokens=8192),
+            kind
+        )
+        return StudyAgent._strip_preamble(text)
+
+    async def _course_call(self, task: str, context_data: str, kind: str, cache_key=None) -> str:
+        # Criar/renovar o cache de contexto é uma chamada síncrona do SDK
+        request = self.agent._course_request
+        contents, config = await asyncio.to_thread(request, task, context_data, 0.2, cache_key, False, kind)
+        try:
+            text = await self._generate(contents, config, kind)
+        except LLMError as e:
+            if not config.cached_content or isinstance(e, RetryableLLMError):
+                raise
+            self.agent.context_cache.invalidate(config.cached_content)
+            contents, config = await asyncio.to_thread(request, task, context_data, 0.2, cache_key, True, kind)
+            text = await self._generate(contents, config, kind)
+        return StudyAgent._strip_preamble(text)
+
+    async def create_study_roadmap(self, url_text: str) -> str:
+        compressor = self.agent.compressor
+        url_text = await asyncio.to_thread(compressor.fit, "roadmap", url_text, self.agent._roadmap_prompt(""))
+        return await self._call(self.agent._roadmap_prompt(url_text), kind="roadmap")
+
+    async def generate_lesson(self, topic: str, context_data: str, cache_key=None) -> str:
+        return await self._course_call(self.agent._lesson_task(topic), context_data, "lesson", cache_key)
+
+    async def generate_exercises(self, topic: str, context_data: str, cache_key=None) -> str:
+        return await self._course_call(self.agent._exercises_task(topic), context_data, "exercises", cache_key)
+
+    async def answer_doubt(self, question: str, context_data: str, cache_key=None) -> str:
+        return await self._course_call(self.agent._doubt_task(question), context_data, "answer", cache_key)
+
+    async def generate_mindmap_code(self, context_data: str) -> str:
+        compressor = self.agent.compressor
+        context_data = await asyncio.to_thread(compressor.fit, "mindmap", context_data, self.agent._mindmap_prompt(""))
+        text = await self._generate(self.agent._mindmap_prompt(context_data),
+                                    types.GenerateContentConfig(temperature=0.2), "mindmap")
+        return StudyAgent._clean_dot(text)
+
+    async def generate_pdf(self, content: str) -> bytes:
+        # Renderização é CPU: roda numa thread para não travar o loop
+        return await asyncio.to_thread(self.agent.generate_pdf, content)
+
+
+# --- ORQUESTRADOR DE ARTEFATOS ---
+ARTIFACTS = ("mindmap", "pdf", "exercises", "lessons")
+
+
+class _RateLimiter:
+    """Concorrência máxima + espaçamento mínimo entre chamadas (requisições/minuto)."""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float = None):
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def __aenter__(self):
+        await self._sem.acquire()
+        if self._interval:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next - now
+                self._next = max(now, self._next) + self._interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._sem.release()
+
+
+class ArtifactOrchestrator:
+    """
+    Depois que o plano de ensino fica pronto, gera em paralelo o mapa mental,
+    o PDF do roteiro e os materiais por módulo. O tempo total passa a ser o da
+    chamada mais lenta, não a soma de todas.
+    """
+
+    def __init__(self, agent: AsyncStudyAgent, max_concurrency: int = 4,
+                 requests_per_minute: float = None, context_tokens: int = 6000):
+        self.agent = agent
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.context_tokens = context_tokens
+
+    async def run(self, roadmap: str, artifacts=("mindmap", "pdf", "exercises"),
+                  index: ContextIndex = None, on_result=None) -> dict:
+        """
+        Retorna {"mindmap": str, "pdf": bytes, "exercises": {módulo: str}, "lessons": {módulo: str}}.
+        on_result(tipo, nome, valor) é chamado assim que cada artefato termina.
+        Falhas de um artefato não derrubam os outros: vão para results["errors"].
+        on_result roda numa thread (costuma gravar no SQLite), fora do event loop.
+        """
+        limiter = _RateLimiter(self.max_concurrency, self.requests_per_minute)
+        results = {}
+        if index is None:
+            index = ContextIndex()
+            index.add(roadmap)
+
+        def fail(kind, name, error):
+            results.setdefault("errors", {})[f"{kind}:{name}" if name else kind] = str(error)
+
+        async def store(kind, name, value):
+            if name is None:
+                results[kind] = value
+            else:
+                results.setdefault(kind, {})[name] = value
+            if on_result is not None:
+                await asyncio.to_thread(on_result, kind, name, value)
+
+        async def produce(kind, name, coro_fn, limited=True):
+            # Qualquer falha (modelo, DOT, renderização do PDF, gravação em on_result)
+            # fica só neste artefato: os outros seguem
+            try:
+                if limited:
+                    async with limiter:
+                        value = await coro_fn()
+                else:
+                    value = await coro_fn()
+                await store(kind, name, value)
+            except Exception as e:
+                fail(kind, name, e)
+
+        async def module_task(generate, topic):
+            return await generate(topic, index.build_context(topic, self.context_tokens))
+
+        tasks = []
+        if "mindmap" in artifacts:
+            tasks.append(produce("mindmap", None, lambda: self.agent.generate_mindmap_code(roadmap)))
+        if "pdf" in artifacts:
+            # Renderização é local: não ocupa vaga do limitador de chamadas
+            tasks.append(produce("pdf", None, lambda: self.agent.generate_pdf(roadmap), limited=False))
+
+        modules = parse_outline(roadmap).modules if ("exercises" in artifacts or "lessons" in artifacts) else []
+        for module in modules:
+            topic = module.title
+            if module.topics:
+                topic += ": " + ", ".join(module.topics)
+            if "exercises" in artifacts:
+                tasks.append(produce("exercises", module.title,
+                                     lambda t=topic: module_task(self.agent.generate_exercises, t)))
+            if "lessons" in artifacts:
+                tasks.append(produce("lessons", module.title,
+                                     lambda t=topic: module_task(self.agent.generate_lesson, t)))
+
+        await asyncio.gather(*tasks)
+        return results
+
+
+# --- LOOP DE FUNDO ---
+# Um único event loop por processo, numa thread daemon: o cliente async do SDK
+# mantém as conexões presas ao loop em que foram abertas.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agentstudy-async", daemon=True).start()
+    return _loop
+
+
+def run_async(coro):
+    """Agenda uma corrotina no loop de fundo sem esperar (devolve um concurrent.futures.Future)."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop())
+
+
+def run_sync(coro):
+    """Executa uma corrotina no loop de fundo e espera o resultado (para código síncrono/Streamlit)."""
+    return run_async(coro).result()
+
+
+def prepare_artifacts(agent: StudyAgent, roadmap: str, artifacts=("mindmap", "pdf"),
+                      max_concurrency: int = 4, requests_per_minute: float = None,
+                      index: ContextIndex = None, on_result=None) -> dict:
+    orchestrator = ArtifactOrchestrator(AsyncStudyAgent(agent), max_concurrency=max_concurrency,
+                                        requests_per_minute=requests_per_minute)
+    return run_sync(orchestrator.run(roadmap, artifacts=artifacts, index=index, on_result=on_result))
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import threading
+
+from src.cache import LRUCache
+from src.llm_client import LLMError, estimate_tokens
+from src.retrieval import chunk_text
+
+# Orçamento de tokens de ENTRADA por tipo de chamada (prompt inteiro)
+DEFAULT_BUDGETS = {
+    "roadmap": 20000,
+    "lesson": 32000,
+    "exercises": 32000,
+    "answer": 32000,
+    "followup": 16000,
+    "mindmap": 6000,
+    "summary": 12000,
+    "router": 1000,
+    # Material no cache de contexto do servidor (compartilhado por todos os tipos de chamada)
+    "cached": 128000,
+}
+
+# Separador que o chat usa para anexos colados depois do roteiro
+ATTACHMENT_SEP = "\n\n[ANEXO]: "
+SUMMARY_MARK = "(resumo) "
+TRUNCATED_MARK = "\n\n[... conteúdo omitido por limite de tamanho ...]"
+
+
+def load_budgets() -> dict:
+    """Orçamentos padrão, sobrescritos por AGENTSTUDY_BUDGET_<TIPO> (ex.: AGENTSTUDY_BUDGET_ANSWER=16000)."""
+    budgets = dict(DEFAULT_BUDGETS)
+    for kind in budgets:
+        value = os.getenv(f"AGENTSTUDY_BUDGET_{kind.upper()}")
+        if value:
+            budgets[kind] = int(value)
+    return budgets
+
+
+class TokenCounter:
+    """
+    Conta tokens de um texto: aproximação local (~4 caracteres/token) ou,
+    com `exact=True`, o endpoint count_tokens do SDK. Resultados ficam em cache
+    pelo hash do texto; se o endpoint falhar, cai para a aproximação.
+    """
+
+    def __init__(self, client_factory=None, model: str = None, exact: bool = False, max_entries: int = 2048):
+        self.client_factory = client_factory
+        self.model = model
+        self.exact = exact and client_factory is not None
+        self._cache = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.stats = {"counts": 0, "cache_hits": 0, "sdk_calls": 0, "sdk_failures": 0}
+
+    def _count(self, text: str) -> int:
+        if self.exact:
+            with self._lock:
+                self.stats["sdk_calls"] += 1
+            try:
+                res = self.client_factory().models.count_tokens(model=self.model, contents=text)
+                return res.total_tokens
+            except Exception:
+                with self._lock:
+                    self.stats["sdk_failures"] += 1
+        return estimate_tokens(text)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        # Textos curtos não compensam o hash nem a chamada remota
+        if len(text) < 2000:
+            return estimate_tokens(text)
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        cached = self._cache.get(key)
+        with self._lock:
+            self.stats["counts"] += 1
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+        if cached is not None:
+            return cached
+        tokens = self._count(text)
+        self._cache.set(key, tokens)
+        return tokens
+
+
+class ContextCompressor:
+    """
+    Faz o contexto caber no orçamento sem cortar às cegas, em níveis:
+
+    1. resume os anexos, do mais antigo para o mais novo;
+    2. resume o roteiro (texto longo vira resumo de resumos, por blocos);
+    3. só então corta por parágrafos o que ainda sobrar.
+
+    Cada resumo é feito uma vez e reaproveitado (cache pelo hash do trecho).
+    `summarize(text) -> str` é quem chama o modelo.
+    """
+
+    def __init__(self, summarize, counter: TokenCounter = None, budgets: dict = None, max_summaries: int = 512):
+        self.summarize = summarize
+        self.counter = counter or TokenCounter()
+        self.budgets = budgets or load_budgets()
+        self._summaries = LRUCache(max_entries=max_summaries)
+        self._lock = threading.Lock()
+        self.stats = {"checked": 0, "over_budget": 0, "summaries": 0, "summary_hits": 0, "truncated": 0}
+
+    def _bump(self, field):
+        with self._lock:
+            self.stats[field] += 1
+
+    def _summary(self, text: str) -> str:
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        cached = self._summaries.get(key)
+        if cached is not None:
+            self._bump("summary_hits")
+            return cached
+        limit = self.budgets.get("summary", DEFAULT_BUDGETS["summary"])
+        if self.counter.count(text) > limit:
+            # Grande demais para uma chamada: resume por blocos e junta
+            pieces = [self._summary(block) for block in chunk_text(text, max_chars=limit * 3, overlap=0)]
+            summary = "\n\n".join(pieces)
+            if self.counter.count(summary) > limit and len(pieces) > 1:
+                summary = self._summary(summary)
+        else:
+            self._bump("summaries")
+            summary = self.summarize(text)
+        self._summaries.set(key, summary)
+        return summary
+
+    def _try_summary(self, text: str):
+        try:
+            return self._summary(text)
+        except LLMError:
+            return None
+
+    def _cut(self, text: str, tokens: int) -> str:
+        """Corte seco de um trecho sem parágrafos (texto corrido de PDF/HTML), ~4 caracteres por token."""
+        chars = max(tokens, 0) * 4
+        cut = text[:chars]
+        while cut and self.counter.count(cut) > tokens:
+            chars = int(chars * 0.9)
+            cut = text[:chars]
+        return cut
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        self._bump("truncated")
+        tokens -= self.counter.count(TRUNCATED_MARK)
+        out = []
+        used = 0
+        for para in text.split("\n\n"):
+            cost = self.counter.count(para) + 1
+            if used + cost > tokens:
+                if not out:
+                    # O primeiro parágrafo sozinho já estoura: fica o começo dele, não nada
+                    out.append(self._cut(para, tokens))
+                break
+            out.append(para)
+            used += cost
+        return "\n\n".join(out) + TRUNCATED_MARK
+
+    def clip(self, kind: str, text: str, fixed: str = "") -> str:
+        """Só corta (sem resumos no modelo): para entradas curtas como a mensagem do roteador."""
+        limit = self.available(kind, fixed)
+        if self.counter.count(text) <= limit:
+            return text
+        return self._truncate(text, max(limit, 0))
+
+    def available(self, kind: str, fixed: str = "") -> int:
+        """Tokens que sobram para o contexto depois da parte fixa (instruções + tarefa)."""
+        return self.budgets.get(kind, DEFAULT_BUDGETS["answer"]) - self.counter.count(fixed)
+
+    def fit(self, kind: str, context: str, fixed: str = "") -> str:
+        """Devolve o contexto dentro do orçamento de `kind`, comprimindo se preciso."""
+        self._bump("checked")
+        limit = self.available(kind, fixed)
+        if self.counter.count(context) <= limit:
+            return context
+        self._bump("over_budget")
+
+        head, *attachments = context.split(ATTACHMENT_SEP)
+
+        def join():
+            return head + "".join(ATTACHMENT_SEP + a for a in attachments)
+
+        # Nível 1: anexos mais antigos viram resumo primeiro
+        for i, text in enumerate(attachments):
+            if text.startswith(SUMMARY_MARK):
+                continue
+            summary = self._try_summary(text)
+            if summary is not None:
+                attachments[i] = SUMMARY_MARK + summary
+                if self.counter.count(join()) <= limit:
+                    return join()
+
+        # Nível 2: o próprio roteiro
+        if not head.startswith(SUMMARY_MARK):
+            summary = self._try_summary(head)
+            if summary is not None:
+                head = SUMMARY_MARK + summary
+                if self.counter.count(join()) <= limit:
+                    return join()
+
+        # Nível 3: corte por parágrafos, preservando o começo
+        return self._truncate(join(), max(limit, 0))
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _fingerprint(obj, h):
+    """Alimenta o hash com uma representação estável de texto, bytes, listas ou tipos do SDK."""
+    if obj is None:
+        h.update(b'\x00')
+    elif isinstance(obj, str):
+        h.update(b's' + obj.encode('utf-8'))
+    elif isinstance(obj, (bytes, bytearray)):
+        h.update(b'b' + bytes(obj))
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for item in obj:
+            _fingerprint(item, h)
+            h.update(b',')
+        h.update(b']')
+    elif isinstance(obj, dict):
+        h.update(json.dumps(obj, sort_keys=True, default=str).encode('utf-8'))
+    elif hasattr(obj, 'model_dump_json'):
+        # Tipos do google.genai são modelos pydantic (Part, GenerateContentConfig...)
+        h.update(obj.model_dump_json(exclude_none=True).encode('utf-8'))
+    else:
+        h.update(repr(obj).encode('utf-8'))
+
+
+def make_key(model: str, config, contents) -> str:
+    """Chave de conteúdo: sha256(modelo + config + contents)."""
+    h = hashlib.sha256()
+    _fingerprint(model, h)
+    _fingerprint(config, h)
+    _fingerprint(contents, h)
+    return h.hexdigest()
+
+
+class LRUCache:
+    """LRU em memória, thread-safe, com TTL opcional."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[0] if item else None
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DiskCache:
+    """Camada persistente em SQLite com TTL e despejo por tamanho (entradas e bytes)."""
+
+    def __init__(self, path: str, ttl: float = None, max_entries: int = 5000, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl and created + self.ttl < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key, value):
+        """value: str ou bytes."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, now, len(value) if isinstance(value, bytes) else len(value.encode('utf-8'))),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl:
+            cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self.evictions += cur.rowcount
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        # Remove os menos acessados até caber nos limites
+        while count > self.max_entries or total > self.max_bytes:
+            row = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            count -= 1
+            total -= row[1]
+            self.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Cache de respostas do LLM em dois níveis: LRU em memória + SQLite opcional.
+    A chave é o hash de (modelo, config, contents), então o mesmo prompt
+    enviado por alunos diferentes reaproveita a mesma resposta.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = None, db_path: str = None,
+                 max_db_entries: int = 5000, max_db_bytes: int = 200 * 1024 * 1024):
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.disk = DiskCache(db_path, ttl=ttl, max_entries=max_db_entries, max_bytes=max_db_bytes) if db_path else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+    make_key = staticmethod(make_key)
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+                self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                # Promove para a memória
+                self.memory.set(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+            "evictions": self.memory.evictions + (self.disk.evictions if self.disk is not None else 0),
+        }
@@ -0,0 +1,111 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+def clean_api_key(api_key: str) -> str:
+    if not api_key:
+        raise ValueError("API Key é obrigatória.")
+    return api_key.strip().replace('"', '').replace("'", "")
+
+
+class ClientPool:
+    """
+    Um genai.Client por chave de API, compartilhado pelo processo inteiro.
+    O pool de conexões HTTP (httpx, sync e async) é reaproveitado entre
+    usuários e disciplinas: só a primeira chamada paga DNS + TLS.
+
+    `lease()` marca uma chamada em andamento, para medir a utilização.
+    `factory(api_key)` substitui a criação do cliente (ex.: cliente falso nos benchmarks).
+    """
+
+    def __init__(self, max_connections: int = 32, max_keepalive: int = 16,
+                 keepalive_expiry: float = 60.0, timeout: float = None, factory=None):
+        self.factory = factory
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.stats = {"clients": 0, "leases": 0, "in_use": 0, "peak_in_use": 0,
+                      "busy_seconds": 0.0, "created": time.time()}
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive,
+                            keepalive_expiry=self.keepalive_expiry)
+
+    def _build(self, api_key: str):
+        if self.factory is not None:
+            return self.factory(api_key)
+        # SDK importado só na primeira geração (partida a frio mais rápida)
+        from google import genai
+        from google.genai import types
+        options = types.HttpOptions(
+            client_args={"limits": self._limits()},
+            async_client_args={"limits": self._limits()},
+            timeout=int(self.timeout * 1000) if self.timeout else None,
+        )
+        return genai.Client(api_key=api_key, http_options=options)
+
+    def get(self, api_key: str):
+        """Cliente compartilhado da chave (criado na primeira vez)."""
+        key = clean_api_key(api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._build(key)
+                self._clients[key] = client
+                self.stats["clients"] += 1
+            return client
+
+    @contextmanager
+    def lease(self, api_key: str):
+        """Empresta o cliente durante uma chamada (conta uso e pico de concorrência)."""
+        client = self.get(api_key)
+        started = time.perf_counter()
+        with self._lock:
+            self.stats["leases"] += 1
+            self.stats["in_use"] += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self.stats["in_use"])
+        try:
+            yield client
+        finally:
+            with self._lock:
+                self.stats["in_use"] -= 1
+                self.stats["busy_seconds"] += time.perf_counter() - started
+
+    def utilisation(self) -> dict:
+        """Fotografia do uso: chamadas em andamento vs limite de conexões."""
+        with self._lock:
+            stats = dict(self.stats)
+        elapsed = max(time.time() - stats.pop("created"), 1e-9)
+        stats["max_connections"] = self.max_connections
+        stats["utilisation"] = stats["in_use"] / self.max_connections
+        # Média de chamadas simultâneas desde a criação do pool
+        stats["avg_in_use"] = stats["busy_seconds"] / elapsed
+        return stats
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+# --- POOL DO PROCESSO ---
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ClientPool()
+        return _default_pool
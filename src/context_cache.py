@@ -0,0 +1,236 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from src.llm_client import estimate_tokens
+
+
+# --- CONTAGEM DE TOKENS POR CHAMADA ---
+_SUMMED = ("prompt_tokens", "cached_tokens", "uncached_tokens", "output_tokens", "estimated_tokens", "seconds")
+
+
+class UsageLog:
+    """
+    Métricas por chamada: tokens de entrada (do cache de contexto e cobrados
+    cheios), saída, estimativa local antes do envio e latência.
+    """
+
+    def __init__(self, history: int = 200):
+        self._lock = threading.Lock()
+        self.calls = deque(maxlen=history)
+        self.totals = dict.fromkeys(("calls",) + _SUMMED, 0)
+        self.kinds = {}
+
+    def record(self, usage, kind: str = "", cached_content: str = None,
+               estimated: int = 0, seconds: float = 0.0) -> dict:
+        """Registra o usage_metadata de uma resposta (None = chamada sem metadados)."""
+        prompt = getattr(usage, 'prompt_token_count', None) or 0
+        cached = getattr(usage, 'cached_content_token_count', None) or 0
+        output = getattr(usage, 'candidates_token_count', None) or 0
+        entry = {"time": time.time(), "kind": kind, "cached_content": cached_content,
+                 "prompt_tokens": prompt, "cached_tokens": cached,
+                 "uncached_tokens": max(prompt - cached, 0), "output_tokens": output,
+                 "estimated_tokens": estimated, "seconds": seconds}
+        with self._lock:
+            self.calls.append(entry)
+            per_kind = self.kinds.setdefault(kind or "other", dict.fromkeys(("calls",) + _SUMMED, 0))
+            for totals in (self.totals, per_kind):
+                totals["calls"] += 1
+                for field in _SUMMED:
+                    totals[field] += entry[field]
+        return entry
+
+    def by_kind(self) -> dict:
+        """Totais por tipo de chamada (roadmap, lesson, answer, summary...)."""
+        with self._lock:
+            return {kind: dict(totals) for kind, totals in self.kinds.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self.totals)
+        totals["cached_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        return totals
+
+
+# --- CACHE DE CONTEXTO NO SERVIDOR ---
+@dataclass
+class _Entry:
+    name: str
+    model: str
+    expires: float
+
+
+class ContextCacheManager:
+    """
+    Mantém o material da disciplina (instruções + contexto) como CachedContent
+    no Gemini, para que cada turno do chat mande só a tarefa nova.
+
+    - Só cria cache quando o contexto passa de `min_tokens` (abaixo disso a API recusa).
+    - Reaproveita o mesmo cache enquanto o material não muda; renova o TTL perto do fim.
+    - Quando o material de uma sessão muda, apaga o cache antigo (se ninguém mais usa).
+    - Se a API falhar (modelo sem suporte, cota, chave gratuita), desliga por
+      `cooldown` segundos e o agente volta a mandar o contexto inline.
+    - Criar/renovar/apagar acontece fora do lock: um cache lento não trava o chat
+      das outras sessões; pedidos do mesmo material esperam o primeiro.
+    """
+
+    def __init__(self, min_tokens: int = 4096, ttl: float = 3600, refresh_margin: float = 300,
+                 max_entries: int = 64, cooldown: float = 600, wait_timeout: float = 5):
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self.cooldown = cooldown
+        self.wait_timeout = wait_timeout
+        self._entries = {}    # digest -> _Entry
+        self._pending = {}    # digest -> Event de quem está criando/renovando
+        self._sessions = {}   # chave da sessão -> digest
+        self._lock = threading.RLock()
+        self._unavailable_until = 0.0
+        self.stats = {"created": 0, "reused": 0, "refreshed": 0, "deleted": 0, "failures": 0}
+
+    @staticmethod
+    def digest(model: str, system: str, context: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, system, context):
+            h.update(part.encode('utf-8'))
+            h.update(b'\x00')
+        return h.hexdigest()
+
+    def available(self) -> bool:
+        return time.time() >= self._unavailable_until
+
+    def eligible(self, context: str) -> bool:
+        """Vale a pena (e é possível) cachear este contexto?"""
+        return self.available() and estimate_tokens(context) >= self.min_tokens
+
+    def _ttl(self) -> str:
+        return f"{int(self.ttl)}s"
+
+    def _drop(self, digest) -> list:
+        """Tira do índice um cache que nenhuma sessão referencia mais; devolve os nomes a apagar."""
+        if digest in self._sessions.values():
+            return []
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return []
+        self.stats["deleted"] += 1
+        return [entry.name]
+
+    @staticmethod
+    def _delete(client, names):
+        # Sempre fora do lock: apagar é uma chamada de rede
+        for name in names:
+            try:
+                client.caches.delete(name=name)
+            except Exception:
+                pass  # expira sozinho no servidor
+
+    def ensure(self, client, model: str, system: str, context: str, session_key=None):
+        """Nome do CachedContent para (modelo, instruções, contexto), ou None para mandar inline."""
+        if not self.eligible(context):
+            return None
+        digest = self.digest(model, system, context)
+        session_key = session_key if session_key is not None else digest
+        with self._lock:
+            previous = self._sessions.get(session_key)
+            self._sessions[session_key] = digest
+            doomed = self._drop(previous) if previous is not None and previous != digest else []
+        try:
+            return self._acquire(client, model, system, context, digest)
+        finally:
+            self._delete(client, doomed)
+
+    def _acquire(self, client, model, system, context, digest):
+        # O lock só protege o índice: as chamadas ao servidor acontecem fora dele,
+        # com uma vaga reservada por digest para não criar o mesmo cache duas vezes
+        while True:
+            if not self.available():
+                return None
+            with self._lock:
+                entry = self._entries.get(digest)
+                if entry is not None and entry.expires - time.time() > self.refresh_margin:
+                    self.stats["reused"] += 1
+                    return entry.name
+                slot = self._pending.get(digest)
+                if slot is None:
+                    slot = self._pending[digest] = threading.Event()
+                    break
+            # Outra thread está criando/renovando este cache: espera por ela
+            if not slot.wait(self.wait_timeout):
+                return None  # demorando demais: este turno manda o contexto inline
+
+        from google.genai import types
+        doomed = []
+        try:
+            if entry is not None:
+                try:
+                    client.caches.update(name=entry.name, config=types.UpdateCachedContentConfig(ttl=self._ttl()))
+                    with self._lock:
+                        entry.expires = time.time() + self.ttl
+                        self.stats["refreshed"] += 1
+                    return entry.name
+                except Exception:
+                    with self._lock:
+                        self._entries.pop(digest, None)
+
+            try:
+                cached = client.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system,
+                        contents=[context],
+                        ttl=self._ttl(),
+                        display_name=f"agentstudy-{digest[:12]}",
+                    )
+                )
+            except Exception:
+                with self._lock:
+                    self.stats["failures"] += 1
+                    self._unavailable_until = time.time() + self.cooldown
+                return None
+            with self._lock:
+                now = time.time()
+                self.stats["created"] += 1
+                self._entries[digest] = _Entry(cached.name, model, now + self.ttl)
+                doomed = self._evict(now)
+            return cached.name
+        finally:
+            with self._lock:
+                self._pending.pop(digest, None)
+            slot.set()
+            self._delete(client, doomed)
+
+    def _evict(self, now) -> list:
+        # Expirados somem primeiro; depois os que vencem antes, até caber no limite
+        doomed = []
+        for digest, entry in sorted(self._entries.items(), key=lambda kv: kv[1].expires):
+            if entry.expires > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.pop(digest, None)
+            for key in [k for k, d in self._sessions.items() if d == digest]:
+                del self._sessions[key]
+            if entry.expires > now:
+                self.stats["deleted"] += 1
+                doomed.append(entry.name)
+        return doomed
+
+    def invalidate(self, name: str):
+        """Esquece um cache que o servidor rejeitou (expirado/apagado por fora)."""
+        with self._lock:
+            for digest, entry in list(self._entries.items()):
+                if entry.name == name:
+                    del self._entries[digest]
+
+    def expire(self, client, session_key):
+        """A sessão acabou: libera o cache dela."""
+        with self._lock:
+            digest = self._sessions.pop(session_key, None)
+            doomed = self._drop(digest) if digest is not None else []
+        self._delete(client, doomed)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), available=self.available())
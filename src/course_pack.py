@@ -0,0 +1,204 @@
+"""
+Pacote da disciplina: aula + lista de exercícios de cada tópico do cronograma,
+gerados em paralelo e entregues num PDF único (ou num ZIP com um PDF por seção).
+
+- As chamadas ao Gemini rodam no loop de fundo (AsyncStudyAgent), com limite
+  de concorrência; a renderização roda na thread de quem chamou, em ordem,
+  assim que as seções anteriores ficam prontas.
+- Cada seção pronta é entregue a `on_section` (checkpoint); numa nova tentativa,
+  as seções passadas em `done` não são geradas de novo.
+"""
+import asyncio
+import io
+import queue
+import re
+import zipfile
+from dataclasses import dataclass, field
+
+from src.agent import StudyAgent
+from src.async_agent import AsyncStudyAgent, _RateLimiter, run_async
+from src.llm_client import LLMError
+from src.outline import parse_outline
+from src.pdf_render import PDF_HEADER, PdfRenderer
+from src.retrieval import ContextIndex
+
+KIND_LABELS = {"lessons": "Aula", "exercises": "Exercícios"}
+
+
+@dataclass
+class Section:
+    module: str
+    topic: str
+    kind: str
+
+    @property
+    def key(self) -> str:
+        """Nome do checkpoint (estável entre tentativas)."""
+        return f"{self.module} · {self.topic}"
+
+    @property
+    def title(self) -> str:
+        topic = self.module if self.topic == self.module else f"{self.module}: {self.topic}"
+        return f"{KIND_LABELS[self.kind]} — {topic}"
+
+
+@dataclass
+class PackResult:
+    data: bytes
+    sections: int
+    generated: int = 0
+    reused: int = 0
+    errors: dict = field(default_factory=dict)
+
+
+def plan_sections(roadmap: str, kinds=("lessons", "exercises")) -> list:
+    """Seções do pacote na ordem do cronograma (módulo sem tópicos vira um tópico só)."""
+    sections = []
+    for module in parse_outline(roadmap).modules:
+        for topic in module.topics or [module.title]:
+            sections.extend(Section(module.title, topic, kind) for kind in kinds)
+    return sections
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^\w]+', '_', text).strip('_')[:60] or "secao"
+
+
+class CoursePackBuilder:
+    """
+    builder = CoursePackBuilder(agent, max_concurrency=4)
+    result = builder.build(roadmap, fmt="pdf", done=checkpoints, on_section=salvar)
+    """
+
+    def __init__(self, agent: StudyAgent, max_concurrency: int = 4,
+                 requests_per_minute: float = None, context_tokens: int = 6000):
+        self.agent = agent
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.context_tokens = context_tokens
+
+    def _context(self, section: Section, index: ContextIndex, material: str) -> str:
+        if material is not None and self.agent.context_cache is not None and self.agent.context_cache.eligible(material):
+            # Material inteiro cacheado no servidor: toda seção reaproveita o mesmo prefixo
+            return material
+        return index.build_context(f"{section.module}: {section.topic}", self.context_tokens)
+
+    async def _generate(self, todo, results: queue.Queue, cache_key):
+        agent = AsyncStudyAgent(self.agent)
+        limiter = _RateLimiter(self.max_concurrency, self.requests_per_minute)
+
+        async def one(i, section, context):
+            topic = f"{section.module}: {section.topic}" if section.topic != section.module else section.module
+            fn = agent.generate_lesson if section.kind == "lessons" else agent.generate_exercises
+            try:
+                async with limiter:
+                    text = await fn(topic, context, cache_key)
+            except LLMError as e:
+                results.put((i, None, str(e)))
+                return
+            results.put((i, text, None))
+
+        await asyncio.gather(*(one(i, s, c) for i, s, c in todo))
+
+    def build(self, roadmap: str, fmt: str = "pdf", material: str = None, index: ContextIndex = None,
+              cache_key=None, done: dict = None, on_section=None, progress=None, check=None,
+              kinds=("lessons", "exercises")) -> PackResult:
+        """
+        fmt: "pdf" (um PDF com marcadores por seção) ou "zip" (um PDF + .md por seção).
+        done: {(tipo, chave): texto} já gerados. on_section(seção, texto) a cada seção nova.
+        progress(prontas, total, título) e check() (levanta exceção para cancelar) são opcionais.
+        """
+        sections = plan_sections(roadmap, kinds)
+        done = done or {}
+        if index is None:
+            index = ContextIndex()
+            index.add(material or roadmap)
+        result = PackResult(data=b"", sections=len(sections))
+
+        texts = {}
+        todo = []
+        for i, section in enumerate(sections):
+            text = done.get((section.kind, section.key))
+            if text is not None:
+                texts[i] = text
+                result.reused += 1
+            else:
+                todo.append((i, section, self._context(section, index, material)))
+
+        writer = _PdfWriter(roadmap) if fmt == "pdf" else _ZipWriter(roadmap, self.agent.generate_pdf)
+        next_i = 0
+
+        def drain():
+            # Renderiza em ordem tudo o que já está pronto a partir de next_i
+            nonlocal next_i
+            while next_i < len(sections) and next_i in texts:
+                section = sections[next_i]
+                text = texts.pop(next_i)
+                if text is None:
+                    text = f"⚠️ Seção não gerada: {result.errors[section.kind + ':' + section.key]}"
+                writer.add(next_i, section, text)
+                next_i += 1
+                if progress is not None:
+                    progress(next_i, len(sections), section.title)
+
+        drain()
+        results = queue.Queue()
+        future = run_async(self._generate(todo, results, cache_key)) if todo else None
+        try:
+            for _ in range(len(todo)):
+                while True:
+                    if check is not None:
+                        check()
+                    try:
+                        i, text, error = results.get(timeout=0.5)
+                        break
+                    except queue.Empty:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+                section = sections[i]
+                if error is None:
+                    result.generated += 1
+                    if on_section is not None:
+                        on_section(section, text)
+                else:
+                    result.errors[f"{section.kind}:{section.key}"] = error
+                texts[i] = text
+                drain()
+        except BaseException:
+            if future is not None:
+                future.cancel()
+            raise
+
+        result.data = writer.finish()
+        return result
+
+
+class _PdfWriter:
+    def __init__(self, roadmap: str):
+        self.renderer = PdfRenderer(PDF_HEADER)
+        self.renderer.add_document("Plano de Ensino", roadmap)
+
+    def add(self, i, section, text):
+        self.renderer.add_document(section.title, text)
+
+    def finish(self) -> bytes:
+        return self.renderer.finish()
+
+
+class _ZipWriter:
+    def __init__(self, roadmap: str, render):
+        # render = agent.generate_pdf: PDFs por seção passam pelo cache do processo
+        self.render = render
+        self.out = io.BytesIO()
+        self.zip = zipfile.ZipFile(self.out, "w", zipfile.ZIP_DEFLATED)
+        self.zip.writestr("00_Plano_de_Ensino.md", roadmap)
+        self.zip.writestr("00_Plano_de_Ensino.pdf", render(roadmap))
+
+    def add(self, i, section, text):
+        name = f"{i + 1:02d}_{KIND_LABELS[section.kind]}_{_slug(section.key)}"
+        self.zip.writestr(f"{name}.md", text)
+        self.zip.writestr(f"{name}.pdf", self.render(text))
+
+    def finish(self) -> bytes:
+        self.zip.close()
+        return self.out.getvalue()
@@ -0,0 +1,302 @@
+"""
+Varredura da disciplina: parte da URL colada pelo aluno e segue os links do
+mesmo site que parecem material do curso (ementa, plano, programa, bibliografia,
+PDFs, recursos do Moodle), a um ou dois cliques de distância.
+
+- Os links vêm das anotações `texto [LINK: url]` que o scraper já deixa no texto
+  (menus, rodapés e barras laterais já foram descartados ali).
+- Fila por relevância: palavras-chave no texto do link e na URL, bônus para PDF,
+  penalidade por profundidade; links abaixo de min_score nem entram.
+- Downloads concorrentes com orçamento de páginas, bytes, profundidade e tempo.
+- URLs deduplicadas pela forma canônica (src.dedup.normalize_url).
+- robots.txt (Disallow e Crawl-delay) vale para os links seguidos; a página
+  colada pelo aluno é sempre lida, como no modo sem varredura.
+O resultado vira um só contexto, do mais para o menos relevante, para create_study_roadmap.
+"""
+import hashlib
+import heapq
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from urllib.parse import urldefrag, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from src.dedup import normalize_text, normalize_url
+from src.metrics import span, timed
+from src.scraper import fetch_page, get_session
+
+AGENT_NAME = "AgentStudy"
+
+LINK_RE = re.compile(r"([^\n]*?)\s*\[LINK: ([^\]\s]+)\]")
+
+# Pistas no texto do link ou na URL (sem acentos, minúsculas) e o peso de cada uma
+KEYWORDS = {
+    "ementa": 3.0, "plano de ensino": 3.0, "plano de curso": 3.0, "plano": 2.0, "programa": 2.5,
+    "conteudo programatico": 3.0, "syllabus": 3.0, "bibliografia": 2.0, "cronograma": 1.5,
+    "apostila": 2.0, "material": 1.5, "slides": 1.5, "exercicios": 1.5, "disciplina": 1.0, "aula": 1.0,
+    # Moodle: recursos, pastas, páginas e livros do curso
+    "mod resource": 2.0, "mod folder": 1.5, "mod page": 1.5, "mod book": 1.5, "pluginfile": 2.0,
+}
+NEGATIVE = {
+    "login": -4.0, "logout": -4.0, "senha": -3.0, "cadastro": -2.0, "inscricao": -2.0, "contato": -2.0,
+    "noticias": -2.0, "noticia": -2.0, "eventos": -1.5, "ouvidoria": -2.0, "imprensa": -2.0, "promo": -2.0,
+    "facebook": -3.0, "instagram": -3.0, "twitter": -3.0, "youtube": -3.0, "whatsapp": -3.0, "linkedin": -3.0,
+}
+PDF_BONUS = 2.0
+DEPTH_PENALTY = 0.5
+# Arquivos que o scraper não lê
+SKIP_EXT = (".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".zip", ".rar", ".7z",
+            ".mp3", ".mp4", ".avi", ".doc", ".docx", ".ppt", ".pptx", ".xls", ".xlsx", ".odt")
+
+CRAWL_STATS = {"crawls": 0, "pages": 0, "bytes": 0, "errors": 0, "robots_blocked": 0, "budget_cut": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**values):
+    with _stats_lock:
+        for key, value in values.items():
+            CRAWL_STATS[key] += value
+
+
+def parse_links(text: str) -> list:
+    """[(texto do link, url)] das anotações [LINK: ...] do scraper, na ordem do texto."""
+    return [(label.strip(), urldefrag(url)[0]) for label, url in LINK_RE.findall(text)]
+
+
+def score_link(label: str, url: str, depth: int = 1) -> float:
+    """Relevância do link para o material da disciplina (quanto maior, mais cedo é baixado)."""
+    parts = urlsplit(url)
+    hay = f" {normalize_text(f'{label} {parts.path} {parts.query}')} "
+    score = sum(weight for word, weight in KEYWORDS.items() if f" {word} " in hay)
+    score += sum(weight for word, weight in NEGATIVE.items() if f" {word} " in hay)
+    if parts.path.lower().endswith(".pdf") or " pdf " in f" {normalize_text(label)} ":
+        score += PDF_BONUS
+    return score - DEPTH_PENALTY * (depth - 1)
+
+
+def site_of(url: str) -> str:
+    """Host (com porta, sem www.) usado para decidir o que é "mesmo site"."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}:{parts.port}" if parts.port else host
+
+
+class RobotsPolicy:
+    """robots.txt por origem, baixado uma vez por varredura."""
+
+    def __init__(self, timeout: float = 5):
+        self.timeout = timeout
+        self._parsers = {}
+        self._lock = threading.Lock()
+
+    def _parser(self, url: str) -> RobotFileParser:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            parser = self._parsers.get(origin)
+            if parser is None:
+                parser = RobotFileParser(origin + "/robots.txt")
+                try:
+                    with span("crawler.robots"):
+                        response = get_session().get(origin + "/robots.txt", timeout=self.timeout)
+                    if response.status_code in (401, 403):
+                        parser.disallow_all = True
+                    elif response.status_code >= 400:
+                        parser.allow_all = True
+                    else:
+                        parser.parse(response.text.splitlines())
+                except Exception:
+                    # Sem robots.txt acessível: nada proibido
+                    parser.allow_all = True
+                self._parsers[origin] = parser
+            return parser
+
+    def allowed(self, url: str) -> bool:
+        return self._parser(url).can_fetch(AGENT_NAME, url)
+
+    def delay(self, url: str) -> float:
+        return float(self._parser(url).crawl_delay(AGENT_NAME) or 0)
+
+
+@dataclass
+class CrawledPage:
+    url: str
+    text: str
+    depth: int
+    score: float
+    size: int
+
+
+@dataclass
+class CrawlResult:
+    pages: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)     # url -> mensagem
+    skipped: dict = field(default_factory=dict)    # motivo -> quantidade
+    bytes: int = 0
+    elapsed: float = 0.0
+
+    def skip(self, reason: str):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def context(self, max_chars: int = 60000, page_chars: int = 20000) -> str:
+        """Um texto só: a página colada primeiro, depois da mais para a menos relevante, sem repetidas."""
+        ranked = sorted(self.pages, key=lambda p: (p.depth > 0, -p.score, p.depth))
+        parts, seen, total = [], set(), 0
+        for page in ranked:
+            digest = hashlib.sha256(normalize_text(page.text).encode("utf-8")).hexdigest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            section = f"### Fonte: {page.url}\n{page.text[:page_chars]}"
+            if total + len(section) > max_chars:
+                section = section[:max_chars - total]
+            parts.append(section)
+            total += len(section) + 2
+            if total >= max_chars:
+                break
+        return "\n\n".join(parts)
+
+
+class Crawler:
+    """
+    crawler = Crawler(max_pages=8, max_depth=2)
+    result = crawler.crawl("https://dept.univ.br/disciplinas/calculo1")
+    agent.create_study_roadmap(result.context())
+    """
+
+    def __init__(self, max_pages: int = 8, max_depth: int = 2, max_bytes: int = 8 * 1024 * 1024,
+                 max_workers: int = 4, max_seconds: float = 45, timeout: float = 15, min_score: float = 1.0,
+                 http_cache=None, robots: RobotsPolicy = None):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.max_seconds = max_seconds
+        self.timeout = timeout
+        self.min_score = min_score
+        self.http_cache = http_cache
+        self.robots = robots or RobotsPolicy(timeout=min(timeout, 5))
+        self._next_at = {}
+        self._polite_lock = threading.Lock()
+
+    def _polite(self, url: str):
+        # Crawl-delay do robots.txt: espaça os pedidos ao mesmo host
+        delay = self.robots.delay(url)
+        if not delay:
+            return
+        host = site_of(url)
+        with self._polite_lock:
+            now = time.monotonic()
+            at = max(now, self._next_at.get(host, now))
+            self._next_at[host] = at + delay
+        time.sleep(at - now)
+
+    def _get(self, url: str, max_bytes: int) -> tuple:
+        self._polite(url)
+        text, size = fetch_page(url, self.timeout, self.http_cache, max_bytes=max_bytes)
+        # Os extratores de PDF devolvem o erro como texto
+        if text.startswith("Erro PDF"):
+            raise ValueError(text)
+        return text, size
+
+    def _enqueue(self, page: CrawledPage, site: str, seen: set, frontier: list, order, result: CrawlResult):
+        for label, link in parse_links(page.text):
+            if not link.startswith(("http://", "https://")):
+                result.skip("scheme")
+                continue
+            if site_of(link) != site:
+                result.skip("off_site")
+                continue
+            if urlsplit(link).path.lower().endswith(SKIP_EXT):
+                result.skip("file_type")
+                continue
+            key = normalize_url(link)
+            if key in seen:
+                result.skip("visited")
+                continue
+            score = score_link(label, link, page.depth + 1)
+            if score < self.min_score:
+                result.skip("low_score")
+                continue
+            seen.add(key)
+            heapq.heappush(frontier, (-score, next(order), link, page.depth + 1))
+
+    @timed("crawler.crawl")
+    def crawl(self, url: str, on_page=None) -> CrawlResult:
+        """
+        Lê `url` e os links relevantes do mesmo site. Erros na página inicial sobem
+        (login, 403...); erros nas seguintes ficam em result.errors.
+        on_page(page, result) é chamado a cada página baixada.
+        """
+        start = time.perf_counter()
+        deadline = start + self.max_seconds
+        result = CrawlResult()
+        site = site_of(url)
+        seen = {normalize_url(url)}
+        frontier, order = [], itertools.count()
+
+        text, size = fetch_page(url, self.timeout, self.http_cache)
+        root = CrawledPage(url, text, 0, 0.0, size)
+        result.pages.append(root)
+        result.bytes += size
+        if on_page is not None:
+            on_page(root, result)
+        if self.max_depth > 0:
+            self._enqueue(root, site, seen, frontier, order, result)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agentstudy-crawl")
+        running = {}
+        reserved = 0   # bytes prometidos aos downloads em andamento
+        try:
+            while frontier or running:
+                while (frontier and len(running) < self.max_workers
+                       and len(result.pages) + len(running) < self.max_pages
+                       and result.bytes + reserved < self.max_bytes and time.perf_counter() < deadline):
+                    neg_score, _, link, depth = heapq.heappop(frontier)
+                    if not self.robots.allowed(link):
+                        result.skip("robots")
+                        continue
+                    # O que sobra do orçamento é dividido entre os downloads que vão começar
+                    # agora; a soma das reservas nunca passa de max_bytes
+                    slots = min(self.max_workers - len(running), len(frontier) + 1,
+                                self.max_pages - len(result.pages) - len(running))
+                    allowance = (self.max_bytes - result.bytes - reserved) // slots
+                    reserved += allowance
+                    future = pool.submit(self._get, link, allowance)
+                    running[future] = (link, depth, -neg_score, allowance)
+                if not running:
+                    break
+                done, _ = wait(running, timeout=max(0.0, deadline - time.perf_counter()),
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    break  # estourou o tempo: o que estava baixando fica de fora
+                for future in done:
+                    link, depth, score, allowance = running.pop(future)
+                    reserved -= allowance
+                    try:
+                        text, size = future.result()
+                    except Exception as e:
+                        result.errors[link] = str(e)
+                        continue
+                    page = CrawledPage(link, text, depth, score, size)
+                    result.pages.append(page)
+                    result.bytes += size
+                    if on_page is not None:
+                        on_page(page, result)
+                    if depth < self.max_depth:
+                        self._enqueue(page, site, seen, frontier, order, result)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        # Links que ficaram na fila (ou em andamento) por falta de orçamento
+        for _ in range(len(frontier) + len(running)):
+            result.skip("budget")
+        result.elapsed = time.perf_counter() - start
+        _count(crawls=1, pages=len(result.pages), bytes=result.bytes, errors=len(result.errors),
+               robots_blocked=result.skipped.get("robots", 0), budget_cut=result.skipped.get("budget", 0))
+        return result
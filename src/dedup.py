@@ -0,0 +1,239 @@
+"""
+Deduplicação de disciplinas entre alunos: a mesma ementa (ou quase a mesma)
+colada por vários alunos reaproveita o plano de ensino já gerado.
+
+Três níveis, do mais barato para o mais caro:
+  1. URL normalizada (sem fragmento, parâmetros de rastreio/sessão, query ordenada):
+     se a entrada ainda estiver dentro de `url_ttl`, nem baixa a página de novo;
+  2. hash exato do texto normalizado;
+  3. quase-duplicata: SimHash de 64 bits (candidatos por 8 faixas de 8 bits no
+     SQLite, distância de Hamming <= max_hamming) confirmada pela similaridade de
+     Jaccard estimada com MinHash bottom-k (>= min_jaccard).
+Entradas mais velhas que `max_age` não casam (o plano é gerado de novo).
+"""
+import hashlib
+import heapq
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Parâmetros que não mudam o conteúdo da página (rastreio, sessão, cache-busting)
+IGNORED_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src",
+                  "jsessionid", "phpsessid", "sessionid", "sid", "session", "token", "_", "ts", "timestamp",
+                  "nocache", "cachebuster"}
+IGNORED_PREFIXES = ("utm_",)
+
+_BITS = 64
+_BANDS = 8
+_BAND_BITS = _BITS // _BANDS
+_SKETCH = 128
+
+
+def normalize_url(url: str) -> str:
+    """Forma canônica da URL: mesmo conteúdo -> mesma chave."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    # ;jsessionid=... no caminho (Java/SIGAA) e barra final
+    path = re.sub(r";jsessionid=[^/?#]*", "", parts.path, flags=re.IGNORECASE).rstrip("/") or "/"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in IGNORED_PARAMS and not k.lower().startswith(IGNORED_PREFIXES))
+    # http e https servem a mesma ementa: a chave ignora o esquema
+    return urlunsplit(("", host, path, urlencode(query), "")).lstrip("/")
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(words: list) -> int:
+    """SimHash de 64 bits das palavras, com peso pela frequência."""
+    weights = [0] * _BITS
+    for word, n in Counter(words).items():
+        h = _hash64(word)
+        for bit in range(_BITS):
+            weights[bit] += n if h >> bit & 1 else -n
+    return sum(1 << bit for bit in range(_BITS) if weights[bit] > 0)
+
+
+def minhash_sketch(words: list, k: int = _SKETCH) -> list:
+    """MinHash bottom-k dos shingles de 3 palavras: os k menores hashes distintos."""
+    shingles = {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+    return sorted(heapq.nsmallest(k, {_hash64(s) for s in shingles}))
+
+
+def jaccard(a: list, b: list, k: int = _SKETCH) -> float:
+    """Jaccard estimado a partir de dois sketches bottom-k."""
+    if not a or not b:
+        return 0.0
+    union = heapq.nsmallest(k, set(a) | set(b))
+    both = set(a) & set(b)
+    return sum(1 for h in union if h in both) / len(union)
+
+
+def _signed(value: int) -> int:
+    # SQLite guarda inteiros de 64 bits com sinal
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _bands(value: int) -> list:
+    mask = (1 << _BAND_BITS) - 1
+    return [(value >> (i * _BAND_BITS)) & mask for i in range(_BANDS)]
+
+
+@dataclass
+class Fingerprint:
+    text_hash: str
+    simhash: int
+    sketch: list
+
+
+def fingerprint(text: str) -> Fingerprint:
+    words = normalize_text(text).split()
+    return Fingerprint(hashlib.sha256(" ".join(words).encode("utf-8")).hexdigest(),
+                       simhash(words), minhash_sketch(words))
+
+
+@dataclass
+class CourseMatch:
+    id: int
+    roadmap: str
+    session_id: int
+    kind: str            # "url", "exact" ou "near"
+    similarity: float = 1.0
+
+
+class CourseIndex:
+    """
+    Índice compartilhado (entre alunos) das ementas já processadas.
+
+    index = CourseIndex(".data/courses.db")
+    match = index.lookup_url(url) or index.lookup_text(texto)
+    if match is None:
+        index.add(texto, roadmap, session_id, url=url)
+    """
+
+    def __init__(self, path: str, min_jaccard: float = 0.8, max_hamming: int = 6,
+                 max_age: float = 120 * 24 * 3600, url_ttl: float = 24 * 3600):
+        self.min_jaccard = min_jaccard
+        # Até _BANDS - 1 bits de diferença, alguma faixa coincide (senão o candidato nem aparece)
+        self.max_hamming = min(max_hamming, _BANDS - 1)
+        self.max_age = max_age
+        self.url_ttl = url_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS courses ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, text_hash TEXT NOT NULL,"
+            " simhash INTEGER NOT NULL," + "".join(f" b{i} INTEGER," for i in range(_BANDS)) +
+            " sketch BLOB NOT NULL, roadmap TEXT NOT NULL, session_id INTEGER,"
+            " created REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS courses_url ON courses(url);"
+            "CREATE INDEX IF NOT EXISTS courses_hash ON courses(text_hash);"
+            + "".join(f"CREATE INDEX IF NOT EXISTS courses_b{i} ON courses(b{i});" for i in range(_BANDS))
+        )
+        self._conn.commit()
+        self.stats = {"url_hits": 0, "exact_hits": 0, "near_hits": 0, "misses": 0, "added": 0}
+
+    def _bump(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _fresh(self, row, ttl: float) -> bool:
+        return not ttl or row["created"] + ttl >= time.time()
+
+    def _hit(self, row, kind: str, similarity: float = 1.0) -> CourseMatch:
+        with self._lock:
+            self._conn.execute("UPDATE courses SET hits = hits + 1 WHERE id = ?", (row["id"],))
+            self._conn.commit()
+        self._bump(f"{kind}_hits")
+        return CourseMatch(row["id"], row["roadmap"], row["session_id"], kind, similarity)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def lookup_url(self, url: str):
+        """Mesma URL (normalizada) vista há menos de url_ttl: reaproveita sem baixar a página."""
+        rows = self._query("SELECT * FROM courses WHERE url = ? ORDER BY created DESC LIMIT 1", (normalize_url(url),))
+        if rows and self._fresh(rows[0], min(self.url_ttl, self.max_age) if self.max_age else self.url_ttl):
+            return self._hit(rows[0], "url")
+        return None
+
+    def lookup_text(self, text: str, fp: Fingerprint = None):
+        """Texto igual (hash) ou quase igual (SimHash + MinHash) a uma ementa já processada."""
+        fp = fp or fingerprint(text)
+        for row in self._query("SELECT * FROM courses WHERE text_hash = ? ORDER BY created DESC", (fp.text_hash,)):
+            if self._fresh(row, self.max_age):
+                return self._hit(row, "exact")
+
+        bands = _bands(fp.simhash)
+        where = " OR ".join(f"b{i} = ?" for i in range(_BANDS))
+        best, best_sim = None, 0.0
+        for row in self._query(f"SELECT * FROM courses WHERE {where}", bands):
+            if not self._fresh(row, self.max_age):
+                continue
+            if bin((row["simhash"] & ((1 << 64) - 1)) ^ fp.simhash).count("1") > self.max_hamming:
+                continue
+            sim = jaccard(fp.sketch, _unpack(row["sketch"]))
+            if sim >= self.min_jaccard and sim > best_sim:
+                best, best_sim = row, sim
+        if best is not None:
+            return self._hit(best, "near", round(best_sim, 3))
+        self._bump("misses")
+        return None
+
+    def add(self, text: str, roadmap: str, session_id: int = None, url: str = None, fp: Fingerprint = None) -> int:
+        fp = fp or fingerprint(text)
+        bands = ", ".join(f"b{i}" for i in range(_BANDS))
+        with self._lock:
+            cur = self._conn.execute(
+                f"INSERT INTO courses (url, text_hash, simhash, {bands}, sketch, roadmap, session_id, created)"
+                f" VALUES (?, ?, ?, {', '.join('?' * _BANDS)}, ?, ?, ?, ?)",
+                (normalize_url(url) if url else None, fp.text_hash, _signed(fp.simhash), *_bands(fp.simhash),
+                 _pack(fp.sketch), roadmap, session_id, time.time())
+            )
+            self._conn.commit()
+        self._bump("added")
+        return cur.lastrowid
+
+    def prune(self) -> int:
+        """Apaga entradas mais velhas que max_age."""
+        if not self.max_age:
+            return 0
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM courses WHERE created < ?", (time.time() - self.max_age,))
+            self._conn.commit()
+        return cur.rowcount
+
+    def summary(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+            out["entries"] = self._conn.execute("SELECT COUNT(*) FROM courses").fetchone()[0]
+        lookups = out["url_hits"] + out["exact_hits"] + out["near_hits"] + out["misses"]
+        out["hit_rate"] = (lookups - out["misses"]) / lookups if lookups else 0.0
+        return out
+
+
+def _pack(sketch: list) -> bytes:
+    return b"".join(h.to_bytes(8, "big") for h in sketch)
+
+
+def _unpack(data: bytes) -> list:
+    return [int.from_bytes(data[i:i + 8], "big") for i in range(0, len(data), 8)]
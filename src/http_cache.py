@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import threading
+
+from src.cache import DiskCache
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class HttpCache:
+    """
+    Cache HTTP persistente do scraper, num SQLite (<directory>/index.db) com o
+    mesmo TTL e despejo por entradas/bytes do DiskCache de respostas:
+
+    - meta:<hash da url>: validadores (ETag/Last-Modified) e hash do corpo
+    - body:<hash do corpo>: corpo bruto, para reextrair se preciso
+    - text:<chave>: texto já extraído, para pular o parsing em páginas iguais
+    Qualquer peça despejada só custa um GET completo ou um novo parsing.
+    """
+
+    def __init__(self, directory: str, ttl: float = 30 * 24 * 3600, max_entries: int = 20000,
+                 max_bytes: int = 500 * 1024 * 1024):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.disk = DiskCache(os.path.join(directory, 'index.db'), ttl=ttl, max_entries=max_entries,
+                              max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def count(self, field: str):
+        # Chamado das threads do crawler e da ingestão em lote
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    # --- Metadados / validadores ---
+    def lookup(self, url: str):
+        raw = self.disk.get('meta:' + _sha(url.encode('utf-8')))
+        try:
+            return json.loads(raw) if raw else None
+        except ValueError:
+            return None
+
+    def conditional_headers(self, meta) -> dict:
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url: str, response) -> dict:
+        """Guarda corpo e validadores de uma resposta 200."""
+        body = response.content
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type', ''),
+            'encoding': response.encoding,
+            'body_hash': _sha(body),
+        }
+        self.disk.set('body:' + meta['body_hash'], body)
+        self.disk.set('meta:' + _sha(url.encode('utf-8')), json.dumps(meta))
+        return meta
+
+    def body(self, meta):
+        try:
+            return self.disk.get('body:' + meta['body_hash'])
+        except KeyError:
+            return None
+
+    # --- Texto extraído ---
+    @staticmethod
+    def text_key(body_hash: str, base_url: str = None) -> str:
+        # HTML depende da URL base (links absolutos); PDF só do corpo
+        if base_url is None:
+            return body_hash
+        return _sha((body_hash + '\x00' + base_url).encode('utf-8'))
+
+    def get_text(self, key: str):
+        return self.disk.get('text:' + key)
+
+    def put_text(self, key: str, text: str):
+        self.disk.set('text:' + key, text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+        out["entries"] = len(self.disk)
+        out["evictions"] = self.disk.evictions
+        return out
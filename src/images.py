@@ -0,0 +1,114 @@
+"""
+Imagens didáticas geradas pelo chat: uma chamada ao Imagen por pedido distinto.
+
+- Cache pelo hash do prompt normalizado (minúsculas, sem acentos/pontuação):
+  "Desenhe a célula!" e "desenhe a celula" reaproveitam a mesma imagem.
+- Reencodadas em WebP (PNG otimizado se o Pillow não tiver WebP), com lado
+  máximo limitado, e gravadas uma vez nos blobs do SessionStore (endereçados
+  por conteúdo).
+- Uma miniatura acompanha cada imagem: o histórico mostra a miniatura e o
+  tamanho original só vai para o navegador quando o aluno pede.
+As mensagens guardam apenas os nomes dos blobs.
+"""
+import hashlib
+import io
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+from PIL import Image, features
+
+from src.session_store import SessionStore
+
+FORMAT, EXT = ("WEBP", "webp") if features.check("webp") else ("PNG", "png")
+
+
+def normalize_prompt(prompt: str) -> str:
+    text = unicodedata.normalize("NFKD", prompt.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text))
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+
+def encode_image(data: bytes, max_side: int, quality: int = 80) -> bytes:
+    """Reduz para caber em max_side x max_side e reencoda no formato compacto."""
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    buf = io.BytesIO()
+    if FORMAT == "WEBP":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+@dataclass
+class ImageRef:
+    full: str
+    thumb: str
+
+
+class ImageStore:
+    """
+    images = ImageStore(store)
+    ref = images.get_or_create("gere uma imagem da mitose", agent.generate_didactic_image)
+    ref.full, ref.thumb   # nomes de blobs (store.blob_path(nome))
+    """
+
+    def __init__(self, store: SessionStore, max_side: int = 1600, thumb_side: int = 480, quality: int = 80):
+        self.store = store
+        self.max_side = max_side
+        self.thumb_side = thumb_side
+        self.quality = quality
+        self._lock = threading.Lock()
+        # Locks por faixa de hash: pedidos iguais simultâneos esperam a mesma geração
+        self._stripes = [threading.Lock() for _ in range(32)]
+        self.stats = {"hits": 0, "generated": 0, "failed": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def _bump(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def get(self, prompt: str):
+        row = self.store.get_image(prompt_key(prompt))
+        if row is None:
+            return None
+        ref = ImageRef(row["full"], row["thumb"])
+        # Blob apagado à mão: trata como ausente e gera de novo
+        if not all(self.store.has_blob(name) for name in (ref.full, ref.thumb)):
+            return None
+        return ref
+
+    def put(self, prompt: str, data: bytes) -> ImageRef:
+        full = encode_image(data, self.max_side, self.quality)
+        thumb = encode_image(full, self.thumb_side, self.quality)
+        ref = ImageRef(self.store.put_blob(full, EXT), self.store.put_blob(thumb, EXT))
+        self.store.set_image(prompt_key(prompt), ref.full, ref.thumb)
+        self._bump("bytes_in", len(data))
+        self._bump("bytes_out", len(full))
+        return ref
+
+    def get_or_create(self, prompt: str, generate):
+        """Imagem do prompt, do cache ou gerada por generate(prompt) -> bytes|None. None se falhar."""
+        with self._stripes[int(prompt_key(prompt)[:8], 16) % len(self._stripes)]:
+            ref = self.get(prompt)
+            if ref is not None:
+                self._bump("hits")
+                return ref
+            data = generate(prompt)
+            if not data:
+                self._bump("failed")
+                return None
+            self._bump("generated")
+            return self.put(prompt, data)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,105 @@
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+
+from src.scraper import extract_text_from_url, extract_text_from_pdf
+
+
+@dataclass
+class IngestResult:
+    """Resultado estruturado de uma fonte (URL ou PDF local)."""
+    source: str
+    ok: bool
+    text: str = ""
+    error: str = ""
+    attempts: int = 0
+    elapsed: float = 0.0
+
+
+def _is_retryable(exc: Exception) -> bool:
+    # Rede instável ou servidor sobrecarregado: vale tentar de novo
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return False
+
+
+def _read_source(source: str, timeout: float, http_cache=None) -> str:
+    if os.path.exists(source):
+        with open(source, 'rb') as f:
+            text = extract_text_from_pdf(f)
+    else:
+        text = extract_text_from_url(source, timeout=timeout, http_cache=http_cache)
+    # Os extratores de PDF devolvem o erro como texto
+    if text.startswith("Erro PDF"):
+        raise ValueError(text)
+    return text
+
+
+class BatchIngestor:
+    """
+    Ingestão concorrente de várias disciplinas de uma vez.
+    Usa a sessão HTTP compartilhada do scraper, limita conexões por host
+    e repete com backoff exponencial só os erros transitórios.
+    """
+
+    def __init__(self, max_workers: int = 8, per_host: int = 2, retries: int = 2,
+                 backoff: float = 0.5, timeout: float = 15, http_cache=None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.http_cache = http_cache
+        self._host_limits = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, source: str):
+        host = urlparse(source).netloc.lower() or 'local'
+        with self._lock:
+            return self._host_limits[host]
+
+    def ingest_one(self, source: str) -> IngestResult:
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self._host_semaphore(source):
+                    text = _read_source(source, self.timeout, self.http_cache)
+                return IngestResult(source, True, text=text, attempts=attempt,
+                                    elapsed=time.perf_counter() - start)
+            except Exception as e:
+                if attempt <= self.retries and _is_retryable(e):
+                    # Backoff exponencial com jitter (fora do semáforo do host)
+                    time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+                    continue
+                return IngestResult(source, False, error=str(e), attempts=attempt,
+                                    elapsed=time.perf_counter() - start)
+
+    def ingest(self, sources, on_result=None) -> list:
+        """Processa todas as fontes; o resultado mantém a ordem de entrada."""
+        sources = list(sources)
+        results = [None] * len(sources)
+
+        def work(i):
+            res = self.ingest_one(sources[i])
+            results[i] = res
+            if on_result is not None:
+                on_result(res)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(work, range(len(sources))))
+        return results
+
+
+def ingest_many(sources, **options) -> list:
+    return BatchIngestor(**options).ingest(sources)
@@ -0,0 +1,171 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+
+class JobCancelled(Exception):
+    """Levantada dentro do job quando alguém pediu o cancelamento."""
+
+
+class QueueFullError(RuntimeError):
+    """Fila cheia: o servidor já tem trabalho demais enfileirado."""
+
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    session_id: object = None
+    key: str = None
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ""
+    partial: str = ""
+    result: object = None
+    error: str = None
+    created: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        # Só deixa de ser ativo depois que o resultado foi gravado (on_done)
+        return self.finished is None
+
+    def update(self, progress: float = None, message: str = None, partial: str = None):
+        """Chamado pelo próprio job para reportar andamento (e checar cancelamento)."""
+        self.check()
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+
+class JobQueue:
+    """
+    Fila de geração em segundo plano, com pool limitado de threads.
+
+    - submit(tipo, fn, ...) enfileira fn(job); fn reporta andamento com job.update().
+    - `key` deduplica: enquanto houver job ativo com a mesma chave, devolve o mesmo.
+    - cancel() tira da fila ou sinaliza o job em execução (cancelamento cooperativo).
+    - on_done(job) roda na thread do worker ao final (done/failed/cancelled) e é
+      onde o resultado é gravado na sessão.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 64, keep_finished: int = 200):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agentstudy-job")
+        self._jobs = {}
+        self._futures = {}
+        self._by_key = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "deduplicated": 0, "done": 0, "failed": 0, "cancelled": 0, "rejected": 0}
+
+    def submit(self, kind: str, fn, session_id=None, key: str = None, on_done=None) -> Job:
+        with self._lock:
+            if key is not None:
+                existing = self._jobs.get(self._by_key.get(key))
+                if existing is not None and existing.active:
+                    self.stats["deduplicated"] += 1
+                    return existing
+            queued = sum(1 for j in self._jobs.values() if j.status == QUEUED)
+            if queued >= self.max_queued:
+                self.stats["rejected"] += 1
+                raise QueueFullError("Muitas gerações na fila. Tente de novo em instantes.")
+            job = Job(next(self._ids), kind, session_id, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job.id
+            self.stats["submitted"] += 1
+            self._futures[job.id] = (self._executor.submit(self._run, job, fn, on_done), on_done)
+            self._trim()
+        return job
+
+    def _run(self, job: Job, fn, on_done):
+        if job._cancel.is_set():
+            job.status = CANCELLED
+        else:
+            job.status = RUNNING
+            job.started = time.time()
+            try:
+                job.result = fn(job)
+                job.status = DONE
+                job.progress = 1.0
+            except JobCancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e)
+        self._finish(job, on_done)
+
+    def _finish(self, job: Job, on_done):
+        if on_done is not None:
+            try:
+                on_done(job)
+            except Exception as e:
+                job.status, job.error = FAILED, f"Falha ao salvar o resultado: {e}"
+        job.finished = time.time()
+        with self._lock:
+            self.stats[job.status] += 1
+            self._futures.pop(job.id, None)
+
+    def _trim(self):
+        # Esquece os finalizados mais antigos (os ativos ficam sempre)
+        finished = [j for j in self._jobs.values() if not j.active]
+        for job in sorted(finished, key=lambda j: j.finished or 0)[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) == job.id:
+                del self._by_key[job.key]
+
+    # --- consulta ---
+    def get(self, job_id: int):
+        return self._jobs.get(job_id)
+
+    def find(self, key: str):
+        with self._lock:
+            return self._jobs.get(self._by_key.get(key))
+
+    def jobs_for(self, session_id, active_only: bool = True) -> list:
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if j.session_id == session_id]
+        return [j for j in jobs if j.active] if active_only else jobs
+
+    def cancel(self, job_id: int) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job._cancel.set()
+        future, on_done = self._futures.get(job_id, (None, None))
+        if future is not None and future.cancel():
+            # Ainda estava na fila: nunca vai rodar, então finaliza aqui
+            job.status = CANCELLED
+            self._finish(job, on_done)
+        return True
+
+    def cancel_session(self, session_id):
+        for job in self.jobs_for(session_id):
+            self.cancel(job.id)
+
+    def summary(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+            stats = dict(self.stats)
+        stats["queued"] = sum(1 for j in jobs if j.status == QUEUED)
+        stats["running"] = sum(1 for j in jobs if j.status == RUNNING)
+        stats["max_workers"] = self.max_workers
+        return stats
@@ -0,0 +1,33 @@
+"""
+Construção preguiçosa para a partida a frio: a tela inicial abre sem importar
+o SDK do Gemini, o fpdf e o scraper; eles só entram no primeiro uso.
+"""
+import threading
+
+
+class LazyObject:
+    """
+    Proxy que só constrói o objeto no primeiro acesso a um atributo.
+
+    agent = LazyObject(lambda: StudyAgent(api_key))   # nada importado ainda
+    agent.stream_answer(...)                            # importa e constrói aqui
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    def is_loaded(self) -> bool:
+        return self._obj is not None
+
+    def __getattr__(self, name):
+        # Só chega aqui para atributos que não são do proxy
+        return getattr(self.resolve(), name)
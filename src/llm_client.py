@@ -0,0 +1,280 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from src.cache import make_key
+
+
+# --- ERROS TIPADOS ---
+class LLMError(Exception):
+    """Falha definitiva ao chamar o modelo (não adianta repetir)."""
+
+
+class RetryableLLMError(LLMError):
+    """Falha temporária: vale tentar de novo depois de um tempo."""
+
+
+class RateLimitError(RetryableLLMError):
+    """Cota por minuto estourada (HTTP 429)."""
+
+
+class ServiceUnavailableError(RetryableLLMError):
+    """Erro 5xx, timeout ou queda de conexão."""
+
+
+class _LeaderAborted(Exception):
+    """O pedido líder foi cancelado ou quebrou fora do SDK: os seguidores chamam de novo."""
+
+
+class EmptyResponseError(LLMError):
+    """O modelo não devolveu texto (bloqueio de segurança, corte, etc.)."""
+
+
+def classify_error(exc: Exception) -> LLMError:
+    """Converte exceções do SDK/httpx em erros tipados."""
+    if isinstance(exc, LLMError):
+        return exc
+    code = getattr(exc, 'code', None)
+    if code == 429:
+        return RateLimitError(f"Limite de uso do Gemini atingido. Tente de novo em instantes. ({exc})")
+    if isinstance(code, int) and code >= 500:
+        return ServiceUnavailableError(f"Serviço do Gemini indisponível no momento. ({exc})")
+    name = type(exc).__name__
+    if isinstance(exc, (TimeoutError, ConnectionError)) or 'Timeout' in name or 'Connect' in name or 'RemoteProtocol' in name:
+        return ServiceUnavailableError(f"Falha de conexão com o Gemini. ({exc})")
+    return LLMError(f"Falha ao gerar conteúdo: {exc}")
+
+
+def estimate_tokens(contents) -> int:
+    """Estimativa barata (~4 caracteres por token) de texto ou lista de partes."""
+    if contents is None:
+        return 0
+    if isinstance(contents, str):
+        return len(contents) // 4 + 1
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(c) for c in contents)
+    text = getattr(contents, 'text', None)
+    if isinstance(text, str):
+        return len(text) // 4 + 1
+    return 258  # partes binárias (imagem/PDF) custam um valor fixo por bloco
+
+
+# --- LIMITADOR DE TAXA ---
+class TokenBucket:
+    """Balde de fichas thread-safe: `rate` fichas por segundo, até `capacity` acumuladas."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Bloqueia até haver fichas. Retorna quanto tempo esperou."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """Cotas por minuto de requisições (RPM) e de tokens (TPM). None = sem limite."""
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens: int = 0) -> float:
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None and tokens:
+            waited += self.tokens.acquire(tokens)
+        return waited
+
+
+# --- GATEWAY ---
+class GeminiGateway:
+    """
+    Camada única entre o StudyAgent e o cliente do Gemini:
+    limitador de taxa, retry com backoff exponencial + jitter, e
+    coalescência (single-flight) de requisições idênticas em andamento.
+    Funciona com qualquer objeto que imite client.models / client.aio.models.
+    """
+
+    def __init__(self, limiter: RateLimiter = None, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0):
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "coalesced": 0, "errors": 0, "throttled_seconds": 0.0}
+
+    def _count(self, field, amount=1):
+        with self._lock:
+            self.stats[field] += amount
+
+    def _delay(self, attempt: int) -> float:
+        # "Full jitter": espalha as novas tentativas de vários usuários
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _check(res):
+        try:
+            text = res.text
+        except Exception as e:
+            raise EmptyResponseError(f"Resposta inválida do modelo: {e}")
+        if not text:
+            raise EmptyResponseError("O modelo não retornou conteúdo (possível bloqueio de segurança).")
+        return res
+
+    def _lead(self, key):
+        """Retorna (future, é_líder)."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.stats["coalesced"] += 1
+                return fut, False
+            fut = Future()
+            self._inflight[key] = fut
+            return fut, True
+
+    def _finish(self, key, fut, result=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if fut.done():
+            return
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    # --- síncrono ---
+    def _attempts(self, fn, contents):
+        tokens = estimate_tokens(contents)
+        attempt = 0
+        while True:
+            self._count("throttled_seconds", self.limiter.acquire(tokens))
+            self._count("calls")
+            try:
+                return self._check(fn())
+            except Exception as e:
+                err = classify_error(e)
+                if isinstance(err, RetryableLLMError) and attempt < self.max_retries:
+                    self._count("retries")
+                    time.sleep(self._delay(attempt))
+                    attempt += 1
+                    continue
+                self._count("errors")
+                raise err from e
+
+    def generate(self, client, model: str, contents, config):
+        """generate_content com limite, retry e coalescência. Retorna a resposta do SDK."""
+        key = make_key(model, config, contents)
+        while True:
+            fut, leader = self._lead(key)
+            if leader:
+                break
+            try:
+                return fut.result()
+            except _LeaderAborted:
+                continue  # o líder desistiu: este pedido assume (ou segue um novo líder)
+        try:
+            res = self._attempts(
+                lambda: client.models.generate_content(model=model, contents=contents, config=config),
+                contents
+            )
+        except LLMError as e:
+            self._finish(key, fut, error=e)
+            raise
+        except BaseException:
+            # Cancelamento (job, Ctrl+C) ou erro inesperado: a chave nunca fica presa
+            self._finish(key, fut, error=_LeaderAborted())
+            raise
+        self._finish(key, fut, result=res)
+        return res
+
+    def stream(self, client, model: str, contents, config):
+        """
+        generate_content_stream com limite e retry até o primeiro pedaço chegar.
+        Depois disso, uma falha vira erro tipado (não dá para repetir sem duplicar texto).
+        """
+        tokens = estimate_tokens(contents)
+        attempt = 0
+        while True:
+            self._count("throttled_seconds", self.limiter.acquire(tokens))
+            self._count("calls")
+            started = False
+            try:
+                for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                err = classify_error(e)
+                if not started and isinstance(err, RetryableLLMError) and attempt < self.max_retries:
+                    self._count("retries")
+                    time.sleep(self._delay(attempt))
+                    attempt += 1
+                    continue
+                self._count("errors")
+                raise err from e
+
+    # --- assíncrono ---
+    async def agenerate(self, client, model: str, contents, config):
+        """Versão async do generate (client.aio), compartilhando limites e coalescência."""
+        key = make_key(model, config, contents)
+        while True:
+            fut, leader = self._lead(key)
+            if leader:
+                break
+            try:
+                # shield: cancelar este seguidor não cancela o future compartilhado
+                return await asyncio.shield(asyncio.wrap_future(fut))
+            except _LeaderAborted:
+                continue
+        tokens = estimate_tokens(contents)
+        attempt = 0
+        try:
+            while True:
+                self._count("throttled_seconds", await asyncio.to_thread(self.limiter.acquire, tokens))
+                self._count("calls")
+                try:
+                    res = self._check(await client.aio.models.generate_content(
+                        model=model, contents=contents, config=config))
+                    break
+                except Exception as e:
+                    err = classify_error(e)
+                    if isinstance(err, RetryableLLMError) and attempt < self.max_retries:
+                        self._count("retries")
+                        await asyncio.sleep(self._delay(attempt))
+                        attempt += 1
+                        continue
+                    self._count("errors")
+                    raise err from e
+        except LLMError as e:
+            self._finish(key, fut, error=e)
+            raise
+        except BaseException:
+            # asyncio.CancelledError (task cancelada pelo CoursePackBuilder) e afins
+            self._finish(key, fut, error=_LeaderAborted())
+            raise
+        self._finish(key, fut, result=res)
+        return res
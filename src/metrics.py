@@ -0,0 +1,227 @@
+import functools
+import inspect
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+class Registry:
+    """
+    Métricas do processo: durações por etapa (últimas `window` amostras),
+    contadores e "coletores" (funções que devolvem dicts de estatísticas
+    de outros componentes: cache, gateway, pool...).
+    """
+
+    def __init__(self, window: int = 1000, log_path: str = None):
+        self.window = window
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._totals = {}
+        self._counters = {}
+        self._collectors = {}
+        self.profiles = deque(maxlen=10)
+
+    # --- registro ---
+    def observe(self, name: str, seconds: float, error: bool = False):
+        with self._lock:
+            samples = self._spans.get(name)
+            if samples is None:
+                samples = self._spans[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0, 0]
+            samples.append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += int(error)
+        if self.log_path:
+            self._log({"time": time.time(), "span": name, "seconds": round(seconds, 6), "error": error})
+
+    def count(self, name: str, amount: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def register(self, name: str, collector):
+        """collector() -> dict; chamado só quando alguém lê as métricas."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def _log(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    # --- leitura ---
+    def summary(self) -> dict:
+        """{etapa: {count, errors, total, mean, p50, p95, max}} (percentis sobre a janela)."""
+        with self._lock:
+            spans = {name: (sorted(samples), list(self._totals[name])) for name, samples in self._spans.items()}
+        out = {}
+        for name, (values, (count, total, errors)) in sorted(spans.items()):
+            out[name] = {
+                "count": count, "errors": errors, "total": total,
+                "mean": total / count if count else 0.0,
+                "p50": _percentile(values, 0.50), "p95": _percentile(values, 0.95),
+                "max": values[-1] if values else 0.0,
+            }
+        return out
+
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def collect(self) -> dict:
+        with self._lock:
+            collectors = dict(self._collectors)
+        out = {}
+        for name, fn in collectors.items():
+            try:
+                out[name] = fn()
+            except Exception as e:
+                out[name] = {"error": str(e)}
+        return out
+
+    def to_jsonl(self) -> str:
+        """Fotografia atual: uma linha por etapa, contador e coletor."""
+        lines = [json.dumps({"span": k, **v}) for k, v in self.summary().items()]
+        lines += [json.dumps({"counter": k, "value": v}) for k, v in self.counters().items()]
+        lines += [json.dumps({"collector": k, "value": v}, default=str) for k, v in self.collect().items()]
+        return "\n".join(lines) + "\n"
+
+    def to_prometheus(self, prefix: str = "agentstudy") -> str:
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for name, s in self.summary().items():
+            label = f'stage="{name}"'
+            lines.append(f'{prefix}_stage_seconds{{{label},quantile="0.5"}} {s["p50"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds{{{label},quantile="0.95"}} {s["p95"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{{label}}} {s["total"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{{label}}} {s["count"]}')
+            lines.append(f'{prefix}_stage_errors_total{{{label}}} {s["errors"]}')
+        counters = self.counters()
+        if counters:
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for name, value in sorted(counters.items()):
+                lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._totals.clear()
+            self._counters.clear()
+            self.profiles.clear()
+
+
+REGISTRY = Registry(log_path=os.getenv("AGENTSTUDY_METRICS_LOG") or None)
+
+
+@contextmanager
+def span(name: str):
+    """Cronometra um bloco. Exceções contam como erro da etapa (e seguem adiante)."""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException as e:
+        # Controle de fluxo do Streamlit (rerun/stop) não é erro
+        error = not type(e).__name__.endswith(("RerunException", "StopException"))
+        raise
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - started, error)
+
+
+def _timed_generator(name, gen, started):
+    error = False
+    try:
+        yield from gen
+    except BaseException:
+        error = True
+        raise
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - started, error)
+
+
+def timed(name: str):
+    """
+    Decorador de span. Se a função devolve um gerador (streaming), o tempo
+    conta até o gerador terminar, não só até o primeiro yield.
+    """
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                return _timed_generator(name, fn(*args, **kwargs), time.perf_counter())
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                REGISTRY.observe(name, time.perf_counter() - started, True)
+                raise
+            if inspect.isgenerator(result):
+                return _timed_generator(name, result, started)
+            REGISTRY.observe(name, time.perf_counter() - started)
+            return result
+        return wrapper
+    return decorator
+
+
+def count(name: str, amount: float = 1):
+    REGISTRY.count(name, amount)
+
+
+# --- PERFIL SOB DEMANDA ---
+@contextmanager
+def profile(name: str, enabled: bool = True):
+    """
+    Perfila um único pedido (opt-in). Usa pyinstrument se estiver instalado,
+    senão cProfile; o relatório em texto vai para REGISTRY.profiles.
+    """
+    if not enabled:
+        yield
+        return
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            REGISTRY.profiles.append({"time": time.time(), "name": name, "tool": "pyinstrument",
+                                      "report": profiler.output_text(unicode=True)})
+        return
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+        REGISTRY.profiles.append({"time": time.time(), "name": name, "tool": "cProfile",
+                                  "report": out.getvalue()})
@@ -0,0 +1,157 @@
+"""
+Mapa mental local: o DOT sai direto da estrutura do plano de ensino
+(título -> módulos -> tópicos, via src/outline.py), sem chamar o LLM.
+
+- build_dot(roadmap): determinístico, em milissegundos; mesmo plano = mesmo DOT.
+- extract_dot / check_dot: limpam e validam o DOT que vem do LLM (enriquecimento).
+- render_svg(dot): layout feito uma vez por grafo (hash do DOT) e guardado em cache;
+  sem o binário do Graphviz devolve None e a tela cai para st.graphviz_chart.
+"""
+import hashlib
+import re
+import textwrap
+import threading
+import time
+
+from src.cache import LRUCache
+from src.metrics import timed
+from src.outline import parse_outline
+
+# Mesmo visual pedido ao LLM em StudyAgent._mindmap_prompt (estilo NotebookLM)
+GRAPH_ATTRS = 'rankdir=LR; splines=curved; nodesep=0.25; ranksep=0.6; bgcolor="transparent";'
+NODE_ATTRS = ('node [shape=box, style="rounded,filled", fillcolor="#F3F4F6", color="#E5E7EB", '
+              'fontname="Helvetica", fontsize=11, margin="0.15,0.06"];')
+EDGE_ATTRS = 'edge [color="#9CA3AF", arrowhead=none, penwidth=1.2];'
+ROOT_ATTRS = 'fillcolor="#E0E7FF", color="#C7D2FE", fontsize=14'
+MODULE_ATTRS = 'fillcolor="#EEF2FF", fontsize=12'
+
+# SVGs prontos: por processo, chave = hash do DOT
+_SVG_CACHE = LRUCache(max_entries=64)
+_STATS_LOCK = threading.Lock()
+MINDMAP_STATS = {"builds": 0, "svg_renders": 0, "svg_hits": 0, "svg_unavailable": 0, "render_seconds": 0.0}
+# Graphviz ausente: espera GRAPHVIZ_RETRY segundos antes de procurar o binário de novo
+GRAPHVIZ_RETRY = 300
+_graphviz_retry_at = 0.0
+
+
+def _bump(key: str, value=1):
+    with _STATS_LOCK:
+        MINDMAP_STATS[key] += value
+
+
+def _label(text: str, width: int) -> str:
+    # Quebra em linhas curtas e escapa para string DOT
+    text = re.sub(r'\s+', ' ', text).strip()
+    lines = textwrap.wrap(text, width) or [""]
+    if len(lines) > 3:
+        lines = lines[:3]
+        lines[-1] = lines[-1][:width - 1].rstrip() + "…"
+    return "\\n".join(line.replace("\\", "\\\\").replace('"', '\\"') for line in lines)
+
+
+@timed("mindmap.build")
+def build_dot(roadmap: str, max_topics: int = 8, width: int = 28) -> str:
+    """DOT do mapa mental a partir do Markdown do plano de ensino (sem LLM)."""
+    outline = parse_outline(roadmap)
+    title = re.sub(r'\s*-\s*plano de ensino\s*$', '', outline.title, flags=re.IGNORECASE)
+    lines = ["digraph MindMap {", f"  {GRAPH_ATTRS}", f"  {NODE_ATTRS}", f"  {EDGE_ATTRS}",
+             f'  root [label="{_label(title, width)}", {ROOT_ATTRS}];']
+    for i, module in enumerate(outline.modules):
+        lines.append(f'  m{i} [label="{_label(module.title, width)}", {MODULE_ATTRS}];')
+        lines.append(f"  root -> m{i};")
+        topics = module.topics[:max_topics]
+        for j, topic in enumerate(topics):
+            lines.append(f'  m{i}t{j} [label="{_label(topic, width)}"];')
+            lines.append(f"  m{i} -> m{i}t{j};")
+        if len(module.topics) > max_topics:
+            lines.append(f'  m{i}more [label="+{len(module.topics) - max_topics} tópicos", fontcolor="#6B7280"];')
+            lines.append(f"  m{i} -> m{i}more;")
+    lines.append("}")
+    _bump("builds")
+    return "\n".join(lines)
+
+
+# --- DOT VINDO DO LLM ---
+_HEADER_RE = re.compile(r'^\s*(strict\s+)?(di)?graph\b[^{]*\{', re.IGNORECASE)
+
+
+def extract_dot(text: str) -> str:
+    """Tira cercas de Markdown e texto em volta, deixando só `digraph ... { ... }`."""
+    text = re.sub(r'```(?:dot|graphviz)?', '', text or '')
+    m = re.search(r'(strict\s+)?(di)?graph\b', text, re.IGNORECASE)
+    if m is None:
+        return text.strip()
+    end = text.rfind('}')
+    return text[m.start():end + 1].strip() if end > m.start() else text[m.start():].strip()
+
+
+def check_dot(dot: str):
+    """Validação estrutural barata. Devolve a mensagem de erro, ou None se o DOT parece válido."""
+    if not _HEADER_RE.match(dot):
+        return "não começa com 'digraph {' ou 'graph {'"
+    depth, quote, escaped = 0, False, False
+    for c in dot:
+        if quote:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                quote = False
+        elif c == '"':
+            quote = True
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth < 0:
+                return "chave '}' sem abertura"
+    if quote:
+        return "aspas sem fechamento"
+    if depth != 0:
+        return "chaves desbalanceadas"
+    if not re.search(r'->|--', dot):
+        return "grafo sem ligações"
+    return None
+
+
+def graph_hash(dot: str) -> str:
+    # Espaços não mudam o grafo: normaliza antes do hash
+    return hashlib.sha256(re.sub(r'\s+', ' ', dot).strip().encode('utf-8')).hexdigest()
+
+
+def render_svg(dot: str):
+    """SVG do grafo (cacheado por hash). None se o Graphviz não estiver instalado ou o DOT falhar."""
+    global _graphviz_retry_at
+    key = graph_hash(dot)
+    cached = _SVG_CACHE.get(key)
+    if cached is not None:
+        _bump("svg_hits")
+        return cached or None   # "" = este DOT já falhou antes
+    # Sem Graphviz: não tenta de novo a cada rerun (o fragmento atualiza a cada segundo)
+    if time.monotonic() < _graphviz_retry_at:
+        _bump("svg_unavailable")
+        return None
+    try:
+        import graphviz
+    except ImportError:
+        _graphviz_retry_at = time.monotonic() + GRAPHVIZ_RETRY
+        _bump("svg_unavailable")
+        return None
+    try:
+        start = time.perf_counter()
+        svg = graphviz.Source(dot).pipe(format="svg", encoding="utf-8")
+    except graphviz.ExecutableNotFound:
+        # Pacote instalado, binário "dot" não: a tela desenha no navegador
+        _graphviz_retry_at = time.monotonic() + GRAPHVIZ_RETRY
+        _bump("svg_unavailable")
+        return None
+    except Exception:
+        # DOT que o Graphviz recusa: guarda a falha para não chamar o binário de novo
+        _SVG_CACHE.set(key, "")
+        _bump("svg_unavailable")
+        return None
+    _bump("svg_renders")
+    _bump("render_seconds", time.perf_counter() - start)
+    _SVG_CACHE.set(key, svg)
+    return svg
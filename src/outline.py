@@ -0,0 +1,117 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+# Palavras que abrem um módulo no cronograma gerado pelo create_study_roadmap
+_MODULE_RE = re.compile(r'^(m[oó]dulo|unidade|semana|parte|bloco)\s+([0-9]+|[IVXLC]+)\b', re.IGNORECASE)
+_BULLET_RE = re.compile(r'^(\s*)(?:[-*+•]|\d+[.)])\s+(.*)$')
+_LABEL_RE = re.compile(r'^([^:]{2,40}):\s*(.*)$')
+# Itens de leitura/bibliografia não são tópicos de aula
+_SKIP_LABELS = ('leitura', 'bibliografia', 'referencia', 'capitulo')
+
+
+def _plain(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def _clean(text: str) -> str:
+    return re.sub(r'[*_`]+', '', text).strip()
+
+
+@dataclass
+class Module:
+    title: str
+    topics: list = field(default_factory=list)
+
+
+@dataclass
+class Outline:
+    title: str
+    modules: list = field(default_factory=list)
+
+    def topics(self) -> list:
+        """Lista achatada de (módulo, tópico)."""
+        return [(m.title, t) for m in self.modules for t in m.topics]
+
+
+def _heading(line: str):
+    m = re.match(r'^(#{1,6})\s+(.*)$', line.strip())
+    if not m:
+        return None, None
+    return len(m.group(1)), _clean(m.group(2))
+
+
+def _section_lines(lines, keyword: str):
+    """Linhas da seção '## ...keyword...' até o próximo '## '."""
+    start = None
+    for i, line in enumerate(lines):
+        level, text = _heading(line)
+        if level == 2 and keyword in _plain(text):
+            start = i + 1
+        elif start is not None and level is not None and level <= 2:
+            return lines[start:i]
+    return lines[start:] if start is not None else None
+
+
+def parse_outline(roadmap: str) -> Outline:
+    """
+    Extrai título, módulos e tópicos do Markdown do plano de ensino.
+    Usa a seção '## 🗓️ Cronograma Semestral'; sem ela, cai para as seções '##'.
+    """
+    lines = roadmap.splitlines()
+    title = "Disciplina"
+    for line in lines:
+        level, text = _heading(line)
+        if level is not None:
+            title = text
+            break
+
+    section = _section_lines(lines, 'cronograma')
+    outline = Outline(title=title)
+    if section is None:
+        # Sem cronograma: cada seção '##' vira um módulo
+        current = None
+        for line in lines:
+            level, text = _heading(line)
+            if level == 2:
+                current = Module(text)
+                outline.modules.append(current)
+                continue
+            bullet = _BULLET_RE.match(line)
+            if current is not None and bullet and _clean(bullet.group(2)):
+                current.topics.append(_clean(bullet.group(2)))
+        return outline
+
+    current = None
+    skip_label = False
+    for line in section:
+        if not line.strip():
+            continue
+        level, text = _heading(line)
+        bullet = _BULLET_RE.match(line)
+        body = _clean(bullet.group(2)) if bullet else _clean(line)
+
+        # Início de módulo: título '###' ou linha/item de topo "Módulo N: ..."
+        top_level = not bullet or len(bullet.group(1)) == 0
+        if level is not None or (top_level and _MODULE_RE.match(body)):
+            current = Module((text if level is not None else body).rstrip(':').strip())
+            outline.modules.append(current)
+            skip_label = False
+            continue
+        if current is None or not body:
+            continue
+
+        # "Tópicos Principais: a, b, c" ou só o rótulo com subitens abaixo
+        label = _LABEL_RE.match(body)
+        if label:
+            skip_label = any(k in _plain(label.group(1)) for k in _SKIP_LABELS)
+            rest = label.group(2)
+            if rest and not skip_label:
+                for topic in re.split(r'[;,]\s*', rest.rstrip('.')):
+                    if _clean(topic):
+                        current.topics.append(_clean(topic))
+            continue
+        if bullet and not skip_label:
+            current.topics.append(body.rstrip('.'))
+    return outline
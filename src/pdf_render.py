@@ -0,0 +1,487 @@
+"""
+Renderização de Markdown em PDF (fpdf2).
+
+- MarkdownTokenizer lê o texto uma vez só, linha a linha, e devolve blocos
+  (título, parágrafo, lista, citação, código, tabela, separador). Aceita o texto
+  em pedaços (feed), então dá para renderizar enquanto a geração ainda chega.
+- Fontes TTF Unicode (DejaVu) são lidas uma vez por processo e reaproveitadas
+  em todos os documentos; sem elas, cai nas fontes core com o texto reduzido a
+  latin-1 (como o renderizador antigo).
+- PdfRenderer monta um documento ou uma apostila (vários documentos em
+  sequência), consumindo o conteúdo à medida que chega.
+"""
+import copy
+import os
+import re
+import threading
+from collections import namedtuple
+
+from fpdf import FPDF
+from fpdf.enums import TextEmphasis
+from fpdf.fonts import SubsetMap
+from fontTools import ttLib
+
+PDF_HEADER = 'AgentStudy - Material Oficial'
+
+# --- FONTES ---
+# Diretórios procurados, em ordem (AGENTSTUDY_PDF_FONT_DIR tem prioridade).
+# No Debian/Streamlit Cloud: `fonts-dejavu-core` (packages.txt).
+FONT_DIRS = (
+    os.getenv("AGENTSTUDY_PDF_FONT_DIR"),
+    "/usr/share/fonts/truetype/dejavu",
+    "/usr/share/fonts/dejavu",
+    "/usr/share/fonts/TTF",
+    "/Library/Fonts",
+    "C:\\Windows\\Fonts",
+)
+# Estilo -> arquivos candidatos; estilo sem arquivo usa o mais próximo
+FONT_FILES = {
+    "": ("DejaVuSans.ttf",),
+    "B": ("DejaVuSans-Bold.ttf",),
+    "I": ("DejaVuSans-Oblique.ttf",),
+    "BI": ("DejaVuSans-BoldOblique.ttf",),
+    "mono": ("DejaVuSansMono.ttf",),
+}
+STYLE_FALLBACK = {"B": "", "I": "", "BI": "B", "mono": ""}
+
+_FONT_TEMPLATES = {}
+_FONT_LOCK = threading.Lock()
+# Largura de cada palavra por (família, estilo, tamanho): textos de aula repetem muito vocabulário
+_WIDTHS = {}
+_fonts_found = None
+
+
+def find_fonts() -> dict:
+    """Estilo -> caminho do TTF (vazio se não houver fonte Unicode instalada)."""
+    global _fonts_found
+    if _fonts_found is None:
+        found = {}
+        for style, names in FONT_FILES.items():
+            for directory in filter(None, FONT_DIRS):
+                path = next((os.path.join(directory, n) for n in names if os.path.isfile(os.path.join(directory, n))), None)
+                if path:
+                    found[style] = path
+                    break
+        if "" in found:
+            for style, other in STYLE_FALLBACK.items():
+                found.setdefault(style, found.get(other) or found[""])
+        else:
+            found = {}
+        _fonts_found = found
+    return _fonts_found
+
+
+def _font_template(path: str):
+    # Leitura do TTF (cmap + larguras de ~6 mil glifos): uma vez por processo
+    with _FONT_LOCK:
+        template = _FONT_TEMPLATES.get(path)
+        if template is None:
+            holder = FPDF()
+            holder.add_font("modelo", "", path)
+            template = _FONT_TEMPLATES[path] = holder.fonts["modelo"]
+        return template
+
+
+def _add_font(pdf: FPDF, family: str, style: str, path: str):
+    """add_font sem reler o arquivo: copia o modelo e troca só o estado por documento."""
+    fontkey = f"{family.lower()}{style}"
+    try:
+        template = _font_template(path)
+        font = copy.copy(template)
+        # O descritor vira objeto do PDF (ganha id no output): um por documento
+        font.desc = copy.copy(template.desc)
+        # O subset do output() altera o TTFont, então cada documento abre o seu (lazy, barato)
+        font.ttfont = ttLib.TTFont(path, recalcTimestamp=False, fontNumber=0, lazy=True)
+        font.i = len(pdf.fonts) + 1
+        font.fontkey = fontkey
+        font.emphasis = TextEmphasis.coerce(style)
+        font.missing_glyphs = []
+        font.biggest_size_pt = 0
+        font._hbfont = None
+        font.subset = SubsetMap(font)
+        pdf.fonts[fontkey] = font
+    except Exception:
+        # Versão do fpdf2 com outra estrutura interna: carrega do jeito normal
+        pdf.fonts.pop(fontkey, None)
+        pdf.add_font(family, style, path)
+
+
+# --- TOKENIZAÇÃO ---
+Block = namedtuple("Block", "kind text level")
+
+_LINE = re.compile(r"""
+    (?P<fence>\s*```)
+  | (?P<heading>\#{1,6})\s+
+  | (?P<rule>\s*([-*_])(?:\s*\4){2,}\s*$)
+  | (?P<table>\s*\|)
+  | (?P<quote>\s*>\s?)
+  | (?P<indent>\s*)(?:(?P<bullet>[-*+•])|(?P<number>\d+)[.)])\s+
+""", re.VERBOSE)
+
+
+class MarkdownTokenizer:
+    """
+    Markdown -> blocos, numa passada só. `feed(pedaço)` devolve os blocos que
+    já fecharam; `close()` devolve o resto. Parágrafos e itens de lista juntam
+    as linhas de continuação com espaço.
+    """
+
+    def __init__(self):
+        self._tail = ""
+        self._open = None   # [kind, level, partes]
+        self._code = None   # linhas do bloco de código aberto
+
+    def feed(self, chunk: str) -> list:
+        lines = (self._tail + chunk).split("\n")
+        self._tail = lines.pop()
+        out = []
+        for line in lines:
+            self._line(line.rstrip("\r"), out)
+        return out
+
+    def close(self) -> list:
+        out = []
+        if self._tail:
+            self._line(self._tail, out)
+            self._tail = ""
+        if self._code is not None:
+            out.append(Block("code", "\n".join(self._code), 0))
+            self._code = None
+        self._flush(out)
+        return out
+
+    def _flush(self, out):
+        if self._open is not None:
+            kind, level, parts = self._open
+            out.append(Block(kind, ("\n" if kind == "table" else " ").join(parts), level))
+            self._open = None
+
+    def _start(self, out, kind, level, text):
+        self._flush(out)
+        self._open = [kind, level, [text]]
+
+    def _line(self, line, out):
+        if self._code is not None:
+            if line.lstrip().startswith("```"):
+                out.append(Block("code", "\n".join(self._code), 0))
+                self._code = None
+            else:
+                self._code.append(line)
+            return
+        if not line.strip():
+            self._flush(out)
+            return
+        m = _LINE.match(line)
+        kind = m.lastgroup if m else None
+        if kind == "fence":
+            self._flush(out)
+            self._code = []
+        elif kind == "heading":
+            self._flush(out)
+            out.append(Block("heading", line[m.end():].strip().strip("#").strip(), len(m.group("heading"))))
+        elif kind == "rule":
+            self._flush(out)
+            out.append(Block("rule", "", 0))
+        elif kind == "table":
+            if self._open is None or self._open[0] != "table":
+                self._start(out, "table", 0, line.strip())
+            elif not set(line.strip()) <= set("|-: "):
+                # A linha |---|---| só separa o cabeçalho
+                self._open[2].append(line.strip())
+        elif kind == "quote":
+            if self._open is not None and self._open[0] == "quote":
+                self._open[2].append(line[m.end():].strip())
+            else:
+                self._start(out, "quote", 0, line[m.end():].strip())
+        elif kind in ("bullet", "number"):
+            level = len(m.group("indent").expandtabs(4)) // 2
+            text = line[m.end():].strip()
+            self._start(out, kind, level, f"{m.group('number')}. {text}" if kind == "number" else text)
+        elif self._open is not None and self._open[0] != "table":
+            self._open[2].append(line.strip())
+        else:
+            self._start(out, "paragraph", 0, line.strip())
+
+
+def tokenize(text: str) -> list:
+    tokenizer = MarkdownTokenizer()
+    return tokenizer.feed(text) + tokenizer.close()
+
+
+# --- TEXTO EM LINHA ---
+# Negrito/itálico viram trechos com estilo; `código` e "Página N" soltos são limpos
+_INLINE = re.compile(r"""
+    \*\*(?P<b1>.+?)\*\* | (?<!\w)__(?P<b2>.+?)__(?!\w)
+  | (?<![\w*])\*(?![\s*])(?P<i1>.+?)(?<![\s*])\*(?![\w*])
+  | (?<![\w_])_(?![\s_])(?P<i2>.+?)(?<![\s_])_(?![\w_])
+  | `(?P<code>[^`]+)`
+  | (?P<page>(?i:página|page)\s+\d+)
+""", re.VERBOSE)
+_WORDS = re.compile(r"(\s*)(\S+)")
+# Marcadores que o fpdf2 interpretaria no cell(markdown=True)
+_ESCAPE = re.compile(r"(\*\*|__|--|~~)")
+_MARKS = {"": "{}", "B": "**{}**", "I": "__{}__", "BI": "**__{}__**"}
+
+# Sem fonte Unicode: troca o que tem equivalente em latin-1, o resto some
+LATIN1_REPLACEMENTS = str.maketrans({
+    '–': '-', '—': '-', '“': '"', '”': '"', '’': "'", '‘': "'", '…': '...', '•': '-',
+    '≤': '<=', '≥': '>=', '≠': '!=', '→': '->', '←': '<-', '−': '-',
+})
+
+
+def inline_runs(text: str) -> list:
+    """Texto de um bloco -> [(estilo, trecho)], estilo em "", "B", "I"."""
+    runs, pos = [], 0
+    for m in _INLINE.finditer(text):
+        if m.start() > pos:
+            runs.append(("", text[pos:m.start()]))
+        g = m.lastgroup
+        if g != "page":
+            # "Página 3" perdida no meio do texto (cabeçalho/rodapé do material de origem) some
+            runs.append(({"b1": "B", "b2": "B", "i1": "I", "i2": "I"}.get(g, ""), m.group(g)))
+        pos = m.end()
+    if pos < len(text):
+        runs.append(("", text[pos:]))
+    return runs
+
+
+# --- DOCUMENTO ---
+class _Document(FPDF):
+    def __init__(self, header: str):
+        super().__init__()
+        self.header_text = header
+        self.text_family = "Helvetica"
+
+    def header(self):
+        self.set_font(self.text_family, 'B', 10)
+        self.set_text_color(100, 100, 100)
+        self.cell(0, 10, self.header_text, new_x="LMARGIN", new_y="NEXT", align='R')
+        self.set_draw_color(220, 220, 220)
+        self.line(10, 20, 200, 20)
+        self.ln(10)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font(self.text_family, 'I', 8)
+        self.set_text_color(128, 128, 128)
+        self.cell(0, 10, f'Página {self.page_no()}', align='C')
+
+
+class PdfRenderer:
+    """
+    Renderiza Markdown em PDF à medida que o texto chega.
+
+        r = PdfRenderer()
+        for pedaço in stream: r.feed(pedaço)
+        pdf_bytes = r.finish()
+
+    Apostila: add_document(título, texto ou iterável de pedaços) para cada parte;
+    cada uma abre página nova e vira um marcador no índice do leitor de PDF.
+    """
+
+    def __init__(self, header: str = PDF_HEADER, fonts: dict = None):
+        self.fonts = find_fonts() if fonts is None else fonts
+        self.unicode = bool(self.fonts)
+        self.pdf = _Document(header)
+        if self.unicode:
+            for style in ("", "B", "I", "BI"):
+                _add_font(self.pdf, "Texto", style, self.fonts[style])
+            _add_font(self.pdf, "Mono", "", self.fonts["mono"])
+            self.pdf.text_family = "Texto"
+        self.family = "Texto" if self.unicode else "Helvetica"
+        self.mono = "Mono" if self.unicode else "Courier"
+        self.bullet = "•" if self.unicode else "-"
+        self.pdf.set_margins(20, 20, 20)
+        self.pdf.set_auto_page_break(auto=True, margin=20)
+        self.pdf.add_page()
+        self._tokenizer = MarkdownTokenizer()
+        self._blank_page = True
+
+    def _clean(self, text: str) -> str:
+        if not self.unicode:
+            text = text.translate(LATIN1_REPLACEMENTS).encode('latin-1', 'ignore').decode('latin-1')
+        return text
+
+    # --- entrada ---
+    def feed(self, chunk: str):
+        for block in self._tokenizer.feed(chunk):
+            self._render(block)
+
+    def flush(self):
+        for block in self._tokenizer.close():
+            self._render(block)
+        self._tokenizer = MarkdownTokenizer()
+
+    def add_document(self, title: str, content):
+        """Parte da apostila: página nova, título e o conteúdo (str ou pedaços)."""
+        self.flush()
+        if not self._blank_page:
+            self.pdf.add_page()
+        if title:
+            self.pdf.start_section(self._clean(title)[:120])
+            self._render(Block("heading", title, 1))
+        for chunk in ([content] if isinstance(content, str) else content):
+            self.feed(chunk)
+        self.flush()
+
+    def finish(self, stream=None):
+        """Fecha o documento; com `stream`, escreve nele em vez de devolver bytes."""
+        self.flush()
+        data = self.pdf.output()
+        if stream is not None:
+            stream.write(data)
+            return None
+        return bytes(data)
+
+    # --- blocos ---
+    def _render(self, block: Block):
+        pdf = self.pdf
+        self._blank_page = False
+        w_eff = pdf.epw
+        if block.kind == "code":
+            pdf.set_font(self.mono, '', 9)
+            pdf.set_text_color(30, 30, 30)
+            pdf.set_fill_color(245, 245, 245)
+            pdf.multi_cell(w_eff, 5, self._clean(block.text) or " ", fill=True, new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(3)
+            return
+        if block.kind == "rule":
+            pdf.ln(2)
+            pdf.set_draw_color(200, 200, 200)
+            pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + w_eff, pdf.get_y())
+            pdf.ln(4)
+            return
+        if block.kind == "table":
+            pdf.set_font(self.mono, '', 8)
+            pdf.set_text_color(30, 30, 30)
+            pdf.multi_cell(w_eff, 4.5, self._clean(block.text), new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(3)
+            return
+
+        text = self._clean(block.text).strip()
+        if not text:
+            return
+        if block.kind == "heading":
+            size = {1: 16, 2: 14, 3: 12}.get(block.level, 11)
+            pdf.set_text_color(0, 0, 0)
+            pdf.ln(4)
+            self._flow(inline_runs(text.upper() if block.level <= 2 else text), size, size * 0.5, base="B")
+            pdf.ln(2)
+        elif block.kind in ("bullet", "number"):
+            prefix = self.bullet
+            if block.kind == "number":
+                prefix, _, text = text.partition(" ")
+                text = text.strip()
+                if not text:
+                    return  # item numerado vazio ("2)"): nada para desenhar
+            pdf.set_text_color(30, 30, 30)
+            self._flow(inline_runs(text), 11, 6, indent=5 + 5 * min(block.level, 4), prefix=prefix)
+            pdf.ln(1)
+        elif block.kind == "quote":
+            pdf.set_text_color(80, 80, 80)
+            self._flow(inline_runs(text), 11, 6, indent=6, base="I")
+            pdf.ln(3)
+        else:
+            pdf.set_text_color(40, 40, 40)
+            self._flow(inline_runs(text), 11, 6)
+            pdf.ln(3)
+
+    # --- quebra de linha ---
+    def _width(self, style: str, size: float, word: str) -> float:
+        key = (self.fonts.get(style, "core"), style, size, word)
+        w = _WIDTHS.get(key)
+        if w is None:
+            if len(_WIDTHS) > 100_000:
+                _WIDTHS.clear()
+            self.pdf.set_font(self.family, style, size)
+            w = _WIDTHS[key] = self.pdf.get_string_width(word)
+        return w
+
+    def _flow(self, runs, size, height, indent=0, base="", prefix=None):
+        """
+        Quebra as linhas aqui (larguras de palavra em cache) e escreve cada uma
+        com cell(): o multi_cell do fpdf2 remede a linha inteira a cada espaço.
+        """
+        pdf = self.pdf
+        left = indent
+        if prefix:
+            left += self._width(base, size, prefix + " ")
+        max_w = pdf.epw - left - 2 * pdf.c_margin
+        lines, line, used, gap = [], [], 0.0, False
+        for style, text in runs:
+            style = "".join(sorted(set(base + style)))
+            for m in _WORDS.finditer(text):
+                gap = gap or bool(m.group(1))
+                word = m.group(2)
+                w = self._width(style, size, word)
+                space = self._width(style, size, " ") if gap and line else 0.0
+                if line and used + space + w > max_w:
+                    lines.append(line)
+                    line, used, space = [], 0.0, 0.0
+                while w > max_w and len(word) > 1:
+                    # Palavra maior que a linha (URL, fórmula): corta onde couber
+                    cut = len(word) - 1
+                    while cut > 1 and self._width(style, size, word[:cut]) > max_w - used:
+                        cut -= 1
+                    line.append((style, word[:cut], False))
+                    lines.append(line)
+                    line, used, space = [], 0.0, 0.0
+                    word = word[cut:]
+                    w = self._width(style, size, word)
+                line.append((style, word, bool(space)))
+                used += space + w
+                gap = False
+            gap = text[-1:].isspace()
+        if line:
+            lines.append(line)
+
+        for n, line in enumerate(lines):
+            if n == 0 and prefix:
+                pdf.set_font(self.family, base, size)
+                pdf.set_x(pdf.l_margin + indent)
+                pdf.cell(left - indent, height, prefix)
+            pdf.set_x(pdf.l_margin + left)
+            self._line(line, size, height, base)
+
+    def _line(self, line, size, height, base):
+        pdf = self.pdf
+        styles = {style for style, _, _ in line}
+        if len(styles) == 1:
+            # Linha de um estilo só (a maioria): texto puro, sem markdown
+            pdf.set_font(self.family, styles.pop(), size)
+            text = "".join((" " if gap else "") + word for _, word, gap in line)
+            pdf.cell(pdf.epw - (pdf.get_x() - pdf.l_margin), height, text, new_x="LMARGIN", new_y="NEXT")
+            return
+        parts, current, chunk = [], None, ""
+        for style, word, gap in line:
+            if style != current and chunk:
+                parts.append(_MARKS[current].format(_ESCAPE.sub(r"\\\1", chunk)))
+                chunk = ""
+            if gap:
+                # O espaço fica fora dos marcadores (senão o fpdf2 não reconhece o fechamento)
+                if chunk:
+                    chunk += " "
+                else:
+                    parts.append(" ")
+            current = style
+            chunk += word
+        parts.append(_MARKS[current].format(_ESCAPE.sub(r"\\\1", chunk)))
+        pdf.set_font(self.family, "", size)
+        pdf.cell(pdf.epw - (pdf.get_x() - pdf.l_margin), height, "".join(parts), markdown=True,
+                 new_x="LMARGIN", new_y="NEXT")
+
+
+def render_markdown(content, header: str = PDF_HEADER) -> bytes:
+    """PDF de um texto (str) ou de um stream de pedaços."""
+    renderer = PdfRenderer(header)
+    for chunk in ([content] if isinstance(content, str) else content):
+        renderer.feed(chunk)
+    return renderer.finish()
+
+
+def render_booklet(documents, header: str = PDF_HEADER, stream=None):
+    """Apostila: `documents` é um iterável de (título, conteúdo), consumido sob demanda."""
+    renderer = PdfRenderer(header)
+    for title, content in documents:
+        renderer.add_document(title, content)
+    return renderer.finish(stream)
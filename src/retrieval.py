@@ -0,0 +1,156 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+# Palavras muito comuns que não ajudam a ranquear trechos
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na', 'nos', 'nas',
+    'um', 'uma', 'uns', 'umas', 'para', 'por', 'com', 'sem', 'que', 'se', 'ao', 'aos', 'ou',
+    'mais', 'como', 'sobre', 'entre', 'seu', 'sua', 'isso', 'este', 'esta', 'esse', 'essa',
+    'me', 'eu', 'voce', 'ele', 'ela', 'ser', 'sao', 'foi', 'tem', 'ha', 'pelo', 'pela',
+    'the', 'of', 'and', 'to', 'in', 'is', 'for', 'on',
+}
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximação barata: ~4 caracteres por token."""
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str) -> list:
+    """Minúsculas, sem acentos, sem stopwords."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return [w for w in _WORD_RE.findall(text) if len(w) > 1 and w not in STOPWORDS]
+
+
+def chunk_text(text: str, max_chars: int = 1500, overlap: int = 200) -> list:
+    """Quebra em blocos por parágrafo, respeitando títulos Markdown como fronteira."""
+    chunks = []
+    current = []
+    size = 0
+    for para in re.split(r'\n\s*\n', text):
+        para = para.strip()
+        if not para:
+            continue
+        # Título novo fecha o bloco anterior (mantém seções coesas)
+        if para.startswith('#') and current:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+        # Parágrafos gigantes (PDF sem quebras) são fatiados com sobreposição
+        while len(para) > max_chars:
+            if current:
+                chunks.append('\n\n'.join(current))
+                current, size = [], 0
+            cut = para.rfind(' ', 0, max_chars)
+            if cut <= overlap:
+                cut = max_chars
+            chunks.append(para[:cut])
+            para = para[cut - overlap:].lstrip()
+        if size + len(para) > max_chars and current:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+        current.append(para)
+        size += len(para) + 2
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+@dataclass
+class Chunk:
+    id: int
+    source: str
+    text: str
+    tokens: int
+
+
+class ContextIndex:
+    """
+    Índice BM25 por sessão sobre o roteiro e os anexos.
+    Aceita inserção incremental (novo anexo) sem reconstruir tudo.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, chunk_chars: int = 1500):
+        self.k1 = k1
+        self.b = b
+        self.chunk_chars = chunk_chars
+        self.chunks = []
+        self._tfs = []
+        self._lengths = []
+        self._df = Counter()
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    def add(self, text: str, source: str = 'roadmap') -> int:
+        """Indexa um novo documento. Retorna quantos blocos foram criados."""
+        new = chunk_text(text, max_chars=self.chunk_chars)
+        with self._lock:
+            for piece in new:
+                terms = tokenize(piece)
+                tf = Counter(terms)
+                self.chunks.append(Chunk(len(self.chunks), source, piece, estimate_tokens(piece)))
+                self._tfs.append(tf)
+                self._lengths.append(len(terms))
+                self._total_len += len(terms)
+                self._df.update(tf.keys())
+        return len(new)
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query: str, k: int = 8) -> list:
+        """Retorna [(score, Chunk)] ordenado por relevância."""
+        terms = set(tokenize(query))
+        n = len(self.chunks)
+        if not terms or not n:
+            return []
+        avg_len = self._total_len / n or 1
+        scores = []
+        for i, tf in enumerate(self._tfs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / avg_len)
+            for t in terms:
+                f = tf.get(t)
+                if not f:
+                    continue
+                df = self._df[t]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scores.append((score, self.chunks[i]))
+        scores.sort(key=lambda x: x[0], reverse=True)
+        return scores[:k]
+
+    def build_context(self, query: str, token_budget: int = 6000, k: int = 8) -> str:
+        """
+        Monta o contexto para o prompt: cabeçalho do roteiro (nome/ementa)
+        + os k blocos mais relevantes, dentro do orçamento de tokens.
+        """
+        if not self.chunks:
+            return ""
+        selected = {}
+        used = 0
+        # O primeiro bloco do roteiro situa o modelo na disciplina
+        head = self.chunks[0]
+        if head.tokens <= token_budget:
+            selected[head.id] = head
+            used += head.tokens
+        for _, chunk in self.search(query, k=k):
+            if chunk.id in selected:
+                continue
+            if used + chunk.tokens > token_budget:
+                continue
+            selected[chunk.id] = chunk
+            used += chunk.tokens
+        # Mantém a ordem original do material para o texto ficar coerente
+        parts = []
+        for chunk in sorted(selected.values(), key=lambda c: c.id):
+            prefix = "[ANEXO]: " if chunk.source != 'roadmap' else ""
+            parts.append(prefix + chunk.text)
+        return '\n\n'.join(parts)
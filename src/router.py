@@ -0,0 +1,192 @@
+"""
+Roteador de intenção do chat: decide se a mensagem pede resposta, aula, lista
+de exercícios, imagem, mapa mental ou é só um seguimento curto da última
+resposta (respondido a partir dela, sem gerar uma aula inteira).
+
+Três camadas, da mais barata para a mais cara:
+  1. padrões compilados (uma regex com um grupo por pista, com peso por intenção);
+  2. classificador Naive Bayes local, treinado com as frases de SEED no import;
+  3. opcional: uma chamada curta ao LLM quando a confiança fica abaixo do limiar.
+As classificações ficam em cache (texto normalizado -> rota).
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+
+from src.cache import LRUCache
+
+ANSWER, LESSON, EXERCISES, IMAGE, MINDMAP, FOLLOWUP = "answer", "lesson", "exercises", "image", "mindmap", "followup"
+INTENTS = (ANSWER, LESSON, EXERCISES, IMAGE, MINDMAP, FOLLOWUP)
+
+# Pistas (texto sem acento, minúsculo) -> (intenção, peso).
+# Pedido explícito pesa mais que menção solta: "explique com uma imagem" é aula, não Imagen.
+CUES = (
+    (r"\b(gere|gera|gerar|crie|cria|criar|faca|fazer|desenhe|desenha|mostre|quero|manda)\b.{0,20}\b(imagem|figura|ilustracao|desenho|infografico)\b", IMAGE, 3.0),
+    (r"^\s*(imagem|figura|ilustracao|desenho|infografico|desenhe|ilustre)\b", IMAGE, 2.5),
+    (r"\b(imagem|figura|ilustracao|desenho|infografico)\b", IMAGE, 0.5),
+    (r"\bmapas?\s+(mental|mentais|conceitual|conceituais)\b", MINDMAP, 3.0),
+    (r"\b(exercicios?|questoes|questao|quiz|simulado|lista de (exercicios|questoes|problemas))\b", EXERCISES, 2.0),
+    (r"\b(gere|crie|faca|monte|quero|passe)\b.{0,20}\b(exercicios?|questoes|lista|simulado|prova)\b", EXERCISES, 1.5),
+    (r"\b(praticar|treinar|fixar o conteudo)\b", EXERCISES, 1.0),
+    (r"\baulas?\b", LESSON, 2.0),
+    (r"\b(ensine|ensina|ensinar)\b", LESSON, 1.5),
+    (r"\bexpli(que|ca|car)\b.{0,15}\b(detalhadamente|em detalhes|a fundo|passo a passo|o (modulo|topico|capitulo|conteudo|assunto))\b", LESSON, 2.0),
+    (r"\bexpli(que|ca|car)\b", LESSON, 1.0),
+    (r"\b(com|usando|atraves de) (uma |um )?(imagem|figura|desenho)\b", LESSON, 1.0),
+    (r"\b(material|apostila|resumo completo) (sobre|de)\b", LESSON, 1.0),
+    (r"\?\s*$", ANSWER, 0.8),
+    (r"^\s*(o que|qual|quais|quando|onde|quem|como|por que|porque|pq|quanto|existe|e possivel)\b", ANSWER, 1.0),
+    (r"\b(diferenca entre|significa|definicao de)\b", ANSWER, 0.8),
+    # Seguimentos: referência ao que acabou de ser dito
+    (r"\b(nao entendi|pode repetir|repete|explica melhor|de novo|mais simples|em outras palavras|resuma isso|resume isso)\b", FOLLOWUP, 2.0),
+    (r"\b(isso|isto|esse|essa|este|esta|nisso|disso|dessa|desse)\b", FOLLOWUP, 0.8),
+    (r"\b(o|a|no|na) (item|exemplo|passo|questao|exercicio|topico) \d+\b", FOLLOWUP, 1.5),
+    (r"^\s*(e|mas|entao|ok|certo)\b", FOLLOWUP, 0.6),
+)
+_CUES = re.compile("|".join(f"(?P<c{i}>{p})" for i, (p, _, _) in enumerate(CUES)))
+
+# Frases de treino do classificador local (sem acento; poucas por intenção bastam)
+SEED = {
+    ANSWER: ("o que e um limite", "qual a diferenca entre media e mediana", "como calculo a derivada de x ao quadrado",
+             "por que a serie diverge", "quando usar o teorema de bayes", "quem propos a teoria",
+             "qual a formula da variancia", "existe relacao entre os dois conceitos", "me tira uma duvida sobre integrais"),
+    LESSON: ("quero uma aula sobre derivadas", "me de uma aula completa do modulo 2", "ensine o conteudo de matrizes",
+             "explique detalhadamente o teorema fundamental", "aula sobre estruturas de dados", "explique o modulo 3",
+             "preciso estudar o capitulo de probabilidade do zero", "material completo sobre grafos"),
+    EXERCISES: ("gere exercicios sobre limites", "quero uma lista de questoes", "me passe exercicios para praticar",
+                "faca um simulado do modulo 1", "questoes de prova sobre integrais", "lista de problemas com gabarito",
+                "quero treinar com exercicios"),
+    IMAGE: ("gere uma imagem de uma celula", "desenhe o circuito", "crie uma ilustracao do ciclo de krebs",
+            "quero uma figura do modelo atomico", "faca um infografico sobre o processo", "imagem do sistema solar"),
+    MINDMAP: ("gere um mapa mental", "mapa mental do modulo 2", "crie um mapa conceitual da disciplina",
+              "quero ver um mapa mental do conteudo"),
+    FOLLOWUP: ("nao entendi", "pode repetir", "explica melhor isso", "e o item 2", "o que significa isso",
+               "resume isso", "de outro exemplo", "mais simples por favor", "e no caso de n negativo", "por que isso acontece"),
+}
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _features(text: str) -> list:
+    words = re.findall(r"\w+", text)
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayes:
+    """Multinomial Naive Bayes (palavras + bigramas), suavização de Laplace."""
+
+    def __init__(self, examples: dict):
+        self.counts = {label: Counter() for label in examples}
+        self.priors = {}
+        vocab = set()
+        total = sum(len(v) for v in examples.values())
+        for label, texts in examples.items():
+            self.priors[label] = math.log(len(texts) / total)
+            for text in texts:
+                feats = _features(normalize(text))
+                self.counts[label].update(feats)
+                vocab.update(feats)
+        self.vocab = len(vocab)
+        self.totals = {label: sum(c.values()) for label, c in self.counts.items()}
+
+    def log_scores(self, text: str) -> dict:
+        feats = _features(text)
+        return {
+            label: self.priors[label] + sum(
+                math.log((self.counts[label][f] + 1) / (self.totals[label] + self.vocab)) for f in feats)
+            for label in self.counts
+        }
+
+
+def _softmax(scores: dict) -> dict:
+    top = max(scores.values())
+    exp = {k: math.exp(v - top) for k, v in scores.items()}
+    total = sum(exp.values())
+    return {k: v / total for k, v in exp.items()}
+
+
+@dataclass
+class Route:
+    intent: str
+    confidence: float
+    source: str
+    scores: dict = field(default_factory=dict)
+
+
+class IntentRouter:
+    """
+    router = IntentRouter(llm=agent.classify_intent)   # llm opcional
+    route = router.route("explique com uma imagem", has_previous=True)
+    route.intent, route.confidence   # ("lesson", 0.8...)
+
+    has_previous: existe uma resposta anterior do tutor para servir de base
+    a um seguimento curto; sem ela, FOLLOWUP vira ANSWER.
+    """
+
+    def __init__(self, llm=None, threshold: float = 0.55, followup_words: int = 12, max_entries: int = 1024):
+        self.llm = llm
+        self.threshold = threshold
+        self.followup_words = followup_words
+        self.model = NaiveBayes(SEED)
+        self.cache = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def _pattern_scores(self, text: str) -> dict:
+        scores = dict.fromkeys(INTENTS, 0.0)
+        for m in _CUES.finditer(text):
+            _, intent, weight = CUES[int(m.lastgroup[1:])]
+            scores[intent] += weight
+        return scores
+
+    def classify(self, text: str, has_previous: bool = False) -> Route:
+        norm = normalize(text)
+        scores = self._pattern_scores(norm)
+        words = len(norm.split())
+        if not has_previous or words > self.followup_words:
+            # Seguimento só faz sentido colado a uma resposta anterior, e curto
+            scores[ANSWER] += scores.pop(FOLLOWUP) * 0.5
+        nb = self.model.log_scores(norm)
+        if FOLLOWUP not in scores:
+            nb[ANSWER] = max(nb[ANSWER], nb.pop(FOLLOWUP))
+        # Padrões decidem; o classificador desempata e cobre o que nenhum padrão pegou
+        nb_prob = _softmax(nb)
+        combined = {k: scores[k] + 1.5 * nb_prob[k] for k in scores}
+        probs = _softmax({k: 2.0 * v for k, v in combined.items()})
+        intent = max(probs, key=probs.get)
+        source = "patterns" if max(scores.values()) > 0 else "classifier"
+        return Route(intent, round(probs[intent], 3), source, {k: round(v, 3) for k, v in probs.items()})
+
+    def route(self, text: str, has_previous: bool = False) -> Route:
+        key = (normalize(text), has_previous)
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return Route(cached.intent, cached.confidence, "cache", cached.scores)
+
+        route = self.classify(text, has_previous)
+        if route.confidence < self.threshold and self.llm is not None:
+            try:
+                label = self.llm(text, has_previous)
+            except Exception:
+                label = None
+            if label in route.scores:
+                route = Route(label, max(route.confidence, self.threshold), "llm", route.scores)
+        self.cache.set(key, route)
+        with self._lock:
+            self.stats["routed"] += 1
+            self.stats[route.source] += 1
+            self.stats[f"intent.{route.intent}"] += 1
+        return route
+
+    def summary(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
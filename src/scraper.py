@@ -1,52 +1,97 @@
+import os
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-import pypdf
-import io
+import threading
 import urllib3
 from urllib.parse import urljoin
 
+from src.http_cache import HttpCache
+from src.metrics import span, timed
+
 # Desabilita avisos de segurança (SSL) para sites universitários antigos
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-def extract_text_from_url(url: str) -> str:
+# Headers de Navegador (Chrome)
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Referer': 'https://www.google.com/'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """Sessão HTTP única (keep-alive + pool de conexões) reaproveitada entre chamadas."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+                s.mount('http://', adapter)
+                s.mount('https://', adapter)
+                s.headers.update(HEADERS)
+                s.verify = False
+                _session = s
+    return _session
+
+def extract_text_from_url(url: str, timeout: float = 15, http_cache: HttpCache = None) -> str:
     """
     Scraper Universal com Detector de Login.
+    Com http_cache, faz GET condicional (ETag/Last-Modified) e reaproveita o texto já extraído.
+    """
+    return fetch_page(url, timeout, http_cache)[0]
+
+@timed("scraper.url")
+def fetch_page(url: str, timeout: float = 15, http_cache: HttpCache = None, max_bytes: int = None) -> tuple:
+    """
+    (texto, bytes baixados) da URL; 0 bytes quando o servidor respondeu 304.
+    Com max_bytes, recusa a página pelo Content-Length antes de baixar o corpo.
     """
     try:
-        # Headers de Navegador (Chrome)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Referer': 'https://www.google.com/'
-        }
-        
+        meta = http_cache.lookup(url) if http_cache is not None else None
+        headers = http_cache.conditional_headers(meta) if meta else {}
+
         # Timeout curto para falhar rápido se o site estiver morto
-        response = requests.get(url, headers=headers, timeout=15, verify=False)
+        with span("scraper.http"):
+            response = get_session().get(url, timeout=timeout, headers=headers, stream=max_bytes is not None)
+
+        # 304: a página não mudou desde a última visita
+        if response.status_code == 304 and meta:
+            http_cache.count("revalidated")
+            body = http_cache.body(meta)
+            if body is not None:
+                return _extract_cached(http_cache, meta, body, url), 0
+            # Corpo sumiu do disco: busca de novo sem validadores
+            with span("scraper.http"):
+                response = get_session().get(url, timeout=timeout, stream=max_bytes is not None)
         
         # Se der erro 403/401 (Proibido), avisamos o usuário
         if response.status_code in [401, 403]:
              raise ValueError("🔒 Acesso Negado. Este site exige login. Por favor, salve a página como PDF (Ctrl+P) e use a aba 'Via Arquivo'.")
         
         response.raise_for_status()
+
+        if max_bytes is not None:
+            _read_limited(response, max_bytes)
+        size = len(response.content)
         
-        # Rota PDF
-        content_type = response.headers.get('Content-Type', '').lower()
-        if 'application/pdf' in content_type or url.lower().endswith('.pdf'):
-            return _extract_from_bytes_pdf(response.content)
-            
-        # Rota HTML
-        if response.encoding is None or response.encoding == 'ISO-8859-1':
+        # Rota HTML: corrige a codificação de sites antigos (PDF não precisa)
+        content_type = response.headers.get('Content-Type', '')
+        if not _is_pdf(content_type, url) and (response.encoding is None or response.encoding == 'ISO-8859-1'):
             response.encoding = response.apparent_encoding
-            
-        return _extract_from_html(response.text, url)
+
+        if http_cache is not None:
+            meta = http_cache.store(url, response)
+            return _extract_cached(http_cache, meta, response.content, url), size
+
+        return _extract_body(response.content, content_type, response.encoding, url), size
             
     except requests.exceptions.SSLError:
-        # Tenta de novo sem verificar SSL (comum em federais)
-        try:
-            response = requests.get(url, headers=headers, timeout=15, verify=False)
-            return _extract_from_html(response.text, url)
-        except:
-            raise ValueError("🔒 Erro de Segurança no site. Salve como PDF e use a aba 'Via Arquivo'.")
+        # A verificação de SSL já está desligada: se ainda falhou, o handshake é inviável
+        raise ValueError("🔒 Erro de Segurança no site. Salve como PDF e use a aba 'Via Arquivo'.")
             
     except Exception as e:
         # Repassa o erro limpo para o frontend
@@ -54,69 +99,178 @@ def extract_text_from_url(url: str) -> str:
             raise ValueError("🔒 Site protegido por senha. Salve como PDF e use a aba 'Via Arquivo'.")
         raise e
 
+def _read_limited(response, max_bytes: int):
+    """Baixa o corpo (stream=True) parando em max_bytes, mesmo sem Content-Length (chunked)."""
+    declared = response.headers.get('Content-Length', '')
+    if declared.isdigit() and int(declared) > max_bytes:
+        response.close()
+        raise ValueError(f"Página grande demais ({int(declared) / 1e6:.1f} MB).")
+    body = bytearray()
+    with span("scraper.http"):
+        for chunk in response.iter_content(64 * 1024):
+            body += chunk
+            if len(body) > max_bytes:
+                response.close()
+                raise ValueError(f"Página grande demais (mais de {max_bytes / 1e6:.1f} MB).")
+    # Daqui em diante response.content devolve o corpo já lido
+    response._content = bytes(body)
+    response._content_consumed = True
+
+def _is_pdf(content_type, url) -> bool:
+    return 'application/pdf' in (content_type or '').lower() or url.lower().endswith('.pdf')
+
+def _extract_body(body: bytes, content_type, encoding, url) -> str:
+    # Rota PDF
+    if _is_pdf(content_type, url):
+        return _extract_from_bytes_pdf(body)
+    # Rota HTML
+    return _extract_from_html(str(body, encoding or 'utf-8', errors='replace'), url)
+
+def _extract_cached(http_cache: HttpCache, meta, body: bytes, url) -> str:
+    """Pula o parsing se esse mesmo corpo já foi extraído antes."""
+    pdf = _is_pdf(meta['content_type'], url)
+    key = http_cache.text_key(meta['body_hash'], None if pdf else url)
+    text = http_cache.get_text(key)
+    if text is not None:
+        http_cache.count("hits")
+        return text
+    http_cache.count("misses")
+    text = _extract_body(body, meta['content_type'], meta['encoding'], url)
+    if not text.startswith("Erro PDF"):
+        http_cache.put_text(key, text)
+    return text
+
+# --- MOTOR HTML ---
+try:
+    import lxml  # noqa: F401  (parser em C, bem mais rápido)
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+LOGIN_KEYWORDS = ['digite sua senha', 'esqueci minha senha', 'acesso ao sistema', 'login', 'usuário e senha', 'sigaa - sistema integrado']
+JUNK_TAGS = {"script", "style", "nav", "footer", "iframe", "noscript", "svg", "button", "input", "select", "meta", "link", "aside"}
+JUNK_CLASSES = ['cookie', 'popup', 'advert', 'banner', 'sidebar']
+MAX_HTML_CHARS = 50000
+
+def _is_junk(tag) -> bool:
+    if tag.name in JUNK_TAGS:
+        return True
+    if tag.name == 'div':
+        classes = tag.get('class')
+        if classes:
+            if isinstance(classes, str):
+                classes = [classes]
+            return any(y in c.lower() for c in classes for y in JUNK_CLASSES)
+    return False
+
+def _is_content_div(tag) -> bool:
+    if tag.name != 'div':
+        return False
+    div_id = tag.get('id')
+    return bool(div_id) and 'content' in div_id.lower()
+
+def _after(tag):
+    """Primeiro nó depois da subárvore de tag (para pular o que foi removido)."""
+    while tag is not None:
+        if tag.next_sibling is not None:
+            return tag.next_sibling
+        tag = tag.parent
+    return None
+
+@timed("scraper.html")
 def _extract_from_html(html_content, base_url) -> str:
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = BeautifulSoup(html_content, HTML_PARSER)
     
     # --- DETECTOR DE TELA DE LOGIN ---
-    # Se o site for só um formulário de senha, avisamos o usuário
-    text_lower = soup.get_text().lower()
-    login_keywords = ['digite sua senha', 'esqueci minha senha', 'acesso ao sistema', 'login', 'usuário e senha', 'sigaa - sistema integrado']
+    # Se o site for só um formulário de senha, avisamos o usuário.
+    # Só precisa saber se há menos de 1000 caracteres: para de contar ao passar disso.
+    size = 0
+    small_parts = []
+    for piece in soup.strings:
+        size += len(piece)
+        if size >= 1000:
+            break
+        small_parts.append(piece)
     
     # Se tiver pouquíssimo texto e palavras de login, é bloqueado
-    if len(text_lower) < 1000 and any(k in text_lower for k in login_keywords):
-         raise ValueError("🔒 Este link leva para uma tela de Login. \n\n💡 SOLUÇÃO: Entre no site, aperte Ctrl+P > 'Salvar como PDF' e suba na aba 'Via Arquivo'.")
+    if size < 1000:
+        text_lower = ''.join(small_parts).lower()
+        if any(k in text_lower for k in LOGIN_KEYWORDS):
+            raise ValueError("🔒 Este link leva para uma tela de Login. \n\n💡 SOLUÇÃO: Entre no site, aperte Ctrl+P > 'Salvar como PDF' e suba na aba 'Via Arquivo'.")
 
-    # --- FAXINA ---
-    junk_tags = ["script", "style", "nav", "footer", "iframe", "noscript", "svg", "button", "input", "select", "meta", "link", "aside"]
-    for tag in soup(junk_tags):
-        tag.decompose()
+    # --- PASSADA ÚNICA: faxina + links + escolha do conteúdo principal ---
+    main = article = content_div = None
+    node = soup.contents[0] if soup.contents else None
+    while node is not None:
+        name = getattr(node, 'name', None)
+        if name is None:
+            node = node.next_element
+            continue
 
-    for div in soup.find_all("div", class_=lambda x: x and any(y in x.lower() for y in ['cookie', 'popup', 'advert', 'banner', 'sidebar'])):
-        div.decompose()
+        if _is_junk(node):
+            nxt = _after(node)
+            node.decompose()
+            node = nxt
+            continue
 
-    # Captura LINKS
-    for a in soup.find_all('a', href=True):
-        link = a['href']
-        text = a.get_text(strip=True)
-        if link and text and len(text) > 3:
-            full_link = urljoin(base_url, link)
-            a.string = f"{text} [LINK: {full_link}]"
+        if name == 'a' and node.get('href'):
+            # Limpa lixo dentro do link antes de ler o texto dele
+            for junk in node.find_all(_is_junk):
+                junk.decompose()
+            text = node.get_text(strip=True)
+            if text and len(text) > 3:
+                node.string = f"{text} [LINK: {urljoin(base_url, node['href'])}]"
+        elif name == 'main' and main is None:
+            main = node
+        elif name == 'article' and article is None:
+            article = node
+        elif content_div is None and _is_content_div(node):
+            content_div = node
+        node = node.next_element
 
     # Extração
-    content = soup.find('main') or soup.find('article') or soup.find('div', id=lambda x: x and 'content' in x.lower()) or soup.body
+    content = main or article or content_div or soup.body
     if not content: content = soup
 
-    raw_text = content.get_text(separator='\n')
-    
+    # Junta linhas limpas e para assim que estourar o limite de saída
     clean_lines = []
-    for line in raw_text.splitlines():
-        line = line.strip()
-        if line: clean_lines.append(line)
+    total = 0
+    for piece in content.strings:
+        for line in piece.splitlines():
+            line = line.strip()
+            if line:
+                clean_lines.append(line)
+                total += len(line) + 1
+        if total > MAX_HTML_CHARS:
+            break
             
     final_text = '\n'.join(clean_lines)
     
     if len(final_text) < 200:
          raise ValueError("O site é protegido. Salve a página como PDF (Ctrl+P) e use a opção 'Via Arquivo'.")
 
-    return final_text[:50000]
+    return final_text[:MAX_HTML_CHARS]
+
+def _pdf_options() -> dict:
+    # AGENTSTUDY_PDF_WORKERS > 1 liga o pool de processos, só para PDFs cujo restante
+    # estimado passa de AGENTSTUDY_PDF_PARALLEL_AFTER segundos (escaneados/pesados)
+    workers = int(os.getenv("AGENTSTUDY_PDF_WORKERS", 0))
+    if workers <= 1:
+        return {}
+    return {"workers": workers, "parallel_after": float(os.getenv("AGENTSTUDY_PDF_PARALLEL_AFTER", 10))}
 
+@timed("scraper.pdf")
 def _extract_from_bytes_pdf(pdf_bytes) -> str:
     try:
-        pdf_file = io.BytesIO(pdf_bytes)
-        reader = pypdf.PdfReader(pdf_file)
-        text = []
-        for page in reader.pages:
-            text.append(page.extract_text() or "")
-        return "\n".join(text)[:60000]
+        from src.pdf_extract import extract_pdf
+        return extract_pdf(pdf_bytes, max_chars=60000, **_pdf_options()).text
     except Exception as e:
         return f"Erro PDF Web: {e}"
 
+@timed("scraper.pdf_upload")
 def extract_text_from_pdf(uploaded_file) -> str:
     try:
-        reader = pypdf.PdfReader(uploaded_file)
-        text = []
-        for page in reader.pages:
-            text.append(page.extract_text() or "")
-        return "\n".join(text)[:60000]
+        from src.pdf_extract import extract_pdf
+        return extract_pdf(uploaded_file, max_chars=60000, **_pdf_options()).text
     except Exception as e:
-        return f"Erro PDF Upload: {e}"
\ No newline at end of file
+        return f"Erro PDF Upload: {e}"
@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from src.cache import LRUCache
+from src.retrieval import ContextIndex
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    roadmap TEXT NOT NULL,
+    mindmap TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_owner ON sessions(owner, pinned, updated);
+CREATE TABLE IF NOT EXISTS attachments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT,
+    blob TEXT,
+    meta TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages(session_id, id);
+CREATE TABLE IF NOT EXISTS artifacts (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, kind, name)
+);
+CREATE TABLE IF NOT EXISTS images (
+    prompt TEXT PRIMARY KEY,
+    full TEXT NOT NULL,
+    thumb TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+class SessionStore:
+    """
+    Armazenamento persistente das disciplinas: SQLite para texto/metadados
+    e uma pasta de blobs (endereçada por conteúdo) para imagens.
+
+    Só o índice da barra lateral é carregado de uma vez; roteiro, mensagens e
+    imagens são buscados sob demanda. Um working set em memória (LRU) guarda
+    o material e o índice de recuperação das sessões mais usadas.
+    """
+
+    def __init__(self, directory: str, working_set: int = 64):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, "sessions.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._working = LRUCache(max_entries=working_set)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cur
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- Índice da barra lateral ---
+    def list_sessions(self, owner: str) -> list:
+        rows = self._query(
+            "SELECT id, name, pinned FROM sessions WHERE owner = ? ORDER BY pinned DESC, updated DESC",
+            (owner,)
+        )
+        return [dict(r) for r in rows]
+
+    def get_session(self, session_id: int):
+        """Metadados leves (sem roteiro nem mensagens)."""
+        rows = self._query("SELECT id, owner, name, pinned, mindmap FROM sessions WHERE id = ?", (session_id,))
+        return dict(rows[0]) if rows else None
+
+    def create_session(self, owner: str, name: str, roadmap: str) -> int:
+        now = time.time()
+        cur = self._execute(
+            "INSERT INTO sessions (owner, name, roadmap, created, updated) VALUES (?, ?, ?, ?, ?)",
+            (owner, name, roadmap, now, now)
+        )
+        return cur.lastrowid
+
+    def rename(self, session_id: int, name: str):
+        self._execute("UPDATE sessions SET name = ? WHERE id = ?", (name, session_id))
+
+    def set_pinned(self, session_id: int, pinned: bool):
+        self._execute("UPDATE sessions SET pinned = ? WHERE id = ?", (int(pinned), session_id))
+
+    def delete(self, session_id: int):
+        """Apaga a sessão e, na mesma transação, os blobs que mais nenhuma linha usa."""
+        with self._lock:
+            names = self._blobs_of(session_id)
+            with self._conn:
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                orphans = [name for name in names if not self._referenced(name)]
+                # A imagem em cache por prompt sai junto: se o prompt voltar, é gerada de novo
+                for name in orphans:
+                    self._conn.execute("DELETE FROM images WHERE full = ? OR thumb = ?", (name, name))
+            for name in orphans:
+                try:
+                    os.remove(self.blob_path(name))
+                except FileNotFoundError:
+                    pass
+        self._working.pop(session_id)
+
+    def touch(self, session_id: int):
+        self._execute("UPDATE sessions SET updated = ? WHERE id = ?", (time.time(), session_id))
+
+    # --- Material de estudo (carregado sob demanda) ---
+    def _load(self, session_id: int) -> dict:
+        entry = self._working.get(session_id)
+        if entry is None:
+            rows = self._query("SELECT roadmap FROM sessions WHERE id = ?", (session_id,))
+            if not rows:
+                raise KeyError(session_id)
+            attachments = [r["text"] for r in self._query(
+                "SELECT text FROM attachments WHERE session_id = ? ORDER BY id", (session_id,))]
+            entry = {"roadmap": rows[0]["roadmap"], "attachments": attachments}
+            self._working.set(session_id, entry)
+        return entry
+
+    def get_roadmap(self, session_id: int) -> str:
+        return self._load(session_id)["roadmap"]
+
+    def get_material(self, session_id: int) -> str:
+        """Roteiro + anexos, no mesmo formato que o chat sempre usou."""
+        entry = self._load(session_id)
+        return entry["roadmap"] + "".join(f"\n\n[ANEXO]: {a}" for a in entry["attachments"])
+
+    def add_attachment(self, session_id: int, text: str):
+        self._execute("INSERT INTO attachments (session_id, text) VALUES (?, ?)", (session_id, text))
+        entry = self._working.get(session_id)
+        if entry is not None:
+            entry["attachments"].append(text)
+            if "index" in entry:
+                entry["index"].add(text, source='anexo')
+
+    def get_index(self, session_id: int) -> ContextIndex:
+        """Índice de recuperação da sessão, reconstruído se saiu do working set."""
+        entry = self._load(session_id)
+        if "index" not in entry:
+            index = ContextIndex()
+            index.add(entry["roadmap"])
+            for a in entry["attachments"]:
+                index.add(a, source='anexo')
+            entry["index"] = index
+        return entry["index"]
+
+    def set_mindmap(self, session_id: int, dot: str):
+        self._execute("UPDATE sessions SET mindmap = ? WHERE id = ?", (dot, session_id))
+
+    # --- Artefatos por módulo ---
+    def set_artifact(self, session_id: int, kind: str, name: str, content: str):
+        self._execute(
+            "INSERT OR REPLACE INTO artifacts (session_id, kind, name, content) VALUES (?, ?, ?, ?)",
+            (session_id, kind, name, content)
+        )
+
+    def copy_artifacts(self, source_id: int, target_id: int) -> set:
+        """Copia os artefatos de outra disciplina (mesma ementa); devolve os tipos copiados."""
+        self._execute(
+            "INSERT OR IGNORE INTO artifacts (session_id, kind, name, content)"
+            " SELECT ?, kind, name, content FROM artifacts WHERE session_id = ?",
+            (target_id, source_id)
+        )
+        return {r["kind"] for r in self._query("SELECT DISTINCT kind FROM artifacts WHERE session_id = ?", (target_id,))}
+
+    def get_artifacts(self, session_id: int) -> dict:
+        out = {}
+        for r in self._query("SELECT kind, name, content FROM artifacts WHERE session_id = ? ORDER BY rowid", (session_id,)):
+            out.setdefault(r["kind"], {})[r["name"]] = r["content"]
+        return out
+
+    # --- Mensagens (paginadas) ---
+    def add_message(self, session_id: int, role: str, content: str = None, blob: str = None, meta: dict = None) -> int:
+        cur = self._execute(
+            "INSERT INTO messages (session_id, role, content, blob, meta) VALUES (?, ?, ?, ?, ?)",
+            (session_id, role, content, blob, json.dumps(meta) if meta else None)
+        )
+        self.touch(session_id)
+        return cur.lastrowid
+
+    def count_messages(self, session_id: int) -> int:
+        return self._query("SELECT COUNT(*) AS n FROM messages WHERE session_id = ?", (session_id,))[0]["n"]
+
+    def get_messages(self, session_id: int, limit: int = 20) -> list:
+        """As `limit` mensagens mais recentes, em ordem cronológica."""
+        rows = self._query(
+            "SELECT id, role, content, blob, meta FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit)
+        )
+        out = []
+        for r in reversed(rows):
+            msg = {"id": r["id"], "role": r["role"], "content": r["content"], "image": r["blob"]}
+            if r["meta"]:
+                msg.update(json.loads(r["meta"]))
+            out.append(msg)
+        return out
+
+    def last_message(self, session_id: int):
+        msgs = self.get_messages(session_id, limit=1)
+        return msgs[0] if msgs else None
+
+    # --- Blobs (imagens) fora da lista de mensagens ---
+    def put_blob(self, data: bytes, ext: str = "png") -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{digest}.{ext}"
+        path = os.path.join(self.blob_dir, name)
+        if not os.path.exists(path):
+            fd, tmp = tempfile.mkstemp(dir=self.blob_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return name
+
+    def _blobs_of(self, session_id: int) -> set:
+        # Mensagens (imagem + miniatura no meta) e pacotes gerados
+        names = set()
+        for r in self._conn.execute("SELECT blob, meta FROM messages WHERE session_id = ? "
+                                    "AND (blob IS NOT NULL OR meta IS NOT NULL)", (session_id,)):
+            names.add(r["blob"])
+            names.add(json.loads(r["meta"]).get("thumb") if r["meta"] else None)
+        for r in self._conn.execute("SELECT content FROM artifacts WHERE session_id = ? AND kind = 'pack_file'",
+                                    (session_id,)):
+            names.add(r["content"])
+        names.discard(None)
+        return names
+
+    def _referenced(self, name: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM messages WHERE blob = ? OR json_extract(meta, '$.thumb') = ? "
+            "UNION ALL SELECT 1 FROM artifacts WHERE kind = 'pack_file' AND content = ? LIMIT 1",
+            (name, name, name)
+        ).fetchone() is not None
+
+    def blob_path(self, name: str) -> str:
+        return os.path.join(self.blob_dir, name)
+
+    def has_blob(self, name: str) -> bool:
+        return os.path.exists(self.blob_path(name))
+
+    # --- Imagens geradas, por hash do prompt (compartilhadas entre sessões, ver src/images.py) ---
+    def get_image(self, prompt_key: str):
+        rows = self._query("SELECT full, thumb FROM images WHERE prompt = ?", (prompt_key,))
+        return dict(rows[0]) if rows else None
+
+    def set_image(self, prompt_key: str, full: str, thumb: str):
+        self._execute(
+            "INSERT OR REPLACE INTO images (prompt, full, thumb, created) VALUES (?, ?, ?, ?)",
+            (prompt_key, full, thumb, time.time())
+        )
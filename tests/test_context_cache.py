@@ -0,0 +1,45 @@
+"""Cache de contexto por sessão: aula, exercícios e dúvidas reaproveitam o mesmo CachedContent."""
+from types import SimpleNamespace
+
+from src.agent import StudyAgent
+from src.client_pool import ClientPool
+from src.context_cache import ContextCacheManager
+from src.llm_client import LLMError
+
+
+class _Caches:
+    def __init__(self):
+        self.created, self.deleted = [], []
+
+    def create(self, model, config=None):
+        self.created.append(config.contents[0])
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    def update(self, name, config=None):
+        pass
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+def _no_summary(text):
+    raise LLMError("sem resumo")
+
+
+def test_call_types_share_one_cache_per_session():
+    client = SimpleNamespace(caches=_Caches())
+    agent = StudyAgent("chave", pool=ClientPool(factory=lambda key: client),
+                       context_cache=ContextCacheManager(min_tokens=200))
+    # Sem resumo no modelo, cada orçamento cortaria o material num ponto diferente
+    agent.compressor.summarize = _no_summary
+    material = "\n\n".join(f"Parágrafo {i}: " + "limites derivadas integrais " * 40 for i in range(250))
+    names = set()
+    for i in range(2):
+        for task, kind in ((agent._lesson_task(f"Limites {i}"), "lesson"),
+                           (agent._doubt_task("O que é derivada? " * 50), "answer"),
+                           (agent._exercises_task(f"Integrais {i}"), "exercises")):
+            contents, config = agent._course_request(task, material, cache_key=7, kind=kind)
+            assert contents == task
+            names.add(config.cached_content)
+    assert names == {"cachedContents/1"}
+    assert client.caches.deleted == []
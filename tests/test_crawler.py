@@ -0,0 +1,116 @@
+"""Crawler contra um site local (http.server): robots, orçamentos e filtro de mesmo site."""
+import functools
+import http.server
+import threading
+
+import pytest
+
+from src.crawler import Crawler
+from src.scraper import fetch_page
+
+FILLER = ("Conteúdo da disciplina de Cálculo Diferencial e Integral I, com limites, derivadas, "
+          "integrais e aplicações, avaliações presenciais e listas semanais de exercícios. ") * 3
+
+
+def page(title: str, links=()) -> str:
+    items = "".join(f'<li><a href="{href}">{label}</a></li>' for label, href in links)
+    return f"<html><body><main><h1>{title}</h1><p>{FILLER}</p><ul>{items}</ul></main></body></html>"
+
+
+SITE = {
+    "robots.txt": "User-agent: *\nDisallow: /privado/\n",
+    "curso/index.html": page("MAT101", [
+        ("Ementa da disciplina", "ementa.html"),
+        ("Ementa (versão para impressão)", "ementa.html?utm_source=portal#topo"),
+        ("Bibliografia da disciplina", "/bibliografia.html"),
+        ("Material restrito da disciplina", "/privado/material.html"),
+        ("Ementa no portal da universidade", "http://outro-site.invalid/ementa.html"),
+        ("Fale com a secretaria (contato)", "/contato.html"),
+        ("Ementa completa em texto corrido", "/sem-tamanho/ementa-completa.html"),
+    ]),
+    "curso/ementa.html": page("Ementa", [("Cronograma de aulas da disciplina", "cronograma.html")]),
+    "curso/cronograma.html": page("Cronograma", [("Ementa antiga da disciplina", "ementa-antiga.html")]),
+    "curso/ementa-antiga.html": page("Ementa antiga"),
+    "bibliografia.html": page("Bibliografia"),
+    "privado/material.html": page("Material restrito"),
+    "contato.html": page("Contato"),
+}
+BIG_BODY = page("Ementa completa", []).replace("</main>", "<p>" + "x" * 200_000 + "</p></main>").encode()
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/sem-tamanho/"):
+            # Resposta sem Content-Length: o corpo vai até a conexão fechar
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            self.wfile.write(BIG_BODY)
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    root = tmp_path_factory.mktemp("site")
+    for name, body in SITE.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Handler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield base
+    server.shutdown()
+
+
+def fetched(result, base):
+    return {p.url[len(base):] for p in result.pages}
+
+
+def test_follows_relevant_same_site_links(site):
+    result = Crawler(max_pages=10, max_depth=2, max_bytes=50_000).crawl(f"{site}/curso/index.html")
+    assert fetched(result, site) == {"/curso/index.html", "/curso/ementa.html", "/curso/cronograma.html",
+                                     "/bibliografia.html"}
+    assert result.skipped["robots"] == 1          # /privado/
+    assert result.skipped["off_site"] == 1
+    assert result.skipped["low_score"] >= 1       # contato
+    assert result.skipped["visited"] >= 1         # ementa com utm/fragmento
+    # Sem Content-Length e maior que o orçamento: recusada, sem estourar os bytes
+    assert any("grande demais" in e for e in result.errors.values())
+    assert result.bytes <= 50_000
+    context = result.context()
+    assert context.startswith(f"### Fonte: {site}/curso/index.html")
+    assert context.count("### Fonte:") == 4
+
+
+def test_depth_limit(site):
+    result = Crawler(max_depth=1, max_bytes=50_000).crawl(f"{site}/curso/index.html")
+    assert "/curso/cronograma.html" not in fetched(result, site)
+    assert "/curso/ementa.html" in fetched(result, site)
+
+
+def test_page_limit(site):
+    result = Crawler(max_pages=2, max_bytes=50_000).crawl(f"{site}/curso/index.html")
+    assert len(result.pages) == 2
+    assert result.skipped["budget"] >= 1
+
+
+def test_byte_limit_without_content_length(site):
+    with pytest.raises(ValueError, match="grande demais"):
+        fetch_page(f"{site}/sem-tamanho/ementa-completa.html", max_bytes=64 * 1024)
+    text, size = fetch_page(f"{site}/sem-tamanho/ementa-completa.html", max_bytes=1024 * 1024)
+    assert size == len(BIG_BODY) and "Ementa completa" in text
+
+
+def test_byte_limit_with_concurrent_downloads(site):
+    # Orçamento para a raiz e pouco mais de duas páginas: quatro downloads simultâneos
+    # não podem, cada um, usar tudo o que sobra
+    root = len(SITE["curso/index.html"].encode())
+    budget = root + 5 * len(SITE["bibliografia.html"].encode()) // 2
+    result = Crawler(max_pages=10, max_depth=2, max_bytes=budget, max_workers=4).crawl(f"{site}/curso/index.html")
+    assert result.bytes <= budget
+    assert all("grande demais" in e for e in result.errors.values())
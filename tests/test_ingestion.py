@@ -0,0 +1,47 @@
+"""Ingestão pelo app (AppTest): erro do extrator não vira ementa nem entra no índice de deduplicação."""
+import os
+import time
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import src.scraper
+from src.dedup import CourseIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URL = "https://exemplo.edu.br/ementa.pdf"
+ERROR = "Erro PDF Web: EOF marker not found"
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "chave-de-teste")
+    monkeypatch.setenv("AGENTSTUDY_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("AGENTSTUDY_HTTP_CACHE", str(tmp_path / "http"))
+    monkeypatch.setenv("AGENTSTUDY_CACHE_DB", str(tmp_path / "responses.db"))
+    monkeypatch.setattr(src.scraper, "extract_text_from_url", lambda url, **kwargs: ERROR)
+    monkeypatch.chdir(ROOT)
+    st.cache_resource.clear()  # store, índice e fila apontando para este tmp_path
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=30)
+    at.query_params["u"] = "aluno"
+    at.run()
+    yield at, tmp_path / "data"
+    st.cache_resource.clear()
+
+
+def test_extraction_error_is_never_indexed(app):
+    at, data_dir = app
+    at.text_input[0].input(URL)
+    next(b for b in at.button if b.label == "🔍 Buscar").click().run()
+    deadline = time.monotonic() + 10
+    while at.session_state.pending_job and time.monotonic() < deadline:
+        time.sleep(0.05)
+        at.run()
+    assert any(ERROR in e.value for e in at.error)
+    assert at.session_state.current_session is None
+
+    courses = CourseIndex(str(data_dir / "courses.db"))
+    assert courses.lookup_url(URL) is None
+    assert courses.lookup_text(ERROR) is None
+    assert courses.summary()["entries"] == 0
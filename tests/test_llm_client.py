@@ -0,0 +1,99 @@
+"""Coalescência do GeminiGateway: um líder cancelado não pode prender os seguidores."""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.jobs import JobCancelled
+from src.llm_client import GeminiGateway
+
+
+class FakeClient:
+    """Imita client.models / client.aio.models; a primeira chamada bloqueia até `release`."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.cancel_first = None     # exceção levantada pela primeira chamada (líder)
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._agenerate))
+
+    def _generate(self, model, contents, config):
+        self.calls += 1
+        if self.calls == 1:
+            self.started.set()
+            self.release.wait(5)
+            raise self.cancel_first
+        return SimpleNamespace(text=f"resposta {self.calls}")
+
+    async def _agenerate(self, model, contents, config):
+        self.calls += 1
+        if self.calls == 1:
+            self.started.set()
+            await asyncio.sleep(10)  # cancelada pelo teste
+        return SimpleNamespace(text=f"resposta {self.calls}")
+
+
+def test_generate_follower_survives_cancelled_leader():
+    gateway, client = GeminiGateway(max_retries=0), FakeClient()
+    client.cancel_first = KeyboardInterrupt()
+    results, errors = [], []
+
+    def leader():
+        try:
+            gateway.generate(client, "m", "pergunta", None)
+        except BaseException as e:
+            errors.append(e)
+
+    t_leader = threading.Thread(target=leader, daemon=True)
+    t_leader.start()
+    assert client.started.wait(5)
+    t_follower = threading.Thread(target=lambda: results.append(gateway.generate(client, "m", "pergunta", None).text),
+                                  daemon=True)
+    t_follower.start()
+    for _ in range(500):
+        if gateway.stats["coalesced"]:
+            break
+        time.sleep(0.01)
+    client.release.set()
+    t_leader.join(5)
+    t_follower.join(5)
+
+    assert isinstance(errors[0], KeyboardInterrupt)
+    assert results == ["resposta 2"]
+    assert gateway._inflight == {}
+    # Depois do cancelamento, o mesmo pedido volta a funcionar
+    assert gateway.generate(client, "m", "pergunta", None).text == "resposta 3"
+
+
+def test_generate_job_cancelled_releases_key():
+    gateway, client = GeminiGateway(max_retries=0), FakeClient()
+    client.cancel_first = JobCancelled()
+    client.release.set()
+    with pytest.raises(Exception):
+        gateway.generate(client, "m", "pergunta", None)
+    assert gateway._inflight == {}
+    assert gateway.generate(client, "m", "pergunta", None).text == "resposta 2"
+
+
+def test_agenerate_cancelled_leader_releases_followers():
+    gateway, client = GeminiGateway(max_retries=0), FakeClient()
+
+    async def scenario():
+        leader = asyncio.create_task(gateway.agenerate(client, "m", "pergunta", None))
+        while not client.started.is_set():
+            await asyncio.sleep(0.01)
+        follower = asyncio.create_task(gateway.agenerate(client, "m", "pergunta", None))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        res = await asyncio.wait_for(follower, 5)
+        again = await asyncio.wait_for(gateway.agenerate(client, "m", "pergunta", None), 5)
+        return res.text, again.text
+
+    assert asyncio.run(scenario()) == ("resposta 2", "resposta 3")
+    assert gateway._inflight == {}
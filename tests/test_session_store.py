@@ -0,0 +1,28 @@
+"""SessionStore: blobs endereçados por conteúdo somem quando a última sessão que os usa é apagada."""
+import os
+
+from src.session_store import SessionStore
+
+
+def test_delete_removes_unreferenced_blobs(tmp_path):
+    store = SessionStore(str(tmp_path))
+    a = store.create_session("aluno", "Cálculo", "# Cálculo")
+    b = store.create_session("aluno", "Física", "# Física")
+    shared = store.put_blob(b"imagem compartilhada", "webp")
+    thumb = store.put_blob(b"miniatura", "webp")
+    own = store.put_blob(b"so da sessao a", "webp")
+    pack = store.put_blob(b"%PDF pacote", "pdf")
+    store.set_image("prompt", shared, thumb)
+    store.add_message(a, "assistant", blob=shared, meta={"thumb": thumb})
+    store.add_message(a, "assistant", blob=own)
+    store.set_artifact(a, "pack_file", "pdf", pack)
+    store.add_message(b, "assistant", blob=shared, meta={"thumb": thumb})
+
+    store.delete(a)
+    assert not store.has_blob(own) and not store.has_blob(pack)
+    assert store.has_blob(shared) and store.has_blob(thumb)
+    assert store.get_image("prompt") is not None
+
+    store.delete(b)
+    assert os.listdir(store.blob_dir) == []
+    assert store.get_image("prompt") is None